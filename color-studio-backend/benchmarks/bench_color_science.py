@@ -0,0 +1,131 @@
+"""
+Benchmark e verificação do ColorScience.
+
+1. Ida e volta (decode -> encode) de cada curva em uma rampa densa de sinal,
+   em float64 (precisão das fórmulas) e float32 (o que os frames usam).
+2. Throughput (megapixels/s) de encode, decode e conversão completa entre
+   espaços nomeados em um frame RGB.
+3. Erro da conversão assada em LUT 3D (LUTEngine) contra a conversão exata,
+   por tamanho de LUT. É informativo: o erro máximo se concentra onde a
+   conversão tem quinas (corte de gamut, PQ perto do preto).
+
+Sai com código 1 se alguma verificação de ida e volta ou de matriz falhar.
+
+Uso (a partir de color-studio-backend/):
+    python benchmarks/bench_color_science.py
+    python benchmarks/bench_color_science.py --resolution 4k --runs 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.color_science import ColorScience  # noqa: E402
+from src.services.lut_engine import LUTEngine  # noqa: E402
+
+RESOLUTIONS = {'hd': (1080, 1920), '4k': (2160, 3840)}
+
+# Tolerâncias de ida e volta (em unidades de sinal)
+TOLERANCE = {np.float64: 1e-9, np.float32: 2e-5}
+
+CONVERSIONS = [
+    ('S-Gamut3.Cine', 'Rec.709'),
+    ('V-Gamut', 'Rec.709'),
+    ('Cinema Gamut', 'Rec.2020 PQ'),
+    ('BMD Film Gen5', 'Rec.2020 HLG'),
+    ('Rec.2020 HLG', 'Rec.2020 PQ'),
+]
+
+
+def check_round_trips() -> bool:
+    print("Ida e volta decode -> encode (erro máximo em sinal)")
+    ok = True
+    for dtype in (np.float64, np.float32):
+        for transfer in ColorScience.TRANSFERS:
+            # PQ não representa sinais abaixo de encode(0) (~7e-7): a rampa começa nesse piso
+            floor = float(ColorScience.encode(transfer, np.zeros(1, dtype=dtype))[0])
+            signal = np.linspace(max(floor, 0.0), 1.0, 100001, dtype=dtype)
+            round_trip = ColorScience.encode(transfer, ColorScience.decode(transfer, signal))
+            error = float(np.abs(round_trip - signal).max())
+            passed = error <= TOLERANCE[dtype]
+            ok &= passed
+            print(f"  {dtype.__name__:<8}{transfer:<14}{error:>12.2e}  {'ok' if passed else 'FALHOU'}")
+    return ok
+
+
+def check_gamut_matrices() -> bool:
+    print("\nMatrizes de primárias (ida e volta e branco preservado)")
+    ok = True
+    white = np.ones(3)
+    for source in ColorScience.PRIMARIES:
+        forward = ColorScience.gamut_matrix(source, 'rec709').astype(np.float64)
+        back = ColorScience.gamut_matrix('rec709', source).astype(np.float64)
+        identity_error = float(np.abs(back @ forward - np.eye(3)).max())
+        white_error = float(np.abs(forward @ white - white).max())
+        passed = identity_error < 1e-5 and white_error < 1e-5
+        ok &= passed
+        print(f"  {source:<14}identidade {identity_error:.1e}  branco {white_error:.1e}  {'ok' if passed else 'FALHOU'}")
+    return ok
+
+
+def bench_throughput(resolution: str, runs: int):
+    height, width = RESOLUTIONS[resolution]
+    frame = np.random.default_rng(0).random((height, width, 3), dtype=np.float32)
+    megapixels = height * width / 1e6
+
+    def timed(function) -> float:
+        function()  # aquecimento
+        started = time.perf_counter()
+        for _ in range(runs):
+            function()
+        return (time.perf_counter() - started) / runs
+
+    print(f"\nThroughput ({resolution}, float32)")
+    print(f"  {'operação':<40}{'ms/frame':>10}{'MP/s':>9}")
+    for transfer in ColorScience.TRANSFERS[1:]:
+        for direction, function in (('decode', ColorScience.decode), ('encode', ColorScience.encode)):
+            elapsed = timed(lambda: function(transfer, frame))
+            print(f"  {transfer + ' ' + direction:<40}{elapsed * 1000:>10.1f}{megapixels / elapsed:>9.1f}")
+
+    for source, target in CONVERSIONS:
+        elapsed = timed(lambda: ColorScience.convert(frame, source, target, clip=True))
+        print(f"  {source + ' -> ' + target:<40}{elapsed * 1000:>10.1f}{megapixels / elapsed:>9.1f}")
+
+
+def report_baked(sizes):
+    print("\nConversões assadas em LUT 3D (tetraédrica) x conversão exata, em code values de 10 bits")
+    print(f"  {'conversão':<36}{'LUT':>5}{'assar ms':>10}{'médio':>8}{'p99':>8}{'max':>8}")
+    engine = LUTEngine()
+    samples = np.random.default_rng(1).random((200000, 3), dtype=np.float32)
+    for source, target in CONVERSIONS:
+        exact = ColorScience.convert(samples, source, target, clip=True)
+        for size in sizes:
+            started = time.perf_counter()
+            lut = ColorScience.bake_conversion(source, target, size)
+            bake_ms = (time.perf_counter() - started) * 1000
+            error = np.abs(engine.apply(samples, lut) - exact) * 1023
+            print(f"  {source + ' -> ' + target:<36}{size:>5}{bake_ms:>10.1f}{float(error.mean()):>8.2f}"
+                  f"{float(np.percentile(error, 99)):>8.2f}{float(error.max()):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolution', default='hd', choices=list(RESOLUTIONS))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--lut-sizes', type=int, nargs='+', default=[17, 33, 65])
+    args = parser.parse_args()
+
+    ok = check_round_trips()
+    ok &= check_gamut_matrices()
+    bench_throughput(args.resolution, args.runs)
+    report_baked(args.lut_sizes)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark do GradeEngine (primárias paramétricas).
+
+1. Precisão da aplicação direta contra uma implementação de referência
+   em float64 (sem blocos, sem tabela de curvas), em code values de 10 bits.
+2. Frames por segundo na CPU em 1080p e 4K, por conjunto de operações:
+   só lift/gain, + gamma/offset/saturação, + curvas RGB.
+3. Erro da grade assada em LUT 3D (o que o lut3d do FFmpeg aplica) por tamanho.
+
+Sai com código 1 se a aplicação direta errar mais que MAX_ERROR_10BIT.
+
+Uso (a partir de color-studio-backend/):
+    python benchmarks/bench_grade_engine.py
+    python benchmarks/bench_grade_engine.py --runs 10 --batch 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.grade_engine import GradeEngine  # noqa: E402
+from src.services.lut_engine import LUTEngine  # noqa: E402
+
+RESOLUTIONS = {'1080p': (1080, 1920), '4k': (2160, 3840)}
+MAX_ERROR_10BIT = 0.5
+
+GRADES = {
+    'lift/gain': {'lift': [0.02, 0.0, -0.01], 'gain': [1.05, 1.0, 0.95]},
+    '+ gamma/offset/sat': {'lift': [0.02, 0.0, -0.01], 'gain': [1.05, 1.0, 0.95], 'gamma': 1.1,
+                           'offset': 0.01, 'saturation': 1.2},
+    '+ curvas': {'lift': [0.02, 0.0, -0.01], 'gain': [1.05, 1.0, 0.95], 'gamma': 1.1, 'offset': 0.01,
+                 'saturation': 1.2, 'curves': {'master': [[0, 0], [0.25, 0.2], [0.75, 0.82], [1, 1]],
+                                               'red': [[0, 0.02], [1, 0.98]]}},
+}
+
+
+def reference(pixels: np.ndarray, params: dict) -> np.ndarray:
+    """A mesma grade etapa por etapa em float64"""
+    params = GradeEngine.normalize(params)
+    x = pixels.astype(np.float64)
+    lift, gain = np.asarray(params['lift']), np.asarray(params['gain'])
+    y = gain * (x + lift * (1.0 - x))
+    y = np.power(np.maximum(y, 0.0), 1.0 / np.asarray(params['gamma'])) + np.asarray(params['offset'])
+    luma = (y @ np.asarray(GradeEngine.LUMA_COEFFICIENTS))[..., None]
+    y = np.clip(luma + params['saturation'] * (y - luma), 0.0, 1.0)
+    master = GradeEngine.sample_curve(params['curves']['master'], y)
+    return np.stack([GradeEngine.sample_curve(params['curves'][channel], master[..., c])
+                     for c, channel in enumerate(('red', 'green', 'blue'))], axis=-1)
+
+
+def check_accuracy(engine: GradeEngine) -> bool:
+    print(f"Aplicação direta x referência float64 (code values de 10 bits, limite {MAX_ERROR_10BIT})")
+    pixels = np.random.default_rng(0).random((500000, 3), dtype=np.float32)
+    ok = True
+    for name, params in GRADES.items():
+        error = float(np.abs(engine.apply(pixels, params) - reference(pixels, params)).max()) * 1023
+        passed = error <= MAX_ERROR_10BIT
+        ok &= passed
+        print(f"  {name:<22}{error:>8.3f}  {'ok' if passed else 'FALHOU'}")
+    return ok
+
+
+def bench_fps(engine: GradeEngine, runs: int, batch: int):
+    print(f"\nFrames por segundo (CPU, float32, lotes de {batch} frames, saída em buffer reutilizado)")
+    print(f"  {'grade':<22}" + "".join(f"{resolution:>10}" for resolution in RESOLUTIONS))
+    rng = np.random.default_rng(1)
+    frames = {resolution: rng.random((batch, height, width, 3), dtype=np.float32)
+              for resolution, (height, width) in RESOLUTIONS.items()}
+    for name, params in GRADES.items():
+        grade = engine.compile(params)
+        row = f"  {name:<22}"
+        for resolution, batch_frames in frames.items():
+            out = np.empty_like(batch_frames)
+            engine.apply(batch_frames, grade, out=out)  # aquecimento
+            started = time.perf_counter()
+            for _ in range(runs):
+                engine.apply(batch_frames, grade, out=out)
+            row += f"{runs * batch / (time.perf_counter() - started):>10.1f}"
+        print(row)
+
+
+def report_baked(engine: GradeEngine, sizes):
+    print("\nGrade assada em LUT 3D (tetraédrica) x aplicação direta, em code values de 10 bits")
+    print(f"  {'grade':<22}{'LUT':>5}{'médio':>8}{'p99':>8}{'max':>8}")
+    lut_engine = LUTEngine()
+    pixels = np.random.default_rng(2).random((200000, 3), dtype=np.float32)
+    for name, params in GRADES.items():
+        exact = engine.apply(pixels, params)
+        for size in sizes:
+            error = np.abs(lut_engine.apply(pixels, engine.bake(params, size)) - exact) * 1023
+            print(f"  {name:<22}{size:>5}{float(error.mean()):>8.2f}{float(np.percentile(error, 99)):>8.2f}"
+                  f"{float(error.max()):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=2)
+    parser.add_argument('--lut-sizes', type=int, nargs='+', default=[17, 33, 65])
+    args = parser.parse_args()
+
+    engine = GradeEngine()
+    ok = check_accuracy(engine)
+    bench_fps(engine, args.runs, args.batch)
+    report_baked(engine, args.lut_sizes)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark do LUTEngine: megapixels/s por tamanho de LUT, resolução e
+interpolação.
+
+Usa uma LUT sintética (curva + mistura de canais) para que os acessos à
+tabela não sejam triviais.
+
+Uso (a partir de color-studio-backend/):
+    python benchmarks/bench_lut_engine.py
+    python benchmarks/bench_lut_engine.py --sizes 33 --resolutions 4k --runs 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.lut_engine import LUT3D, LUTEngine  # noqa: E402
+
+RESOLUTIONS = {'hd': (1080, 1920), '4k': (2160, 3840)}
+
+
+def synthetic_lut(size: int) -> LUT3D:
+    table = LUT3D.identity(size).table
+    mixed = table @ np.array([[0.9, 0.05, 0.05], [0.1, 0.85, 0.05], [0.0, 0.1, 0.9]], dtype=np.float32)
+    return LUT3D(np.power(mixed, 0.8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[17, 33, 65])
+    parser.add_argument('--resolutions', nargs='+', default=['hd', '4k'], choices=list(RESOLUTIONS))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    engine = LUTEngine()
+    rng = np.random.default_rng(0)
+
+    print(f"{'LUT':<6}{'resolução':<11}{'interpolação':<14}{'ms/frame':>10}{'MP/s':>9}")
+    for resolution in args.resolutions:
+        height, width = RESOLUTIONS[resolution]
+        frame = rng.random((height, width, 3), dtype=np.float32)
+        out = np.empty_like(frame)
+        megapixels = height * width / 1e6
+
+        for size in args.sizes:
+            lut = synthetic_lut(size)
+            for method in LUTEngine.METHODS:
+                engine.apply(frame, lut, method, out=out)  # aquecimento
+                started = time.perf_counter()
+                for _ in range(args.runs):
+                    engine.apply(frame, lut, method, out=out)
+                elapsed = (time.perf_counter() - started) / args.runs
+                print(f"{size:<6}{resolution:<11}{method:<14}{elapsed * 1000:>10.1f}{megapixels / elapsed:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de latência do ffprobe: probe completo vs probe rápido
+(show_entries mínimo + probesize/analyzeduration limitados).
+
+Roda sobre um corpus de arquivos de exemplo. Com --generate, cria amostras
+sintéticas em vários containers (MOV, MXF, MKV, MP4) com ffmpeg. Também
+confere se os dois modos produzem os mesmos metadados.
+
+Uso (a partir de color-studio-backend/):
+    python benchmarks/bench_probe.py --generate --runs 5
+    python benchmarks/bench_probe.py /caminho/para/clips/*.mov
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.video_analyzer import VideoAnalyzer  # noqa: E402
+
+SAMPLES = [
+    ('prores.mov', ['-c:v', 'prores_ks', '-profile:v', '3', '-c:a', 'pcm_s16le']),
+    ('dnxhd.mxf', ['-c:v', 'dnxhd', '-b:v', '36M', '-pix_fmt', 'yuv422p', '-c:a', 'pcm_s16le', '-ar', '48000']),
+    ('h264.mkv', ['-c:v', 'libx264', '-c:a', 'aac']),
+    ('h264.mp4', ['-c:v', 'libx264', '-c:a', 'aac']),
+]
+
+
+def generate_corpus(out_dir: str, seconds: int) -> list:
+    paths = []
+    for filename, codec_args in SAMPLES:
+        path = os.path.join(out_dir, filename)
+        subprocess.run([
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'lavfi', '-i', 'testsrc2=size=1920x1080:rate=24',
+            '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+            '-t', str(seconds), *codec_args, path
+        ], check=True)
+        paths.append(path)
+    return paths
+
+
+def time_command(cmd: list, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(cmd, capture_output=True, text=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--generate', action='store_true', help='gera um corpus sintético')
+    parser.add_argument('--seconds', type=int, default=30)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = list(args.paths)
+        if args.generate:
+            paths += generate_corpus(tmp, args.seconds)
+        if not paths:
+            parser.error('informe arquivos ou use --generate')
+
+        print(f"{'arquivo':<28}{'completo (ms)':>15}{'rápido (ms)':>14}{'ganho':>8}  campos")
+        for path in paths:
+            full = time_command(VideoAnalyzer.build_full_probe_command(path), args.runs)
+            fast = time_command(VideoAnalyzer.build_fast_probe_command(path), args.runs)
+
+            full_meta = VideoAnalyzer.parse_probe(VideoAnalyzer.probe(path, use_cache=False, fast=False))
+            fast_meta = VideoAnalyzer.parse_probe(VideoAnalyzer.probe(path, use_cache=False, fast=True))
+            diff = sorted(k for k in full_meta if full_meta[k] != fast_meta.get(k))
+
+            full_ms = statistics.median(full) * 1000
+            fast_ms = statistics.median(fast) * 1000
+            print(f"{os.path.basename(path):<28}{full_ms:>15.1f}{fast_ms:>14.1f}{full_ms / fast_ms:>7.1f}x  "
+                  f"{'iguais' if not diff else 'diferem: ' + ', '.join(diff)}")
+
+
+if __name__ == '__main__':
+    main()
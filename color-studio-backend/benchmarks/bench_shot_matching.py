@@ -0,0 +1,80 @@
+"""
+Benchmark do casamento de cor entre clips (ShotMatcher).
+
+1. Custo de medir as estatísticas de um lote de frames (o que a análise de
+   cada clip faz por lote, sem o FFmpeg).
+2. Casar N clips com uma referência a partir das estatísticas já medidas:
+   resolver a correção e assar a LUT de cada clip.
+3. Qualidade: média Oklab do clip corrigido (pela LUT assada)
+   contra a referência.
+
+Os clips são sintéticos: a referência com desvios de exposição, gamma e
+balanço de branco aleatórios por clip.
+
+Uso (a partir de color-studio-backend/):
+    python benchmarks/bench_shot_matching.py
+    python benchmarks/bench_shot_matching.py --clips 200 --size 65
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.lut_engine import LUTEngine  # noqa: E402
+from src.services.shot_matcher import ShotMatcher  # noqa: E402
+
+
+def synthetic_clip(reference: np.ndarray, rng) -> np.ndarray:
+    exposure = rng.uniform(0.7, 1.3)
+    gamma = rng.uniform(0.8, 1.25)
+    white_balance = rng.uniform(0.85, 1.15, size=3).astype(np.float32)
+    return np.clip(np.power(reference * exposure, gamma) * white_balance, 0.0, 1.0).astype(np.float32)
+
+
+def statistics(frames: np.ndarray) -> dict:
+    return ShotMatcher.finalize(ShotMatcher.batch_statistics(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clips', type=int, default=100)
+    parser.add_argument('--size', type=int, default=33)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Frames de análise: lote de 16 frames em 320x180, com gradientes e ruído
+    ramp = np.linspace(0.05, 0.95, 320, dtype=np.float32)
+    base = np.stack(np.broadcast_arrays(ramp[None, :], ramp[::-1][None, :] * 0.8, np.full((180, 1), 0.4)), axis=-1)
+    reference = np.clip(base[None] + rng.normal(0, 0.08, (16, 180, 320, 3)).astype(np.float32), 0.0, 1.0)
+
+    started = time.perf_counter()
+    target = statistics(reference)
+    print(f"Estatísticas de um lote (16 frames 320x180): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    clips = [synthetic_clip(reference[:4], rng) for _ in range(args.clips)]
+    clip_stats = [statistics(clip) for clip in clips]
+
+    started = time.perf_counter()
+    luts = [ShotMatcher.bake(ShotMatcher.solve(stats, target), args.size) for stats in clip_stats]
+    elapsed = time.perf_counter() - started
+    print(f"Casar {args.clips} clips (resolver + assar LUT {args.size}^3): {elapsed:.2f} s "
+          f"({elapsed / args.clips * 1000:.1f} ms/clip)")
+
+    engine = LUTEngine()
+    before, after = [], []
+    target_mean = np.asarray(target['mean'])
+    for clip, stats, lut in zip(clips, clip_stats, luts):
+        matched = statistics(engine.apply(clip, lut))
+        before.append(np.abs(np.asarray(stats['mean']) - target_mean).max())
+        after.append(np.abs(np.asarray(matched['mean']) - target_mean).max())
+    print(f"Distância da média Oklab à referência: antes {np.mean(before):.4f} (max {np.max(before):.4f}), "
+          f"depois {np.mean(after):.4f} (max {np.max(after):.4f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,30 @@ load_dotenv()
 # Inicializar SQLAlchemy
 db = SQLAlchemy()
 
+# Colunas adicionadas aos modelos depois da criação das tabelas: (tabela, coluna, tipo SQL)
+ADDED_COLUMNS = [
+    ('media_file', 'proxy_status', 'VARCHAR(50)'),
+    ('project', 'grade_params', 'JSON'),
+]
+
+
+def add_missing_columns(engine):
+    """Adiciona (ALTER TABLE) as colunas de ADDED_COLUMNS que ainda não existem no banco"""
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    existing = {table: {column['name'] for column in inspector.get_columns(table)}
+                for table in {table for table, _, _ in ADDED_COLUMNS} if table in tables}
+
+    added = []
+    with engine.begin() as connection:
+        for table, column, column_type in ADDED_COLUMNS:
+            if table in existing and column not in existing[table]:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                added.append((table, column))
+    return added
+
 def create_app():
     """Cria e configura uma instância do aplicativo Flask."""
     # Paths absolutos
@@ -73,7 +97,8 @@ def create_app():
                      "Upload-Offset", 
                      "Upload-Length", 
                      "Tus-Resumable",
-                     "X-Requested-With"
+                     "X-Requested-With",
+                     "Range"
                  ],
                  "expose_headers": [
                      "Content-Length", 
@@ -82,7 +107,9 @@ def create_app():
                      "Upload-Length", 
                      "Tus-Resumable", 
                      "Location",
-                     "ETag"
+                     "ETag",
+                     "Content-Range",
+                     "Accept-Ranges"
                  ],
                  "supports_credentials": True,
                  "max_age": 3600
@@ -122,8 +149,8 @@ def create_app():
                 response.headers['Access-Control-Allow-Origin'] = origin
                 response.headers['Access-Control-Allow-Credentials'] = 'true'
                 response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS, PATCH, HEAD'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Upload-Offset, Upload-Length, Tus-Resumable, X-Requested-With'
-                response.headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Type, Upload-Offset, Upload-Length, Location, ETag'
+                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Upload-Offset, Upload-Length, Tus-Resumable, X-Requested-With, Range'
+                response.headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Type, Upload-Offset, Upload-Length, Location, ETag, Content-Range, Accept-Ranges'
                 response.headers['Access-Control-Max-Age'] = '3600'
                 
                 # Log apenas em desenvolvimento
@@ -179,6 +206,18 @@ def create_app():
         conversion_bp = None
         print("⚠️ Warning: conversion_routes not found")
     
+    try:
+        from src.routes.analysis_routes import analysis_bp
+    except ImportError:
+        analysis_bp = None
+        print("⚠️ Warning: analysis_routes not found")
+    
+    try:
+        from src.routes.grading_routes import grading_bp
+    except ImportError:
+        grading_bp = None
+        print("⚠️ Warning: grading_routes not found")
+    
     try:
         from src.routes.subtitle_routes import subtitle_bp
     except ImportError:
@@ -208,6 +247,10 @@ def create_app():
     app.register_blueprint(pricing_bp, url_prefix='/api/pricing')
     app.register_blueprint(colorist_bp, url_prefix='/api/colorist')
     app.register_blueprint(conversion_bp, url_prefix='/api/conversion')
+    if analysis_bp:
+        app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
+    if grading_bp:
+        app.register_blueprint(grading_bp, url_prefix='/api/grading')
     if subtitle_bp:
         app.register_blueprint(subtitle_bp)
     if transcode_bp:
@@ -225,6 +268,14 @@ def create_app():
         except Exception as e:
             print(f"⚠️ Database creation warning: {e}")
 
+        # create_all não altera tabelas existentes: colunas novas entram aqui
+        try:
+            added = add_missing_columns(db.engine)
+            for table, column in added:
+                print(f"✅ Column added: {table}.{column}")
+        except Exception as e:
+            print(f"⚠️ Database migration warning: {e}")
+
     # ==========================================
     # HEALTH CHECK
     # ==========================================
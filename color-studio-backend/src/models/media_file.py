@@ -14,6 +14,7 @@ class MediaFile(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     proxy_file_key = db.Column(db.String(255), nullable=True)
     proxy_stream_url = db.Column(db.String(500), nullable=True)
+    proxy_status = db.Column(db.String(50), nullable=True)  # 'preview', 'processing', 'completed', 'failed'
     converted_file_key = db.Column(db.String(255), nullable=True)
     stream_url = db.Column(db.String(500), nullable=True)
     conversion_status = db.Column(db.String(50), nullable=True)
@@ -38,6 +39,7 @@ class MediaFile(db.Model):
             "uploaded_at": self.uploaded_at.isoformat(),
             "proxy_file_key": self.proxy_file_key,
             "proxy_stream_url": self.proxy_stream_url,
+            "proxy_status": self.proxy_status,
             "converted_file_key": self.converted_file_key,
             "stream_url": self.stream_url,
             "conversion_status": self.conversion_status,
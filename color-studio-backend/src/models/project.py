@@ -21,6 +21,7 @@ class Project(db.Model):
     selected_lut = db.Column(db.String(100), nullable=True)
     processing_mode = db.Column(db.String(50), default='auto')  # 'auto' ou 'advanced'
     output_format = db.Column(db.String(50), default='rec709')  # 'rec709', 'hdr10', 'p3'
+    grade_params = db.Column(db.JSON, nullable=True)  # primárias paramétricas (GradeEngine.normalize)
     
     # Preços e status
     estimated_price = db.Column(db.Float, nullable=False)
@@ -53,6 +54,7 @@ class Project(db.Model):
             'selected_lut': self.selected_lut,
             'processing_mode': self.processing_mode,
             'output_format': self.output_format,
+            'grade_params': self.grade_params,
             'estimated_price': self.estimated_price,
             'final_price': self.final_price,
             'status': self.status,
@@ -0,0 +1,129 @@
+from flask import Blueprint, request, jsonify, Response
+from src.services.analysis_service import AnalysisService
+from src.services.lut_chain import LUTChainBaker
+from src.services.thumbnail_service import ThumbnailService
+
+analysis_bp = Blueprint("analysis", __name__)
+analysis_service = AnalysisService()
+thumbnail_service = ThumbnailService()
+
+@analysis_bp.route("/frame-stats/<int:media_file_id>", methods=["POST"])
+def analyze_frame_stats_route(media_file_id):
+    """
+    Estatísticas medidas nos pixels: histogramas, MaxCLL/MaxFALL, clipping e gamut
+    Body (opcional): {"sample_fps": 1, "analysis_width": 960, "start": 0, "duration": null, "include_frame_histograms": false}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        sample_fps = float(data.get("sample_fps", 1.0))
+        # analysis_width nulo mede na resolução original
+        analysis_width = data.get("analysis_width", 960)
+        analysis_width = int(analysis_width) if analysis_width else None
+        start = float(data.get("start", 0.0))
+        duration = float(data["duration"]) if data.get("duration") else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid analysis parameters"}), 400
+
+    if sample_fps <= 0 or sample_fps > 60:
+        return jsonify({"success": False, "error": "sample_fps must be between 0 and 60"}), 400
+
+    result = analysis_service.analyze_frame_stats(
+        media_file_id,
+        sample_fps=sample_fps,
+        analysis_width=analysis_width,
+        start=start,
+        duration=duration,
+        include_frame_histograms=bool(data.get("include_frame_histograms", False))
+    )
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
+
+@analysis_bp.route("/scenes/<int:media_file_id>", methods=["POST"])
+def detect_scenes_route(media_file_id):
+    """
+    Detecta cortes de cena e precifica o arquivo por cena
+    Body (opcional): {"threshold": 0.15, "min_scene_seconds": 0.5, "project_type": "SDR", "is_rush": false}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        threshold = float(data["threshold"]) if data.get("threshold") is not None else None
+        min_scene_seconds = float(data["min_scene_seconds"]) if data.get("min_scene_seconds") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid scene detection parameters"}), 400
+
+    result = analysis_service.detect_scenes(
+        media_file_id,
+        threshold=threshold,
+        min_scene_seconds=min_scene_seconds,
+        project_type=data.get("project_type", "SDR"),
+        is_rush=bool(data.get("is_rush", False))
+    )
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
+
+@analysis_bp.route("/thumbnails/<int:media_file_id>", methods=["POST"])
+def generate_thumbnails_route(media_file_id):
+    """
+    Gera sprite de thumbnails + trilha WebVTT (cacheado pela identidade da fonte)
+    Body (opcional): {"count": 60, "width": 160, "columns": 10}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data["count"]) if data.get("count") else None
+        width = int(data["width"]) if data.get("width") else None
+        columns = int(data["columns"]) if data.get("columns") else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid thumbnail parameters"}), 400
+
+    result = thumbnail_service.generate(media_file_id, count=count, width=width, columns=columns)
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
+
+@analysis_bp.route("/scopes/<int:media_file_id>", methods=["GET"])
+def render_scope_route(media_file_id):
+    """
+    Scope de um frame: ?t=segundos&scope=waveform|parade|vectorscope&size=256&lut=<id>&format=png|json
+    """
+    timestamp = request.args.get("t", type=float)
+    if timestamp is None:
+        return jsonify({"success": False, "error": "Missing required parameter: t"}), 400
+
+    size = request.args.get("size", 256, type=int)
+    if not 64 <= size <= 1024:
+        return jsonify({"success": False, "error": "size must be between 64 and 1024"}), 400
+
+    output_format = request.args.get("format", "png")
+    result = analysis_service.render_scope(
+        media_file_id,
+        timestamp,
+        request.args.get("scope", "waveform"),
+        size=size,
+        lut_id=request.args.get("lut"),
+        output="png" if output_format == "png" else "array"
+    )
+    if not result["success"]:
+        return jsonify(result), result.get("status", 500)
+
+    if output_format == "png":
+        return Response(result["data"], mimetype="image/png", headers={"Cache-Control": "private, max-age=300"})
+    return jsonify(result), 200
+
+@analysis_bp.route("/shot-match", methods=["POST"])
+def match_shots_route():
+    """
+    Casa a cor dos clips com um clip de referência (uma LUT de correção por clip)
+    Body: {"reference_id": 1, "media_file_ids": [2, 3] (padrão: o projeto da referência), "strength": 1.0, "size": 33}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        reference_id = int(data["reference_id"])
+        media_file_ids = [int(media_file_id) for media_file_id in data.get("media_file_ids") or []]
+        strength = float(data.get("strength", 1.0))
+        size = int(data.get("size", 33))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid shot matching parameters"}), 400
+
+    if not 0.0 <= strength <= 1.0:
+        return jsonify({"success": False, "error": "strength must be between 0 and 1"}), 400
+    if size not in LUTChainBaker.SIZES:
+        return jsonify({"success": False, "error": f"size must be one of {LUTChainBaker.SIZES}"}), 400
+
+    result = analysis_service.match_shots(reference_id, media_file_ids or None, strength=strength, size=size)
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
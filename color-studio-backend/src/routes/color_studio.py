@@ -17,6 +17,8 @@ import requests
 # Importações de serviços e modelos (assumindo que estão em src/)
 from src.models.project import Project, db
 from src.services.r2_upload_service import R2UploadService
+from src.services.source_cache import get_source_cache
+from src.services.conversion_service import ConversionService
 
 color_studio_bp = Blueprint("color_studio", __name__)
 
@@ -537,47 +539,52 @@ def convert_raw_file():
         
         if not key:
             return jsonify({"success": False, "error": "key é obrigatório"}), 400
+
+        # Look aplicado no mesmo pass de encode, resolvido como nos proxies: grade do projeto
+        # (primárias + LUT selecionada) ou lutId explícito sobre as primárias do projeto
+        conversion_service = ConversionService()
+        project_id = data.get("projectId")
+        if data.get("lutId"):
+            project = Project.query.get(project_id) if project_id else None
+            look = conversion_service.resolve_look(data["lutId"], project.grade_params if project else None)
+        elif project_id:
+            look = conversion_service._resolve_grade(project_id)
+        else:
+            look = {"success": True, "lut": None}
+        if not look["success"]:
+            return jsonify(look), look.get("status", 400)
+        lut = look["lut"]
         
         current_app.logger.info(f"🔄 Iniciando conversão de RAW: {key} para {output_format}")
 
-        r2_service = R2UploadService()
-        
-        # 1. Gerar URL de download temporária para o arquivo RAW no R2
-        download_result = r2_service.generate_presigned_url(key, expiration=3600) # 1 hora
-        if not download_result.get("success"):
-            return jsonify(download_result), 500
-        
-        download_url = download_result["url"]
-        
-        # 2. Baixar o arquivo RAW para o servidor
-        temp_raw_path = os.path.join(get_upload_folder(), f"{uuid.uuid4()}.raw")
-        current_app.logger.info(f"⬇️ Baixando RAW de R2 para: {temp_raw_path}")
-        response = requests.get(download_url, stream=True)
-        response.raise_for_status() # Levanta exceção para status de erro
-        with open(temp_raw_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        current_app.logger.info(f"✅ Download RAW concluído: {temp_raw_path}")
+        # 1-2. Obter o arquivo RAW localmente (cache compartilhado de fontes; baixa do R2 apenas em miss)
+        source_cache = get_source_cache()
 
         # 3. Converter o arquivo usando FFmpeg
         output_filename = f"{os.path.splitext(key)[0]}.{output_format}"
         output_path = os.path.join(get_upload_folder(), output_filename)
-        
-        # Exemplo de comando FFmpeg para converter para H.265
-        ffmpeg_command = [
-            "ffmpeg",
-            "-i", temp_raw_path,
-            "-c:v", "libx265", # Codec H.265
-            "-crf", "23",      # Qualidade (menor = melhor qualidade, maior arquivo)
-            "-preset", "medium", # Velocidade de codificação
-            "-tag:v", "hvc1", # Tag para compatibilidade com H.265
-            "-c:a", "aac",     # Codec de áudio
-            "-b:a", "128k",    # Bitrate de áudio
-            output_path
-        ]
-        current_app.logger.info(f"▶️ Executando FFmpeg: {" ".join(ffmpeg_command)}")
-        subprocess.run(ffmpeg_command, check=True, capture_output=True)
-        current_app.logger.info(f"✅ Conversão FFmpeg concluída: {output_path}")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        with source_cache.checkout(key) as temp_raw_path:
+            current_app.logger.info(f"✅ RAW disponível localmente: {temp_raw_path}")
+
+            # Exemplo de comando FFmpeg para converter para H.265
+            ffmpeg_command = [
+                "ffmpeg",
+                "-i", temp_raw_path,
+                "-c:v", "libx265", # Codec H.265
+                "-crf", "23",      # Qualidade (menor = melhor qualidade, maior arquivo)
+                "-preset", "medium", # Velocidade de codificação
+                "-tag:v", "hvc1", # Tag para compatibilidade com H.265
+                "-c:a", "aac",     # Codec de áudio
+                "-b:a", "128k",    # Bitrate de áudio
+                output_path
+            ]
+            if lut:
+                ffmpeg_command[3:3] = ["-vf", ConversionService._lut_filter(lut)]
+            current_app.logger.info(f"▶️ Executando FFmpeg: {' '.join(ffmpeg_command)}")
+            subprocess.run(ffmpeg_command, check=True, capture_output=True)
+            current_app.logger.info(f"✅ Conversão FFmpeg concluída: {output_path}")
 
         # 4. Fazer upload do arquivo convertido para o Cloudflare Stream
         with open(output_path, "rb") as f_converted:
@@ -620,16 +627,16 @@ def convert_raw_file():
                 offset += len(chunk)
             current_app.logger.info(f"✅ Upload do arquivo convertido para Stream concluído: {uid}")
 
-            # 5. Limpar arquivos temporários
-            os.remove(temp_raw_path)
+            # 5. Limpar arquivos temporários (a fonte RAW permanece no cache)
             os.remove(output_path)
-            current_app.logger.info(f"🗑️ Arquivos temporários removidos: {temp_raw_path}, {output_path}")
+            current_app.logger.info(f"🗑️ Arquivo temporário removido: {output_path}")
             
             return jsonify({
                 "success": True,
                 "message": "Conversão e upload para Stream concluídos",
                 "stream_uid": uid,
-                "original_key": key
+                "original_key": key,
+                "lut": lut["id"] if lut else None
             }), 200
             
     except subprocess.CalledProcessError as e:
@@ -1,5 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from src.services.batch_render import get_batch_render_scheduler
 from src.services.conversion_service import ConversionService
+from src.services.hls_packager import HLSPackager
+from src.services.metrics import metrics
+from src.services.probe_cache import get_probe_cache
+from src.services.remote_probe import get_remote_probe_proxy
 
 conversion_bp = Blueprint("conversion", __name__)
 conversion_service = ConversionService()
@@ -14,7 +19,15 @@ def create_proxy_route():
     if not all([media_file_id, project_id, original_file_key]):
         return jsonify({"success": False, "error": "Missing required fields"}), 400
 
-    result = conversion_service.create_proxy(media_file_id, project_id, original_file_key)
+    dash = bool(data.get("dash", False))
+    preview_first = bool(data.get("preview_first", False))
+    apply_lut = bool(data.get("apply_lut", True))  # primárias e LUT selecionada no projeto
+    tone_map = data.get("tone_map")  # operador HDR -> SDR: bt2390, hable ou reinhard
+
+    result = conversion_service.create_proxy(
+        media_file_id, project_id, original_file_key, dash=dash, preview_first=preview_first, apply_lut=apply_lut,
+        tone_map=tone_map
+    )
     return jsonify(result), 200 if result["success"] else 500
 
 @conversion_bp.route("/proxy-status/<int:media_file_id>", methods=["GET"])
@@ -29,16 +42,166 @@ def start_conversion_route():
     media_file_id = data.get("media_file_id")
     output_format = data.get("output_format", "h265")
     quality = data.get("quality", "high")
+    dash = bool(data.get("dash", False))
+    apply_lut = bool(data.get("apply_lut", True))  # primárias e LUT selecionada no projeto
 
     if not media_file_id:
         return jsonify({"success": False, "error": "media_file_id is required"}), 400
 
-    result = conversion_service.start_h265_conversion(media_file_id, output_format, quality)
+    result = conversion_service.start_h265_conversion(media_file_id, output_format, quality, dash=dash,
+                                                      apply_lut=apply_lut)
     return jsonify(result), 200 if result["success"] else 500
 
+@conversion_bp.route("/batch-render", methods=["POST"])
+def start_batch_render_route():
+    """
+    Aplica um look (LUT e/ou primárias) a todos os clips do projeto, um job por clip no pool de renders
+    Body: {"project_id": 1, "lut_id": "slog3_rec709", "grade_params": {...}, "output": "proxy"|"h265",
+           "quality": "high", "dash": false}
+    """
+    data = request.get_json(silent=True) or {}
+    project_id = data.get("project_id")
+    if not project_id:
+        return jsonify({"success": False, "error": "project_id is required"}), 400
+
+    result = conversion_service.start_batch_render(
+        project_id,
+        lut_id=data.get("lut_id"),
+        grade_params=data.get("grade_params"),
+        output=data.get("output", "proxy"),
+        quality=data.get("quality", "high"),
+        dash=bool(data.get("dash", False))
+    )
+    return jsonify(result), 202 if result["success"] else result.get("status", 500)
+
+@conversion_bp.route("/batch-render/<batch_id>", methods=["GET"])
+def get_batch_render_route(batch_id):
+    """Progresso agregado, throughput e estado de cada clip de um render em lote"""
+    batch = get_batch_render_scheduler().get_batch(batch_id)
+    if batch is None:
+        return jsonify({"success": False, "error": "Batch not found"}), 404
+    return jsonify({"success": True, **batch}), 200
+
+@conversion_bp.route("/batch-render/<batch_id>", methods=["DELETE"])
+def cancel_batch_render_route(batch_id):
+    """Cancela os clips do lote que ainda não começaram"""
+    batch = get_batch_render_scheduler().cancel(batch_id)
+    if batch is None:
+        return jsonify({"success": False, "error": "Batch not found"}), 404
+    return jsonify({"success": True, **batch}), 200
+
 @conversion_bp.route("/status/<conversion_id>", methods=["GET"])
 def get_conversion_status_route(conversion_id):
     """Obter status da conversão"""
     result = conversion_service.get_conversion_status(conversion_id)
     return jsonify(result), 200 if result["success"] else 500
 
+
+@conversion_bp.route("/cache/stats", methods=["GET"])
+def get_cache_stats_route():
+    """Métricas dos caches de transcodificação, mídias de origem, LUTs assadas, segmentos e probes"""
+    return jsonify({
+        "success": True,
+        "transcode": conversion_service.result_cache.get_stats(),
+        "baked_luts": conversion_service.lut_baker.get_stats(),
+        "sources": conversion_service.source_cache.get_stats(),
+        "segments": conversion_service.jit_segmenter.get_stats(),
+        "probe": get_probe_cache().get_stats(),
+        "remote_probe": get_remote_probe_proxy().block_cache.get_stats()
+    }), 200
+
+@conversion_bp.route("/packages/<package_id>/<path:asset>", methods=["GET", "HEAD"])
+def serve_package_asset_route(package_id, asset):
+    """
+    Serve playlists e segmentos HLS/DASH armazenados no R2
+    Repassa Range (playlists com EXT-X-BYTERANGE) e If-None-Match
+    """
+    if ".." in asset.split("/") or not package_id.isalnum():
+        return jsonify({"success": False, "error": "Invalid asset path"}), 400
+
+    key = f"{HLSPackager.package_prefix(package_id)}{asset}"
+    result = conversion_service.r2_service.get_object(
+        key,
+        byte_range=request.headers.get("Range"),
+        if_none_match=request.headers.get("If-None-Match")
+    )
+
+    if not result["success"]:
+        if result.get("status") == 304:
+            return Response(status=304)
+        return jsonify({"success": False, "error": result["error"]}), result.get("status", 500)
+
+    body = result["body"]
+    headers = {
+        "Content-Type": result["content_type"] or "application/octet-stream",
+        "Content-Length": str(result["content_length"]),
+        "Accept-Ranges": "bytes",
+        "ETag": result["etag"],
+        "Cache-Control": result["cache_control"] or HLSPackager.CACHE_CONTROL_SEGMENT,
+    }
+    if result["content_range"]:
+        headers["Content-Range"] = result["content_range"]
+
+    if request.method == "HEAD":
+        body.close()
+        return Response(status=result["status"], headers=headers)
+
+    return Response(
+        stream_with_context(body.iter_chunks(chunk_size=256 * 1024)),
+        status=result["status"],
+        headers=headers
+    )
+
+@conversion_bp.route("/jit/<int:media_file_id>/master.m3u8", methods=["GET"])
+def get_jit_master_route(media_file_id):
+    """Playlist master HLS sob demanda"""
+    return _jit_playlist_response(conversion_service.get_jit_playlist(media_file_id))
+
+@conversion_bp.route("/jit/<int:media_file_id>/<rendition>/index.m3u8", methods=["GET"])
+def get_jit_playlist_route(media_file_id, rendition):
+    """Playlist HLS sob demanda de uma rendition (gerada a partir dos keyframes)"""
+    return _jit_playlist_response(conversion_service.get_jit_playlist(media_file_id, rendition))
+
+@conversion_bp.route("/jit/<int:media_file_id>/<rendition>/seg_<int:index>.ts", methods=["GET"])
+def get_jit_segment_route(media_file_id, rendition, index):
+    """Segmento transcodificado no primeiro acesso e servido do cache depois"""
+    result = conversion_service.get_jit_segment(media_file_id, rendition, index)
+    if not result["success"]:
+        return jsonify({"success": False, "error": result["error"]}), result.get("status", 500)
+
+    return Response(result["data"], status=200, headers={
+        "Content-Type": "video/mp2t",
+        "Cache-Control": "public, max-age=86400",
+    })
+
+def _jit_playlist_response(result):
+    if not result["success"]:
+        return jsonify({"success": False, "error": result["error"]}), result.get("status", 500)
+
+    # Playlists dependem da versão da fonte: cache curto
+    return Response(result["playlist"], status=200, headers={
+        "Content-Type": HLSPackager.CONTENT_TYPES[".m3u8"],
+        "Cache-Control": "public, max-age=60",
+    })
+
+@conversion_bp.route("/keyframes/<int:media_file_id>", methods=["POST"])
+def build_keyframe_index_route(media_file_id):
+    """Indexa os keyframes do arquivo (idempotente)"""
+    result = conversion_service.build_keyframe_index(media_file_id)
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
+
+@conversion_bp.route("/keyframes/<int:media_file_id>/lookup", methods=["GET"])
+def lookup_keyframe_route(media_file_id):
+    """Mapeia um instante (?t=segundos) para o keyframe e a faixa de bytes do GOP"""
+    timestamp = request.args.get("t", type=float)
+    if timestamp is None:
+        return jsonify({"success": False, "error": "Missing required parameter: t"}), 400
+
+    nearest = request.args.get("mode") == "nearest"
+    result = conversion_service.lookup_keyframe(media_file_id, timestamp, nearest=nearest)
+    return jsonify(result), 200 if result["success"] else result.get("status", 500)
+
+@conversion_bp.route("/metrics", methods=["GET"])
+def get_metrics_route():
+    """Métricas de conversão (ex: tempo até o primeiro preview)"""
+    return jsonify({"success": True, "metrics": metrics.snapshot()}), 200
@@ -0,0 +1,153 @@
+import os
+
+from flask import Blueprint, request, jsonify, send_file, Response
+from src.models.project import db, Project
+from src.services.grade_engine import GradeEngine
+from src.services.lut_chain import get_lut_chain_baker
+from src.services.lut_preview import LUTPreviewService
+
+grading_bp = Blueprint("grading", __name__)
+lut_preview_service = LUTPreviewService()
+
+@grading_bp.route("/luts/bake", methods=["POST"])
+def bake_lut_chain_route():
+    """
+    Compõe uma cadeia de LUTs/matrizes/curvas em uma única LUT 3D (cacheada pelo hash da cadeia)
+    Body: {"chain": [{"type": "lut", "id": "slog3_rec709"}, {"type": "curve", "gamma": 1.05}],
+           "size": 33, "method": "tetrahedral", "report": false}
+    """
+    data = request.get_json(silent=True) or {}
+    baker = get_lut_chain_baker()
+    method = data.get("method", "tetrahedral")
+    try:
+        size = int(data["size"]) if data.get("size") else None
+        baked = baker.bake(data.get("chain"), size=size, method=method)
+        tradeoffs = baker.tradeoffs(data["chain"], method=method) if data.get("report") else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    result = {
+        "success": True,
+        "hash": baked["hash"],
+        "size": baked["size"],
+        "method": baked["method"],
+        "steps": baked["steps"],
+        "cache": baked["cache"],
+        "accuracy": baked["accuracy"],
+        "download_url": f"/api/grading/luts/baked/{baked['hash']}.cube",
+    }
+    if tradeoffs is not None:
+        result["tradeoffs"] = tradeoffs
+    return jsonify(result), 200
+
+@grading_bp.route("/luts/baked/<chain_hash>.cube", methods=["GET"])
+def download_baked_lut_route(chain_hash):
+    """
+    Download do .cube de uma cadeia assada
+    """
+    if not chain_hash.isalnum():
+        return jsonify({"success": False, "error": "Invalid hash"}), 400
+
+    path = get_lut_chain_baker().cube_path(chain_hash)
+    if not os.path.exists(path):
+        return jsonify({"success": False, "error": "Baked LUT not found"}), 404
+    return send_file(os.path.abspath(path), mimetype="text/plain", as_attachment=True,
+                     download_name=f"{chain_hash}.cube")
+
+@grading_bp.route("/preview/<int:media_file_id>", methods=["GET"])
+def lut_preview_route(media_file_id):
+    """
+    Still antes/depois (PNG) de um MediaFile sob uma LUT: ?lut=<id>&t=segundos&frames=1&width=640
+    Sem t, usa frames igualmente espaçados ao longo do arquivo
+    """
+    lut_id = request.args.get("lut")
+    if not lut_id:
+        return jsonify({"success": False, "error": "Missing required parameter: lut"}), 400
+
+    width = request.args.get("width", LUTPreviewService.DEFAULT_WIDTH, type=int)
+    if not 64 <= width <= LUTPreviewService.MAX_WIDTH:
+        return jsonify({"success": False, "error": f"width must be between 64 and {LUTPreviewService.MAX_WIDTH}"}), 400
+
+    result = lut_preview_service.render(
+        media_file_id,
+        lut_id,
+        timestamp=request.args.get("t", type=float),
+        frames=request.args.get("frames", 1, type=int),
+        width=width
+    )
+    if not result["success"]:
+        return jsonify(result), result.get("status", 500)
+
+    return Response(result["data"], mimetype="image/png", headers={
+        "Cache-Control": "private, max-age=300",
+        "X-Preview-Cache": result["cache"],
+    })
+
+@grading_bp.route("/tonemap/<int:media_file_id>", methods=["GET"])
+def tone_map_preview_route(media_file_id):
+    """
+    Still antes/depois (PNG) de uma fonte HDR em SDR: ?operator=bt2390|hable|reinhard&t=segundos&frames=1&width=640
+    O pico de cada frame vem das estatísticas por cena (rodar frame-stats e scenes antes melhora o resultado)
+    """
+    width = request.args.get("width", LUTPreviewService.DEFAULT_WIDTH, type=int)
+    if not 64 <= width <= LUTPreviewService.MAX_WIDTH:
+        return jsonify({"success": False, "error": f"width must be between 64 and {LUTPreviewService.MAX_WIDTH}"}), 400
+
+    result = lut_preview_service.render_tone_mapped(
+        media_file_id,
+        operator=request.args.get("operator", "bt2390"),
+        timestamp=request.args.get("t", type=float),
+        frames=request.args.get("frames", 1, type=int),
+        width=width
+    )
+    if not result["success"]:
+        return jsonify(result), result.get("status", 500)
+
+    return Response(result["data"], mimetype="image/png", headers={
+        "Cache-Control": "private, max-age=300",
+        "X-Preview-Cache": result["cache"],
+    })
+
+@grading_bp.route("/projects/<int:project_id>/grade", methods=["GET"])
+def get_project_grade_route(project_id):
+    """
+    Primárias paramétricas do projeto (neutras se nunca foram definidas)
+    """
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({"success": False, "error": "Project not found"}), 404
+    return jsonify({"success": True, "grade_params": GradeEngine.normalize(project.grade_params)}), 200
+
+@grading_bp.route("/projects/<int:project_id>/grade", methods=["PUT"])
+def set_project_grade_route(project_id):
+    """
+    Define as primárias do projeto (aplicadas antes da LUT selecionada em proxies e conversões)
+    Body: {"grade_params": {"lift": [0.02, 0, 0], "gamma": 1.1, "gain": 1.05, "offset": 0, "saturation": 1.2,
+                            "curves": {"master": [[0, 0], [0.25, 0.2], [0.75, 0.8], [1, 1]]}}, "size": 33}
+    grade_params nulo remove a grade. A resposta traz a grade assada em .cube para o FFmpeg
+    """
+    data = request.get_json(silent=True) or {}
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({"success": False, "error": "Project not found"}), 404
+
+    params = data.get("grade_params")
+    result = {"success": True, "grade_params": None}
+    if params is not None:
+        try:
+            params = GradeEngine.normalize(params)
+            size = int(data.get("size", 33))
+            baked = get_lut_chain_baker().bake([{"type": "grade", "params": params}], size=size, with_accuracy=False)
+        except (TypeError, ValueError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        result.update({
+            "grade_params": params,
+            "hash": baked["hash"],
+            "download_url": f"/api/grading/luts/baked/{baked['hash']}.cube",
+        })
+
+    project.grade_params = params
+    db.session.commit()
+    return jsonify(result), 200
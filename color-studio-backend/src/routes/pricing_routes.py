@@ -103,6 +103,48 @@ def get_all_luts():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@pricing_bp.route("/luts/search", methods=["GET"])
+def search_luts():
+    """
+    Busca LUTs por espaço de entrada e/ou saída
+    """
+    try:
+        luts = LUTManager.find_luts(request.args.get("input_space"), request.args.get("output_space"))
+        return jsonify({"luts": luts, "count": len(luts)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@pricing_bp.route("/luts", methods=["POST"])
+def add_lut():
+    """
+    Adiciona uma LUT à biblioteca
+    """
+    try:
+        data = request.get_json() or {}
+        format_category = data.get("format_category")
+        project_type = data.get("project_type", "SDR")
+        if not format_category:
+            return jsonify({"error": "format_category is required"}), 400
+
+        lut = {k: data.get(k) for k in ("id", "name", "input_space", "output_space")}
+        return jsonify({"lut": LUTManager.add_lut(format_category, project_type, lut)}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@pricing_bp.route("/luts/<lut_id>", methods=["DELETE"])
+def remove_lut(lut_id):
+    """
+    Remove uma LUT da biblioteca
+    """
+    try:
+        if not LUTManager.remove_lut(lut_id):
+            return jsonify({"error": "LUT not found"}), 404
+        return jsonify({"success": True})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @pricing_bp.route("/estimate-quick", methods=["POST"])
 def quick_estimate():
     """
@@ -1,10 +1,12 @@
-from flask import Blueprint, request, jsonify, current_app, make_response
+from flask import Blueprint, request, jsonify, current_app, make_response, Response, stream_with_context
 import os
+import json
 import requests
 from src.services.tus_upload_manager import TUSUploadManager
 from src.services.r2_upload_service import R2UploadService
 from src.services.video_analyzer import VideoAnalyzer
 from src.services.automatic_pricing import AutomaticPricing
+from src.services.batch_analyzer import BatchAnalyzer
 from src.models.project import Project, db
 
 upload_bp = Blueprint("upload", __name__)
@@ -199,6 +201,43 @@ def analyze_upload(upload_id):
 
 
 
+@upload_bp.route("/analyze-batch", methods=["POST"])
+def analyze_batch():
+    """
+    Analisa e precifica vários clips em paralelo
+    Body: {"items": [{"path": "uploads/..."} | {"r2_key": "raw/..."}], "project_type": "SDR", "is_rush": false}
+    Resposta em NDJSON: uma linha por clip assim que termina e uma linha final de resumo
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get("items")
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items é obrigatório"}), 400
+        if len(items) > BatchAnalyzer.MAX_ITEMS:
+            return jsonify({"error": f"Máximo de {BatchAnalyzer.MAX_ITEMS} itens por lote"}), 400
+
+        uploads_root = os.path.realpath("uploads")
+        for item in items:
+            if not isinstance(item, dict) or not (item.get("path") or item.get("r2_key")):
+                return jsonify({"error": "Cada item precisa de path ou r2_key"}), 400
+            if item.get("r2_key") and not r2_service:
+                return jsonify({"error": "R2 service não configurado"}), 500
+            if item.get("path") and not os.path.realpath(item["path"]).startswith(uploads_root + os.sep):
+                return jsonify({"error": f"Caminho fora do diretório de uploads: {item['path']}"}), 400
+
+        analyzer = BatchAnalyzer(r2_service)
+        results = analyzer.run(items, data.get("project_type", "SDR"), bool(data.get("is_rush", False)))
+
+        return Response(
+            stream_with_context(json.dumps(result) + "\n" for result in results),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @upload_bp.route("/r2-part/<upload_id>", methods=["PUT"])
 def upload_r2_part():
     """
@@ -249,8 +288,19 @@ def complete_r2_upload(upload_id):
         result = r2_service.complete_multipart_upload(upload_id, key, parts)
         
         if result["success"]:
-            # TODO: Processar arquivo RAW (análise, precificação, etc.)
-            pass
+            # Analisar direto no R2 (só cabeçalhos via Range, sem baixar o arquivo) e precificar
+            try:
+                analysis = VideoAnalyzer.analyze_remote(key, r2_service)
+                result["analysis"] = analysis
+                result["pricing"] = AutomaticPricing.calculate_price(
+                    duration_seconds=analysis["duration"],
+                    codec=analysis["codec"],
+                    resolution=analysis["resolution"],
+                    project_type="SDR"  # Default, pode ser alterado pelo cliente
+                )
+            except Exception as e:
+                print(f"⚠️ Análise do arquivo RAW {key} falhou: {str(e)}")
+                result["analysis_error"] = str(e)
         
         return jsonify(result)
         
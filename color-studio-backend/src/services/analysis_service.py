@@ -0,0 +1,234 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.models.media_file import MediaFile
+from src.models.project import db
+from src.services.automatic_pricing import AutomaticPricing
+from src.services.frame_stats import FrameStatsEngine
+from src.services.lut_chain import get_lut_chain_baker
+from src.services.scene_detector import SceneDetector
+from src.services.scope_engine import ScopeEngine, get_scope_engine
+from src.services.shot_matcher import ShotMatcher
+from src.services.source_cache import get_source_cache
+from src.services.video_analyzer import VideoAnalyzer
+
+
+class AnalysisService:
+    """Análises baseadas em pixels dos arquivos de mídia (estatísticas de frames, cenas, scopes, shot matching)"""
+
+    MAX_MATCH_CLIPS = 500
+    MATCH_WORKERS = int(os.getenv('SHOT_MATCH_WORKERS', 4))
+
+    def __init__(self):
+        self.source_cache = get_source_cache()
+        self.scope_engine = get_scope_engine()
+
+    def analyze_frame_stats(self, media_file_id: int, sample_fps: float = 1.0, analysis_width: int = 960,
+                            start: float = 0.0, duration: float = None, include_frame_histograms: bool = False):
+        """
+        Mede histogramas, MaxCLL/MaxFALL, clipping e excursão de gamut nos frames amostrados
+        e registra o resumo em file_metadata
+        """
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        engine = FrameStatsEngine(analysis_width=analysis_width, sample_fps=sample_fps)
+        try:
+            with self.source_cache.checkout(media_file.storage_key) as source_path:
+                result = engine.analyze(source_path, start=start, duration=duration,
+                                        include_frame_histograms=include_frame_histograms)
+        except Exception as e:
+            return {"success": False, "error": f"Frame analysis failed: {str(e)}"}
+
+        # Linha do tempo compacta [tempo, MaxCLL, FALL]: base dos picos por cena do tone mapping
+        timeline = [[frame["time"], frame["max_cll"], frame["fall"]] for frame in result["frames"]]
+        media_file.file_metadata = {
+            **(media_file.file_metadata or {}),
+            "frame_stats": {**result["summary"], "transfer": result["transfer"], "primaries": result["primaries"],
+                            "timeline": timeline}
+        }
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {"success": True, **result}
+
+    def detect_scenes(self, media_file_id: int, threshold: float = None, min_scene_seconds: float = None,
+                      project_type: str = "SDR", is_rush: bool = False):
+        """
+        Divide o arquivo em cenas e precifica cada uma como um clip
+        (as cenas também servem de pontos de corte para thumbnails e encode por segmentos)
+        """
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        detector = SceneDetector(
+            threshold=threshold if threshold is not None else 0.15,
+            min_scene_seconds=min_scene_seconds if min_scene_seconds is not None else 0.5
+        )
+        try:
+            with self.source_cache.checkout(media_file.storage_key) as source_path:
+                analysis = VideoAnalyzer.analyze_video(source_path)
+                result = detector.detect(source_path)
+        except Exception as e:
+            return {"success": False, "error": f"Scene detection failed: {str(e)}"}
+
+        scenes = result["scenes"]
+        for scene in scenes:
+            scene["pricing"] = AutomaticPricing.calculate_price(
+                duration_seconds=scene["duration"],
+                codec=analysis["codec"],
+                resolution=analysis["resolution"],
+                project_type=project_type,
+                num_clips=len(scenes),
+                is_rush=is_rush
+            )
+        total_price = round(sum(scene["pricing"]["final_price"] for scene in scenes), 2)
+
+        media_file.file_metadata = {
+            **(media_file.file_metadata or {}),
+            "scenes": [{key: scene[key] for key in ("index", "start", "end", "duration")} for scene in scenes]
+        }
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {"success": True, **result, "num_clips": len(scenes), "total_price": total_price}
+
+    def render_scope(self, media_file_id: int, timestamp: float, scope: str, size: int = 256,
+                     lut_id: str = None, output: str = "png"):
+        """Waveform, parade ou vectorscope de um frame (com LUT opcional), cacheado por (mídia, instante, hash da LUT)"""
+        if scope not in ScopeEngine.SCOPES:
+            return {"success": False, "error": f"Unknown scope: {scope}", "status": 400}
+
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        # LUT da biblioteca, cadeia assada ou shot match, identificada pelo hash do conteúdo
+        lut = None
+        if lut_id:
+            lut = get_lut_chain_baker().materialize(lut_id)
+            if lut is None:
+                return {"success": False, "error": f"LUT not found: {lut_id}", "status": 404}
+
+        source_info = self.source_cache.r2_service.get_object_info(media_file.storage_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+        source_id = f"{media_file.storage_key}@{source_info['etag']}"
+
+        # Scope já em memória: responde sem baixar a fonte (scrubbing de volta)
+        data = self.scope_engine.get_cached(source_id, timestamp, scope, size, lut, output)
+        if data is not None:
+            return {"success": True, "scope": scope, "time": round(timestamp, 3), "data": data}
+
+        try:
+            with self.source_cache.checkout(media_file.storage_key, source_info["etag"]) as source_path:
+                data = self.scope_engine.render(source_path, source_id, timestamp, scope, size, lut, output)
+        except Exception as e:
+            return {"success": False, "error": f"Scope rendering failed: {str(e)}"}
+
+        return {"success": True, "scope": scope, "time": round(timestamp, 3), "data": data}
+
+    def match_shots(self, reference_id: int, media_file_ids: list = None, strength: float = 1.0, size: int = 33):
+        """
+        Casa a cor de cada clip com o clip de referência (padrão: todos os clips do projeto da referência).
+        Estatísticas de cor já medidas (file_metadata["color_stats"], por ETag) não são recalculadas;
+        cada correção vira um .cube no cache de LUTs assadas, registrado em file_metadata["shot_match"]
+        """
+        reference = MediaFile.query.get(reference_id)
+        if not reference:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        if media_file_ids:
+            clips = MediaFile.query.filter(MediaFile.id.in_(media_file_ids)).all()
+            missing = set(media_file_ids) - {clip.id for clip in clips}
+            if missing:
+                return {"success": False, "error": f"MediaFile not found: {sorted(missing)}", "status": 404}
+        else:
+            clips = MediaFile.query.filter_by(project_id=reference.project_id).all()
+        clips = [clip for clip in clips if clip.id != reference.id]
+        if len(clips) > self.MAX_MATCH_CLIPS:
+            return {"success": False, "error": f"Too many clips (max {self.MAX_MATCH_CLIPS})", "status": 400}
+
+        measured = self._color_statistics([reference] + clips)
+        if reference.id in measured["errors"]:
+            return {"success": False, "error": f"Reference analysis failed: {measured['errors'][reference.id]}"}
+
+        baker = get_lut_chain_baker()
+        target = measured["stats"][reference.id]
+        results = []
+        for clip in clips:
+            if clip.id in measured["errors"]:
+                results.append({"media_file_id": clip.id, "success": False, "error": measured["errors"][clip.id]})
+                continue
+
+            correction = ShotMatcher.solve(measured["stats"][clip.id], target, strength)
+            lut_hash = ShotMatcher.correction_hash(correction, size)
+            if not baker.materialize(lut_hash):
+                baker.store(lut_hash, ShotMatcher.bake(correction, size))
+
+            clip.file_metadata = {
+                **(clip.file_metadata or {}),
+                "shot_match": {"reference_id": reference.id, "lut": lut_hash, "strength": strength}
+            }
+            results.append({
+                "media_file_id": clip.id,
+                "success": True,
+                "lut": lut_hash,
+                "download_url": f"/api/grading/luts/baked/{lut_hash}.cube",
+                "cached_stats": clip.id not in measured["measured"],
+            })
+        db.session.commit()
+
+        return {
+            "success": True,
+            "reference_id": reference.id,
+            "matched": sum(1 for result in results if result["success"]),
+            "measured": len(measured["measured"]),
+            "clips": results,
+        }
+
+    def _color_statistics(self, media_files: list):
+        """
+        Estatísticas de cor por MediaFile: as de file_metadata quando a ETag confere,
+        senão mede o clip (download + FFmpeg). A consulta da ETag e a medição rodam
+        no mesmo pool, então clips já medidos custam só HEADs paralelos ao R2
+        """
+        r2_service = self.source_cache.r2_service
+        matcher = ShotMatcher()
+
+        def resolve(storage_key, cached):
+            object_info = r2_service.get_object_info(storage_key)
+            if not object_info["success"]:
+                return None, f"Failed to read source object: {object_info['error']}", False
+            etag = object_info["etag"].strip('"')
+            if ShotMatcher.is_current(cached) and cached.get("etag") == etag:
+                return cached, None, False
+            try:
+                with self.source_cache.checkout(storage_key, etag) as source_path:
+                    return {**matcher.measure(source_path), "etag": etag}, None, True
+            except Exception as e:
+                return None, f"Color analysis failed: {str(e)}", True
+
+        # Atributos lidos aqui: os workers não tocam nos objetos da sessão
+        items = [(media_file.storage_key, (media_file.file_metadata or {}).get("color_stats"))
+                 for media_file in media_files]
+        with ThreadPoolExecutor(max_workers=self.MATCH_WORKERS) as pool:
+            outcomes = list(pool.map(lambda item: resolve(*item), items))
+
+        stats, errors, measured = {}, {}, set()
+        for media_file, (result, error, fresh) in zip(media_files, outcomes):
+            if error:
+                errors[media_file.id] = error
+                continue
+            stats[media_file.id] = result
+            if fresh:
+                measured.add(media_file.id)
+                media_file.file_metadata = {**(media_file.file_metadata or {}), "color_stats": result}
+                media_file.updated_at = datetime.utcnow()
+        if measured:
+            db.session.commit()
+
+        return {"stats": stats, "errors": errors, "measured": measured}
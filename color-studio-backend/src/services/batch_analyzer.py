@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+from src.services.automatic_pricing import AutomaticPricing
+from src.services.video_analyzer import VideoAnalyzer
+
+
+class BatchAnalyzer:
+    """
+    Analisa e precifica muitos clips em paralelo.
+
+    Cada probe é um subprocesso ffprobe (limitado por I/O), então o pool é
+    maior que o número de CPUs, mas limitado para não esgotar processos e
+    conexões. Resultados são entregues na ordem em que terminam.
+    """
+
+    MAX_ITEMS = 500
+
+    def __init__(self, r2_service=None, max_workers: int = None):
+        self.r2_service = r2_service
+        self.max_workers = max_workers or int(os.getenv(
+            'BATCH_ANALYZE_WORKERS', min(16, (os.cpu_count() or 2) * 2)
+        ))
+
+    def run(self, items: List[Dict], project_type: str = 'SDR', is_rush: bool = False) -> Iterator[Dict]:
+        """
+        Gera um resultado por item assim que ele termina e um resumo no final.
+        Cada item é {"path": caminho local} ou {"r2_key": key no R2}.
+        Fechar o gerador (desconexão do stream NDJSON) cancela os itens pendentes.
+        """
+        summary = {'done': True, 'total': len(items), 'succeeded': 0, 'failed': 0, 'total_price': 0.0}
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {
+                pool.submit(self._analyze_item, item, project_type, len(items), is_rush): index
+                for index, item in enumerate(items)
+            }
+            for future in as_completed(futures):
+                result = {'index': futures[future], **future.result()}
+                if result['success']:
+                    summary['succeeded'] += 1
+                    summary['total_price'] += result['pricing']['final_price']
+                else:
+                    summary['failed'] += 1
+                yield result
+        finally:
+            # Cliente desconectado (GeneratorExit no yield): descarta os probes ainda na fila
+            # em vez de esperar o lote inteiro; os que já rodam terminam em background
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        summary['total_price'] = round(summary['total_price'], 2)
+        yield summary
+
+    def _analyze_item(self, item: Dict, project_type: str, num_clips: int, is_rush: bool) -> Dict:
+        """Analisa um clip e calcula seu preço (com o desconto de volume do lote)"""
+        source = item.get('r2_key') or item.get('path')
+        try:
+            if item.get('r2_key'):
+                analysis = VideoAnalyzer.analyze_remote(item['r2_key'], self.r2_service)
+            else:
+                analysis = VideoAnalyzer.analyze_video(item['path'])
+
+            pricing = AutomaticPricing.calculate_price(
+                duration_seconds=analysis['duration'],
+                codec=analysis['codec'],
+                resolution=analysis['resolution'],
+                project_type=project_type,
+                num_clips=num_clips,
+                is_rush=is_rush
+            )
+            return {'success': True, 'source': source, 'analysis': analysis, 'pricing': pricing}
+        except Exception as e:
+            return {'success': False, 'source': source, 'error': str(e)}
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class BatchRenderScheduler:
+    """
+    Fila de renders em lote: um job por MediaFile executado em um pool fixo
+    de workers, com divisão justa entre clientes (tenants).
+
+    Cada cliente tem sua fila (FIFO entre os seus lotes). Um worker livre
+    pega o próximo job do cliente com menos jobs rodando (empate: o atendido
+    há mais tempo), então um lote de 500 clips de um cliente não segura o
+    lote de 3 clips de outro: com N clientes ativos, cada um fica com ~1/N
+    dos workers. Progresso e throughput são agregados por lote.
+    """
+
+    MAX_FINISHED_BATCHES = 200  # lotes concluídos mantidos para consulta
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(os.getenv('BATCH_RENDER_WORKERS', 2))
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queues: Dict[str, Deque[Tuple[str, Dict, Callable]]] = {}
+        self._running: Dict[str, int] = {}
+        self._last_served: Dict[str, float] = {}
+        self._batches: "OrderedDict[str, Dict]" = OrderedDict()
+        self._workers: List[threading.Thread] = []
+
+    def submit(self, tenant: str, items: List[Dict], run: Callable[[Dict], Dict], **info) -> Dict:
+        """
+        Enfileira um lote. items: [{"media_file_id": 1}, ...]; run(item) executa
+        o render de um item (no worker) e retorna o dict de resultado do serviço.
+        info entra no resumo do lote (projeto, look, saída)
+        """
+        batch_id = uuid.uuid4().hex
+        batch = {
+            'id': batch_id,
+            'tenant': tenant,
+            **info,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'jobs': OrderedDict((item['media_file_id'], {'media_file_id': item['media_file_id'], 'status': 'queued'})
+                                for item in items),
+        }
+
+        with self._wakeup:
+            self._batches[batch_id] = batch
+            queue = self._queues.setdefault(tenant, deque())
+            for item in items:
+                queue.append((batch_id, item, run))
+            self._ensure_workers()
+            self._wakeup.notify_all()
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """Resumo do lote: progresso agregado, throughput e o estado de cada job"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            snapshot = self._snapshot(batch)
+        return self._summarize(*snapshot)
+
+    def cancel(self, batch_id: str) -> Optional[Dict]:
+        """
+        Remove da fila os jobs ainda não iniciados do lote (os que estão rodando terminam).
+        Retorna o resumo do lote já cancelado, ou None se o lote não existe
+        """
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            queue = self._queues.get(batch['tenant'], deque())
+            self._queues[batch['tenant']] = deque(job for job in queue if job[0] != batch_id)
+            for job in batch['jobs'].values():
+                if job['status'] == 'queued':
+                    job['status'] = 'cancelled'
+            self._finish_if_done(batch)
+            # Resumo do próprio objeto: o lote fechado pode ter saído do histórico
+            snapshot = self._snapshot(batch)
+        return self._summarize(*snapshot)
+
+    @staticmethod
+    def _snapshot(batch: Dict) -> Tuple[Dict, List[Dict]]:
+        """Cópia do lote e dos seus jobs (chamado com o lock)"""
+        summary = {key: value for key, value in batch.items() if key != 'jobs'}
+        return summary, [dict(job) for job in batch['jobs'].values()]
+
+    @staticmethod
+    def _summarize(summary: Dict, jobs: List[Dict]) -> Dict:
+        counts = {status: 0 for status in ('queued', 'running', 'completed', 'failed', 'cancelled')}
+        for job in jobs:
+            counts[job['status']] += 1
+        finished = counts['completed'] + counts['failed'] + counts['cancelled']
+
+        elapsed = None
+        if summary['started_at']:
+            elapsed = (summary['finished_at'] or time.time()) - summary['started_at']
+        media_seconds = sum(job.get('media_seconds') or 0.0 for job in jobs if job['status'] == 'completed')
+
+        return {
+            **summary,
+            **counts,
+            'total': len(jobs),
+            'progress': round(finished / len(jobs), 4) if jobs else 1.0,
+            'cache_hits': sum(1 for job in jobs if job.get('cache') == 'hit'),
+            'elapsed_s': round(elapsed, 2) if elapsed is not None else None,
+            'throughput': {
+                'clips_per_minute': round(counts['completed'] / elapsed * 60, 2) if elapsed else None,
+                # segundos de mídia renderizados por segundo de relógio (1.0 = tempo real)
+                'realtime_factor': round(media_seconds / elapsed, 2) if elapsed else None,
+            },
+            'jobs': jobs,
+        }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'queued': {tenant: len(queue) for tenant, queue in self._queues.items() if queue},
+                'running': {tenant: count for tenant, count in self._running.items() if count},
+                'batches': len(self._batches),
+            }
+
+    def _ensure_workers(self):
+        """Sobe o pool na primeira submissão (chamado com o lock)"""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"batch-render-{len(self._workers)}",
+                                      daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self) -> Optional[Tuple[str, str, Dict, Callable]]:
+        """Próximo job pela divisão justa (chamado com o lock)"""
+        candidates = [tenant for tenant, queue in self._queues.items() if queue]
+        if not candidates:
+            return None
+        tenant = min(candidates, key=lambda t: (self._running.get(t, 0), self._last_served.get(t, 0.0)))
+        batch_id, item, run = self._queues[tenant].popleft()
+        self._running[tenant] = self._running.get(tenant, 0) + 1
+        self._last_served[tenant] = time.monotonic()
+        return tenant, batch_id, item, run
+
+    def _worker_loop(self):
+        while True:
+            with self._wakeup:
+                job = self._next_job()
+                while job is None:
+                    self._wakeup.wait()
+                    job = self._next_job()
+                tenant, batch_id, item, run = job
+                batch = self._batches[batch_id]
+                batch['status'] = 'running'
+                batch['started_at'] = batch['started_at'] or time.time()
+                state = batch['jobs'][item['media_file_id']]
+                state.update({'status': 'running', 'started_at': time.time()})
+
+            try:
+                result = run(item)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            with self._lock:
+                self._running[tenant] -= 1
+                state['duration_s'] = round(time.time() - state.pop('started_at'), 2)
+                if result.get('success'):
+                    state.update({'status': 'completed', 'cache': result.get('cache'),
+                                  'media_seconds': result.get('media_seconds'), 'lut': result.get('lut')})
+                else:
+                    state.update({'status': 'failed', 'error': result.get('error')})
+                self._finish_if_done(batch)
+
+    def _finish_if_done(self, batch: Dict):
+        """Fecha o lote quando nenhum job está na fila ou rodando (chamado com o lock)"""
+        if any(job['status'] in ('queued', 'running') for job in batch['jobs'].values()):
+            return
+        cancelled = any(job['status'] == 'cancelled' for job in batch['jobs'].values())
+        batch['status'] = 'cancelled' if cancelled else 'completed'
+        batch['finished_at'] = batch['finished_at'] or time.time()
+
+        finished = [batch_id for batch_id, other in self._batches.items()
+                    if other['status'] in ('completed', 'cancelled')]
+        for batch_id in finished[:max(0, len(finished) - self.MAX_FINISHED_BATCHES)]:
+            del self._batches[batch_id]
+
+
+_batch_render_scheduler = None
+_batch_render_scheduler_lock = threading.Lock()
+
+
+def get_batch_render_scheduler() -> BatchRenderScheduler:
+    """Retorna o scheduler compartilhado de renders em lote (um pool por processo)"""
+    global _batch_render_scheduler
+    with _batch_render_scheduler_lock:
+        if _batch_render_scheduler is None:
+            _batch_render_scheduler = BatchRenderScheduler()
+        return _batch_render_scheduler
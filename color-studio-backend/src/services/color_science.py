@@ -0,0 +1,316 @@
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from src.services.lut_engine import LUT3D
+
+
+class ColorScience:
+    """
+    Curvas de transferência e conversões de gamut vetorizadas (NumPy).
+
+    Convenção: encode = linear -> sinal (OETF ou EOTF inversa) e
+    decode = sinal -> linear, ambos elemento a elemento sobre arrays de
+    qualquer shape. O linear é relativo à cena (0.18 = cinza médio), exceto
+    PQ (1.0 = 10000 nits) e HLG (luz de cena em [0, 1]); convert() alinha os
+    brancos de referência (BT.2408) ao passar de um espaço para outro.
+    """
+
+    TRANSFERS = ('linear', 'rec709', 'bt1886', 'pq', 'hlg', 'slog3', 'vlog', 'clog3', 'bmdfilm_gen5')
+
+    # Primárias e branco (xy CIE 1931)
+    D65 = (0.3127, 0.3290)
+    PRIMARIES = {
+        'rec709': ((0.640, 0.330), (0.300, 0.600), (0.150, 0.060)),
+        'rec2020': ((0.708, 0.292), (0.170, 0.797), (0.131, 0.046)),
+        'p3d65': ((0.680, 0.320), (0.265, 0.690), (0.150, 0.060)),
+        'sgamut3cine': ((0.766, 0.275), (0.225, 0.800), (0.089, -0.087)),
+        'vgamut': ((0.730, 0.280), (0.165, 0.840), (0.100, -0.030)),
+        'cinemagamut': ((0.740, 0.270), (0.170, 1.140), (0.080, -0.100)),
+        'bmdwg_gen5': ((0.7177215, 0.3171181), (0.2280410, 0.8616809), (0.1005841, -0.0820452)),
+    }
+
+    # Nomes usados pelo LUTManager/VideoAnalyzer -> (primárias, curva)
+    COLOR_SPACES = {
+        'Rec.709': ('rec709', 'rec709'),
+        'Rec.2020': ('rec2020', 'rec709'),
+        'Rec.2020 PQ': ('rec2020', 'pq'),
+        'PQ (HDR10)': ('rec2020', 'pq'),
+        'Dolby Vision': ('rec2020', 'pq'),
+        'Rec.2020 HLG': ('rec2020', 'hlg'),
+        'HLG': ('rec2020', 'hlg'),
+        'S-Gamut3.Cine': ('sgamut3cine', 'slog3'),
+        'V-Gamut': ('vgamut', 'vlog'),
+        'Cinema Gamut': ('cinemagamut', 'clog3'),
+        'BMD Film Gen5': ('bmdwg_gen5', 'bmdfilm_gen5'),
+    }
+
+    # Tags de cor do FFmpeg (setparams / -color_*) para os espaços de entrega
+    FFMPEG_PRIMARIES = {'rec709': 'bt709', 'rec2020': 'bt2020'}
+    FFMPEG_MATRICES = {'rec709': 'bt709', 'rec2020': 'bt2020nc'}
+    FFMPEG_TRANSFERS = {'rec709': 'bt709', 'bt1886': 'bt709', 'pq': 'smpte2084', 'hlg': 'arib-std-b67'}
+
+    # Linear nativo da curva que corresponde ao branco de referência (1.0 relativo)
+    PQ_REFERENCE_WHITE = 203.0  # nits (ITU-R BT.2408)
+    REFERENCE_WHITE = {
+        'pq': PQ_REFERENCE_WHITE / 10000.0,
+        'hlg': 0.26496256,  # luz de cena que o HLG codifica em 75%
+    }
+
+    # Constantes das curvas
+    PQ_M1, PQ_M2 = 2610 / 16384, 2523 / 4096 * 128
+    PQ_C1, PQ_C2, PQ_C3 = 3424 / 4096, 2413 / 4096 * 32, 2392 / 4096 * 32
+    REC709_ALPHA, REC709_BETA = 1.09929682680944, 0.018053968510807  # versão contínua (BT.2020)
+    HLG_A, HLG_B, HLG_C = 0.17883277, 0.28466892, 0.55991073
+    VLOG_CUT, VLOG_B, VLOG_C, VLOG_D = 0.01, 0.00873, 0.241514, 0.598206
+    BMD_A, BMD_B, BMD_C = 0.08692876065491224, 0.005494072432257808, 0.5300133392291939
+    BMD_D, BMD_E, BMD_LIN_CUT = 8.283605932402494, 0.09246575342465753, 0.005
+
+    # ==========================================
+    # CURVAS
+    # ==========================================
+
+    @classmethod
+    def encode(cls, transfer: str, linear: np.ndarray) -> np.ndarray:
+        """Linear -> sinal na curva indicada"""
+        return cls._transfer(transfer, 'encode')(cls._as_float(linear))
+
+    @classmethod
+    def decode(cls, transfer: str, signal: np.ndarray) -> np.ndarray:
+        """Sinal na curva indicada -> linear"""
+        return cls._transfer(transfer, 'decode')(cls._as_float(signal))
+
+    @staticmethod
+    def linear_encode(x):
+        return x
+
+    @staticmethod
+    def linear_decode(y):
+        return y
+
+    @classmethod
+    def rec709_encode(cls, x):
+        """OETF BT.709 (também usada pelo BT.2020 SDR)"""
+        alpha, beta = cls.REC709_ALPHA, cls.REC709_BETA
+        with np.errstate(invalid='ignore'):
+            return np.where(x < beta, 4.5 * x, alpha * np.power(x, 0.45) - (alpha - 1.0)).astype(x.dtype)
+
+    @classmethod
+    def rec709_decode(cls, y):
+        alpha, beta = cls.REC709_ALPHA, cls.REC709_BETA
+        with np.errstate(invalid='ignore'):
+            return np.where(y < 4.5 * beta, y / 4.5, np.power((y + alpha - 1.0) / alpha, 1 / 0.45)).astype(y.dtype)
+
+    @staticmethod
+    def bt1886_encode(x):
+        """EOTF BT.1886 inversa (gamma 2.4, preto em 0)"""
+        return np.power(np.maximum(x, 0.0), 1 / 2.4).astype(x.dtype)
+
+    @staticmethod
+    def bt1886_decode(y):
+        return np.power(np.maximum(y, 0.0), 2.4).astype(y.dtype)
+
+    @classmethod
+    def pq_encode(cls, x):
+        """EOTF SMPTE ST 2084 inversa (x: luz de display / 10000 nits)"""
+        p = np.power(np.clip(x, 0.0, 1.0), cls.PQ_M1)
+        return np.power((cls.PQ_C1 + cls.PQ_C2 * p) / (1.0 + cls.PQ_C3 * p), cls.PQ_M2).astype(x.dtype)
+
+    @classmethod
+    def pq_decode(cls, y):
+        """EOTF SMPTE ST 2084 (resultado em unidades de 10000 nits)"""
+        p = np.power(np.clip(y, 0.0, 1.0), 1.0 / cls.PQ_M2)
+        return np.power(np.maximum(p - cls.PQ_C1, 0.0) / (cls.PQ_C2 - cls.PQ_C3 * p), 1.0 / cls.PQ_M1).astype(y.dtype)
+
+    @classmethod
+    def hlg_encode(cls, x):
+        """OETF ARIB STD-B67 / BT.2100 HLG"""
+        x = np.maximum(x, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_part = cls.HLG_A * np.log(np.maximum(12.0 * x - cls.HLG_B, 1e-12)) + cls.HLG_C
+        return np.where(x <= 1 / 12, np.sqrt(3.0 * x), log_part).astype(x.dtype)
+
+    @classmethod
+    def hlg_decode(cls, y):
+        y = np.maximum(y, 0.0)
+        return np.where(y <= 0.5, y * y / 3.0, (np.exp((y - cls.HLG_C) / cls.HLG_A) + cls.HLG_B) / 12.0).astype(y.dtype)
+
+    @classmethod
+    def hlg_ootf(cls, scene: np.ndarray, peak: float = 1000.0) -> np.ndarray:
+        """OOTF HLG: luz de cena (..., 3) BT.2020 -> nits (gamma 1.2 em display de 1000 nits)"""
+        gamma = 1.2 + 0.42 * np.log10(peak / 1000.0)
+        luminance = scene @ cls.luma_coefficients('rec2020').astype(scene.dtype)
+        return peak * scene * np.power(np.maximum(luminance, 1e-12), gamma - 1.0)[..., None]
+
+    @staticmethod
+    def slog3_encode(x):
+        """Sony S-Log3 (x: refletância de cena, 0.18 = cinza)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_part = (420.0 + np.log10((x + 0.01) / 0.19) * 261.5) / 1023.0
+        return np.where(x >= 0.01125, log_part,
+                        (x * (171.2102946929 - 95.0) / 0.01125 + 95.0) / 1023.0).astype(x.dtype)
+
+    @staticmethod
+    def slog3_decode(y):
+        return np.where(y >= 171.2102946929 / 1023.0,
+                        np.power(10.0, (y * 1023.0 - 420.0) / 261.5) * 0.19 - 0.01,
+                        (y * 1023.0 - 95.0) * 0.01125 / (171.2102946929 - 95.0)).astype(y.dtype)
+
+    @classmethod
+    def vlog_encode(cls, x):
+        """Panasonic V-Log"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_part = cls.VLOG_C * np.log10(x + cls.VLOG_B) + cls.VLOG_D
+        return np.where(x < cls.VLOG_CUT, 5.6 * x + 0.125, log_part).astype(x.dtype)
+
+    @classmethod
+    def vlog_decode(cls, y):
+        return np.where(y < 0.181, (y - 0.125) / 5.6,
+                        np.power(10.0, (y - cls.VLOG_D) / cls.VLOG_C) - cls.VLOG_B).astype(y.dtype)
+
+    @staticmethod
+    def clog3_encode(x):
+        """Canon C-Log3 (x: refletância de cena; a curva usa refletância / 0.9)"""
+        x = x / 0.9
+        with np.errstate(divide='ignore', invalid='ignore'):
+            negative = -0.36726845 * np.log10(-x * 14.98325 + 1.0) + 0.12783901
+            positive = 0.36726845 * np.log10(x * 14.98325 + 1.0) + 0.12240537
+        return np.where(x < -0.014, negative,
+                        np.where(x <= 0.014, 1.9754798 * x + 0.12512219, positive)).astype(x.dtype)
+
+    @staticmethod
+    def clog3_decode(y):
+        x = np.where(y < 0.097465473, -(np.power(10.0, (0.12783901 - y) / 0.36726845) - 1.0) / 14.98325,
+                     np.where(y <= 0.15277891, (y - 0.12512219) / 1.9754798,
+                              (np.power(10.0, (y - 0.12240537) / 0.36726845) - 1.0) / 14.98325))
+        return (x * 0.9).astype(y.dtype)
+
+    @classmethod
+    def bmdfilm_gen5_encode(cls, x):
+        """Blackmagic Film Generation 5"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_part = cls.BMD_A * np.log(x + cls.BMD_B) + cls.BMD_C
+        return np.where(x < cls.BMD_LIN_CUT, cls.BMD_D * x + cls.BMD_E, log_part).astype(x.dtype)
+
+    @classmethod
+    def bmdfilm_gen5_decode(cls, y):
+        log_cut = cls.BMD_D * cls.BMD_LIN_CUT + cls.BMD_E
+        return np.where(y < log_cut, (y - cls.BMD_E) / cls.BMD_D,
+                        np.exp((y - cls.BMD_C) / cls.BMD_A) - cls.BMD_B).astype(y.dtype)
+
+    # ==========================================
+    # GAMUT
+    # ==========================================
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def rgb_to_xyz(primaries: str) -> np.ndarray:
+        """Matriz 3x3 RGB linear -> XYZ a partir das primárias (branco D65)"""
+        if primaries not in ColorScience.PRIMARIES:
+            raise ValueError(f"Primárias desconhecidas: {primaries}")
+
+        def xyz(x, y):
+            return np.array([x / y, 1.0, (1.0 - x - y) / y])
+
+        columns = np.stack([xyz(*xy) for xy in ColorScience.PRIMARIES[primaries]], axis=1)
+        scale = np.linalg.solve(columns, xyz(*ColorScience.D65))
+        matrix = columns * scale
+        matrix.flags.writeable = False
+        return matrix
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def gamut_matrix(source: str, target: str) -> np.ndarray:
+        """Matriz 3x3 RGB linear source -> RGB linear target (float32, somente leitura)"""
+        matrix = (np.linalg.inv(ColorScience.rgb_to_xyz(target)) @ ColorScience.rgb_to_xyz(source)).astype(np.float32)
+        matrix.flags.writeable = False
+        return matrix
+
+    @classmethod
+    def luma_coefficients(cls, primaries: str) -> np.ndarray:
+        """Linha Y da matriz RGB -> XYZ (coeficientes de luminância)"""
+        return cls.rgb_to_xyz(primaries)[1].astype(np.float32)
+
+    # ==========================================
+    # CONVERSÃO ENTRE ESPAÇOS
+    # ==========================================
+
+    @classmethod
+    def resolve(cls, space: Union[str, Tuple[str, str]]) -> Tuple[str, str]:
+        """Nome do espaço (COLOR_SPACES) ou tupla (primárias, curva) -> (primárias, curva)"""
+        if isinstance(space, str):
+            if space not in cls.COLOR_SPACES:
+                raise ValueError(f"Espaço de cor desconhecido: {space}")
+            return cls.COLOR_SPACES[space]
+        primaries, transfer = space
+        if primaries not in cls.PRIMARIES or transfer not in cls.TRANSFERS:
+            raise ValueError(f"Espaço de cor desconhecido: {space}")
+        return primaries, transfer
+
+    @classmethod
+    def convert(cls, rgb: np.ndarray, source, target, clip: bool = False) -> np.ndarray:
+        """
+        RGB (..., 3) no espaço source -> espaço target: decode, ajuste de branco
+        de referência, matriz de primárias e encode. Sem tone mapping: valores
+        acima do pico do destino são cortados apenas com clip=True
+        """
+        source_primaries, source_transfer = cls.resolve(source)
+        target_primaries, target_transfer = cls.resolve(target)
+
+        linear = cls.decode(source_transfer, rgb)
+        scale = cls.REFERENCE_WHITE.get(target_transfer, 1.0) / cls.REFERENCE_WHITE.get(source_transfer, 1.0)
+        if source_primaries != target_primaries:
+            matrix = cls.gamut_matrix(source_primaries, target_primaries) * np.float32(scale)
+            linear = linear @ matrix.T.astype(linear.dtype)
+        elif scale != 1.0:
+            linear = linear * linear.dtype.type(scale)
+
+        result = cls.encode(target_transfer, linear)
+        return np.clip(result, 0.0, 1.0, out=result) if clip else result
+
+    @classmethod
+    def bake_conversion(cls, source, target, size: int = 33, clip: bool = True) -> LUT3D:
+        """Conversão source -> target assada em uma LUT 3D para o LUTEngine / lut3d do FFmpeg"""
+        table = cls.convert(LUT3D.identity(size).table, source, target, clip=clip)
+        return LUT3D(table, title=f"{cls._space_name(source)} to {cls._space_name(target)}")
+
+    @classmethod
+    def ffmpeg_setparams(cls, space) -> Optional[str]:
+        """
+        Filtro setparams que marca os frames com o espaço (primárias, curva e
+        matriz YUV). None para espaços sem tag no FFmpeg (curvas log, gamuts de câmera)
+        """
+        try:
+            primaries, transfer = cls.resolve(space)
+        except (TypeError, ValueError):
+            return None
+        if primaries not in cls.FFMPEG_PRIMARIES or transfer not in cls.FFMPEG_TRANSFERS:
+            return None
+        return (f"setparams=color_primaries={cls.FFMPEG_PRIMARIES[primaries]}"
+                f":color_trc={cls.FFMPEG_TRANSFERS[transfer]}:colorspace={cls.FFMPEG_MATRICES[primaries]}")
+
+    @classmethod
+    def describe(cls) -> Dict:
+        """Curvas, primárias e espaços nomeados suportados"""
+        return {
+            'transfers': list(cls.TRANSFERS),
+            'primaries': list(cls.PRIMARIES),
+            'color_spaces': {name: {'primaries': p, 'transfer': t} for name, (p, t) in cls.COLOR_SPACES.items()},
+        }
+
+    @classmethod
+    def _transfer(cls, transfer: str, direction: str):
+        if transfer not in cls.TRANSFERS:
+            raise ValueError(f"Curva desconhecida: {transfer}")
+        return getattr(cls, f"{transfer}_{direction}")
+
+    @staticmethod
+    def _space_name(space) -> str:
+        return space if isinstance(space, str) else '/'.join(space)
+
+    @staticmethod
+    def _as_float(values) -> np.ndarray:
+        """float32 por padrão; float64 é preservado (referência de precisão)"""
+        values = np.asarray(values)
+        return values if values.dtype in (np.float32, np.float64) else values.astype(np.float32)
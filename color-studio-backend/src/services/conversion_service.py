@@ -1,82 +1,476 @@
 import os
 import subprocess
 import mimetypes
+import threading
+import time
 import uuid
 import json
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
 from src.services.r2_upload_service import R2UploadService
+from src.services.transcode_cache import TranscodeResultCache, get_transcode_cache
+from src.services.source_cache import get_source_cache
+from src.services.hls_packager import HLSPackager
+from src.services.jit_segmenter import get_jit_segmenter
+from src.services.keyframe_index import get_keyframe_indexer
+from src.services.batch_render import get_batch_render_scheduler
+from src.services.lut_chain import get_lut_chain_baker
+from src.services.lut_engine import LUTEngine
+from src.services.lut_manager import LUTManager
+from src.services.scene_detector import SceneDetector
+from src.services.color_science import ColorScience
+from src.services.tone_mapping import ToneMapper
+from src.services.video_analyzer import VideoAnalyzer
+from src.services.metrics import metrics
 from src.models.media_file import MediaFile
-from src.models.project import db
+from src.models.project import db, Project
 from datetime import datetime
 
 class ConversionService:
     def __init__(self):
         self.r2_service = R2UploadService()
+        self.result_cache = get_transcode_cache()
+        self.source_cache = get_source_cache()
+        self.packager = HLSPackager(self.r2_service)
+        self.jit_segmenter = get_jit_segmenter()
+        self.keyframe_indexer = get_keyframe_indexer()
+        self.lut_baker = get_lut_chain_baker()
 
-    def create_proxy(self, media_file_id: int, project_id: int, original_file_key: str, output_format: str = "mp4"):
+    # Preview rápido (fase 1 do proxy): primeiros N segundos em baixa resolução + stills
+    PREVIEW_LADDER = [{'name': 'preview', 'width': 640, 'maxrate': '700k', 'bufsize': '1400k'}]
+    PREVIEW_SECONDS = int(os.getenv('PREVIEW_SECONDS', 20))
+    PREVIEW_STILLS = int(os.getenv('PREVIEW_STILLS', 8))
+
+    PROXY_SETTINGS = {"codec": "h264", "crf": 28, "preset": "fast"}
+
+    def create_proxy(self, media_file_id: int, project_id: int, original_file_key: str, dash: bool = False,
+                     preview_first: bool = False, apply_lut: bool = True, tone_map: str = None):
         media_file = MediaFile.query.get(media_file_id)
         if not media_file:
             return {"success": False, "error": "MediaFile not found"}
 
-        # 1. Baixar o arquivo original do R2
-        download_url_response = self.r2_service.generate_presigned_url(original_file_key)
-        if not download_url_response["success"]:
-            return {"success": False, "error": f"Failed to get presigned URL: {download_url_response['error']}"}
-        download_url = download_url_response["url"]
+        # Grade do projeto (primárias, LUT e tone mapping HDR -> SDR, se pedido) aplicada no mesmo pass de encode
+        # (lut3d antes do split da escada)
+        grade = self._resolve_grade((project_id or media_file.project_id) if apply_lut else None, media_file, tone_map)
+        if not grade["success"]:
+            return grade
+        lut = grade["lut"]
+
+        # Identidade da fonte (key + ETag) para o cache de resultados
+        source_info = self.r2_service.get_object_info(original_file_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+
+        cache_key = self._proxy_cache_key(original_file_key, source_info["etag"], dash, lut)
+
+        # Preview primeiro, a menos que o proxy completo já esteja pronto no cache
+        if preview_first and self.result_cache.get(cache_key) is None:
+            return self._create_preview_first(media_file, project_id, original_file_key, source_info["etag"], dash,
+                                              lut, apply_lut, tone_map)
+
+        return self._render_full_proxy(media_file, original_file_key, source_info["etag"], cache_key, dash, lut)
+
+    def render_proxy(self, media_file, lut: dict = None, dash: bool = False):
+        """Proxy completo de um MediaFile com uma grade já resolvida (lut: {id, hash, path} ou None)"""
+        source_info = self.r2_service.get_object_info(media_file.storage_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+
+        cache_key = self._proxy_cache_key(media_file.storage_key, source_info["etag"], dash, lut)
+        return self._render_full_proxy(media_file, media_file.storage_key, source_info["etag"], cache_key, dash, lut)
+
+    def _render_full_proxy(self, media_file, original_file_key: str, source_etag: str, cache_key: str, dash: bool,
+                           lut: dict = None):
+        """Proxy completo via cache de resultados (encode só em miss) e registro no MediaFile"""
+        media_file_id = media_file.id
+        started = time.time()
+        result, cache_status = self.result_cache.get_or_run(
+            cache_key,
+            lambda: self._encode_proxy(media_file_id, original_file_key, source_etag, cache_key[:32],
+                                       self.PROXY_SETTINGS, dash, lut)
+        )
+        if not result["success"]:
+            return result
+        if cache_status == "miss":
+            metrics.observe("proxy.full_encode_s", time.time() - started)
+
+        # 4. Atualizar MediaFile com o proxy (também em hits do cache)
+        media_file.proxy_file_key = result["proxy_key"]
+        media_file.proxy_stream_url = result["proxy_url"]
+        media_file.proxy_status = "completed"
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {**result, "status": "completed", "cache": cache_status, "lut": lut["id"] if lut else None}
+
+    def _proxy_cache_key(self, original_file_key: str, source_etag: str, dash: bool, lut: dict = None) -> str:
+        """Chave do cache de resultados para o proxy completo"""
+        params = TranscodeResultCache.normalize_params(
+            **self.PROXY_SETTINGS,
+            scale=",".join(f"{r['name']}:{r['width']}" for r in HLSPackager.PROXY_LADDER),
+            lut=self._lut_key(lut),
+            package="hls-cmaf", dash=dash, audio_bitrate="128k"
+        )
+        return TranscodeResultCache.make_key(original_file_key, source_etag, params)
+
+    @staticmethod
+    def _lut_filter(lut: dict = None):
+        """
+        lut3d da grade resolvida seguido de setparams com o espaço de saída: sem as
+        tags, o FFmpeg repassa as da fonte (um proxy tone mapped sairia marcado
+        como PQ/BT.2020 e convertido para YUV com a matriz BT.2020)
+        """
+        if not lut:
+            return None
+        video_filter = LUTEngine.ffmpeg_filter(lut["path"])
+        tags = ColorScience.ffmpeg_setparams(lut.get("output_space")) if lut.get("output_space") else None
+        return f"{video_filter},{tags}" if tags else video_filter
+
+    @staticmethod
+    def _lut_key(lut: dict = None):
+        """Identidade da grade no cache de transcodes (conteúdo da LUT + tags de saída)"""
+        if not lut:
+            return None
+        return f"{lut['hash']}:{lut['output_space']}" if lut.get("output_space") else lut["hash"]
+
+    def _resolve_grade(self, project_id: int, media_file=None, tone_map: str = None):
+        """
+        Grade do projeto como um único .cube para o lut3d do FFmpeg: primárias
+        (grade_params), LUT selecionada e, com tone_map (operador do ToneMapper),
+        tone mapping HDR -> SDR. Só a LUT é materializada como está; mais de um
+        passo vira uma cadeia assada em uma LUT 3D, então o custo por frame
+        continua sendo uma consulta. lut é None quando não há nada a aplicar
+        """
+        if tone_map and tone_map not in ToneMapper.OPERATORS:
+            return {"success": False, "error": f"Unknown tone mapping operator: {tone_map}"}
+
+        project = Project.query.get(project_id) if project_id else None
+        lut_ref = project.selected_lut if project else None
+        grade_params = project.grade_params if project else None
+        lut = self.lut_baker.materialize(lut_ref) if lut_ref else None
+        if lut_ref and lut is None:
+            return {"success": False, "error": f"Selected LUT not found: {lut_ref}", "status": 404}
+
+        chain, labels = [], []
+        output_space = lut["output_space"] if lut else None
+        if grade_params:
+            chain.append({"type": "grade", "params": grade_params})
+            labels.append("grade")
+        if lut:
+            chain.append({"type": "lut", "id": lut_ref})
+            labels.append(lut_ref)
+        if tone_map:
+            try:
+                tone_map_step = self._tone_map_step(lut_ref, media_file, tone_map)
+            except Exception as e:
+                return {"success": False, "error": f"Failed to analyze source for tone mapping: {str(e)}"}
+            if tone_map_step is not None:  # None: a saída já é SDR
+                chain.append(tone_map_step)
+                labels = (labels or ["source"]) + [tone_map]
+                output_space = ToneMapper.OUTPUT_SPACE
+
+        if len(chain) == (1 if lut else 0):
+            return {"success": True, "lut": lut}
+        try:
+            baked = self.lut_baker.bake(chain, size=65, with_accuracy=False)
+        except ValueError as e:
+            return {"success": False, "error": f"Grade baking failed: {str(e)}"}
+        return {"success": True, "lut": {
+            "id": "+".join(labels),
+            "hash": baked["hash"],
+            "path": os.path.abspath(baked["path"]),
+            "output_space": output_space,
+        }}
+
+    def resolve_look(self, lut_ref: str = None, grade_params: dict = None):
+        """
+        Look explícito (LUT da biblioteca ou cadeia assada e/ou primárias) como um
+        único .cube, resolvido uma vez e compartilhado pelos clips de um lote
+        """
+        if not lut_ref and not grade_params:
+            return {"success": False, "error": "lut_id or grade_params is required", "status": 400}
+        if lut_ref is not None and not isinstance(lut_ref, str):
+            return {"success": False, "error": "lut_id must be a string", "status": 400}
+        if not grade_params:
+            lut = self.lut_baker.materialize(lut_ref)
+            if lut is None:
+                return {"success": False, "error": f"LUT not found: {lut_ref}", "status": 404}
+            return {"success": True, "lut": lut}
+
+        chain = [{"type": "grade", "params": grade_params}]
+        if lut_ref:
+            chain.append({"type": "lut", "id": lut_ref})
+        try:
+            baked = self.lut_baker.bake(chain, size=65, with_accuracy=False)
+        except ValueError as e:
+            return {"success": False, "error": str(e), "status": 400}
+        library_lut = LUTManager.get_lut_by_id(lut_ref) if lut_ref else None
+        return {"success": True, "lut": {
+            "id": "+".join(["grade"] + ([lut_ref] if lut_ref else [])),
+            "hash": baked["hash"],
+            "path": os.path.abspath(baked["path"]),
+            "output_space": library_lut.get("output_space") if library_lut else None,
+        }}
+
+    # Saídas do render em lote
+    BATCH_OUTPUTS = ("proxy", "h265")
+
+    def start_batch_render(self, project_id: int, lut_id: str = None, grade_params: dict = None,
+                           output: str = "proxy", quality: str = "high", dash: bool = False):
+        """
+        Aplica um look a todos os clips do projeto: um job por MediaFile no pool do
+        BatchRenderScheduler, com divisão justa entre clientes. O look é assado uma
+        vez; fontes e resultados vêm dos caches (source cache, cache de transcodes)
+        """
+        if output not in self.BATCH_OUTPUTS:
+            return {"success": False, "error": f"output must be one of {', '.join(self.BATCH_OUTPUTS)}", "status": 400}
+
+        project = Project.query.get(project_id)
+        if not project:
+            return {"success": False, "error": "Project not found", "status": 404}
+        media_files = MediaFile.query.filter_by(project_id=project_id).all()
+        if not media_files:
+            return {"success": False, "error": "Project has no media files", "status": 400}
+
+        look = self.resolve_look(lut_id, grade_params)
+        if not look["success"]:
+            return look
+        lut = look["lut"]
 
-        # Criar diretório temporário para download e conversão
-        temp_dir = f"/tmp/conversion_{media_file_id}"
+        app = current_app._get_current_object()
+
+        def run(item):
+            with app.app_context():
+                media_file = MediaFile.query.get(item["media_file_id"])
+                if not media_file:
+                    return {"success": False, "error": "MediaFile not found"}
+                if output == "h265":
+                    result = self.render_h265(media_file, lut, quality=quality, dash=dash)
+                else:
+                    result = self.render_proxy(media_file, lut, dash=dash)
+                if result["success"]:
+                    result["media_seconds"] = self._media_seconds(media_file)
+                return result
+
+        batch = get_batch_render_scheduler().submit(
+            project.client_email,
+            [{"media_file_id": media_file.id} for media_file in media_files],
+            run,
+            project_id=project_id, lut=lut["id"], output=output
+        )
+        return {"success": True, **batch}
+
+    def _media_seconds(self, media_file):
+        """Duração da fonte para o throughput do lote (probe remoto cacheado; None se falhar)"""
+        try:
+            return VideoAnalyzer.analyze_remote(media_file.storage_key, self.r2_service)["duration"]
+        except Exception:
+            return None
+
+    def _tone_map_step(self, lut_ref: str, media_file, operator: str):
+        """
+        Passo tonemap da cadeia: parte do espaço de saída da LUT (entregas HDR10/HLG)
+        ou, sem LUT de biblioteca, da curva da própria fonte. None quando o sinal já é SDR.
+        O pico é estático (o maior entre as cenas) para caber em uma LUT só; os
+        picos por cena ficam para os stills (LUTPreviewService.render_tone_mapped)
+        """
+        if lut_ref:
+            library_lut = LUTManager.get_lut_by_id(lut_ref)
+            if not library_lut:
+                return None  # cadeia já assada: a saída é usada como está
+            space = library_lut.get("output_space")
+            try:
+                transfer = ColorScience.resolve(space)[1]
+            except (TypeError, ValueError):
+                return None
+            if transfer not in ToneMapper.TRANSFERS:
+                return None
+            return {"type": "tonemap", "operator": operator, "source": space, "peak": ToneMapper.DEFAULT_SOURCE_PEAK}
+
+        metadata = media_file.file_metadata or {}
+        transfer = (metadata.get("frame_stats") or {}).get("transfer")
+        if not transfer:
+            analysis = VideoAnalyzer.analyze_remote(media_file.storage_key, self.r2_service)
+            transfer = ToneMapper.transfer_from_gamma(analysis.get("gamma"))
+        space = ToneMapper.hdr_space(transfer)
+        if space is None:
+            return None
+        peak = max(scene["peak"] for scene in ToneMapper.scene_peaks(metadata))
+        return {"type": "tonemap", "operator": operator, "source": space, "peak": peak}
+
+    def _create_preview_first(self, media_file, project_id: int, original_file_key: str, source_etag: str, dash: bool,
+                              lut: dict = None, apply_lut: bool = True, tone_map: str = None):
+        """
+        Fase 1: publica um preview ultrarrápido e retorna imediatamente.
+        Fase 2: o proxy completo é codificado em background e substitui o preview.
+        """
+        started = time.time()
+        params = TranscodeResultCache.normalize_params(
+            codec="h264", crf=32, preset="ultrafast",
+            scale=",".join(f"{r['name']}:{r['width']}" for r in self.PREVIEW_LADDER),
+            lut=self._lut_key(lut),
+            package="hls-preview", duration=self.PREVIEW_SECONDS, stills=self.PREVIEW_STILLS
+        )
+        cache_key = TranscodeResultCache.make_key(original_file_key, source_etag, params)
+
+        result, cache_status = self.result_cache.get_or_run(
+            cache_key,
+            lambda: self._encode_preview(media_file.id, original_file_key, source_etag, cache_key[:32], lut)
+        )
+        if not result["success"]:
+            return result
+
+        time_to_first_preview = time.time() - started
+        metrics.observe("proxy.time_to_first_preview_s", time_to_first_preview)
+
+        media_file.proxy_stream_url = result["preview_url"]
+        media_file.proxy_status = "preview"
+        preview = {k: v for k, v in result.items() if k != "success"}
+        media_file.file_metadata = {**(media_file.file_metadata or {}), "preview": preview}
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        # Fase 2 em background (em produção, uma fila de tarefas)
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=self._finish_proxy_in_background,
+            args=(app, media_file.id, project_id, original_file_key, dash, started, apply_lut, tone_map),
+            daemon=True
+        ).start()
+
+        return {
+            **result,
+            "status": "preview",
+            "time_to_first_preview": round(time_to_first_preview, 3),
+            "cache": cache_status
+        }
+
+    def _finish_proxy_in_background(self, app, media_file_id: int, project_id: int, original_file_key: str,
+                                    dash: bool, started: float, apply_lut: bool = True, tone_map: str = None):
+        """Codifica o proxy completo e troca o preview por ele"""
+        with app.app_context():
+            result = self.create_proxy(media_file_id, project_id, original_file_key, dash=dash, apply_lut=apply_lut,
+                                       tone_map=tone_map)
+            if result["success"]:
+                metrics.observe("proxy.time_to_full_proxy_s", time.time() - started)
+                print(f"✅ Proxy completo disponível para MediaFile {media_file_id}")
+                return
+
+            print(f"❌ Falha no proxy completo de MediaFile {media_file_id}: {result['error']}")
+            media_file = MediaFile.query.get(media_file_id)
+            if media_file:
+                media_file.proxy_status = "failed"
+                db.session.commit()
+
+    def _encode_preview(self, media_file_id: int, original_file_key: str, source_etag: str, package_id: str,
+                        lut: dict = None):
+        """Preview ultrafast dos primeiros segundos + stills de keyframes espaçados"""
+        video_filter = self._lut_filter(lut)
+        temp_dir = f"/tmp/preview_{media_file_id}_{package_id}"
         os.makedirs(temp_dir, exist_ok=True)
-        original_path = os.path.join(temp_dir, f"original_{media_file_id}.{media_file.get_file_extension(original_file_key)}")
 
         try:
-            # Baixar o arquivo
-            if self.r2_service.is_test_mode():
-                print(f"🧪 [TEST MODE] Simulando download de {download_url} para {original_path}")
-                with open(original_path, "w") as f:
-                    f.write("dummy video content") # Criar um arquivo dummy
-            else:
-                subprocess.run(["wget", "-O", original_path, download_url], check=True)
-
-            # 2. Converter para proxy (ex: MP4 H.264)
-            proxy_filename = f"proxy_{media_file_id}.{output_format}"
-            proxy_path = os.path.join(temp_dir, proxy_filename)
-
-            # Exemplo de comando FFmpeg para proxy de baixa resolução
-            # Adapte conforme a necessidade (resolução, bitrate, codec)
-            ffmpeg_command = [
-                "ffmpeg",
-                "-i", original_path,
-                "-vf", "scale=1280:-1",  # Reduzir para 1280 de largura, altura automática
-                "-c:v", "libx264",
-                "-preset", "fast",
-                "-crf", "28",
-                "-c:a", "aac",
-                "-b:a", "128k",
-                "-y", # Sobrescrever se existir
-                proxy_path
-            ]
-            subprocess.run(ffmpeg_command, check=True)
-
-            # 3. Fazer upload do proxy para o Cloudflare Stream
-            # (Aqui você precisaria de um serviço de upload para o Cloudflare Stream)
-            # Por simplicidade, vamos simular o upload e gerar uma URL de stream fictícia
-            stream_uid = f"cf_stream_uid_{uuid.uuid4()}"
-            stream_url = f"https://customer-stream.cloudflarestream.com/{stream_uid}/manifest/video.m3u8"
-
-            # 4. Atualizar MediaFile com o proxy
-            media_file.proxy_file_key = proxy_filename  # Adicionar este campo ao modelo MediaFile
-            media_file.proxy_stream_url = stream_url    # Adicionar este campo ao modelo MediaFile
-            media_file.updated_at = datetime.utcnow() # Adicionar este campo ao modelo MediaFile
-            db.session.commit()
-
-            return {"success": True, "proxy_url": stream_url, "proxy_key": proxy_filename}
+            with self.source_cache.checkout(original_file_key, source_etag) as original_path:
+                self.packager.package(
+                    original_path, temp_dir, self.PREVIEW_LADDER,
+                    codec="h264", crf=32, preset="ultrafast", audio_bitrate="64k",
+                    max_duration=self.PREVIEW_SECONDS, video_filter=video_filter
+                )
+                stills = self._extract_stills(original_path, os.path.join(temp_dir, "stills"), self.PREVIEW_STILLS,
+                                              video_filter=video_filter)
+
+            upload_result = self.packager.upload(temp_dir, package_id)
+            if not upload_result["success"]:
+                return upload_result
+
+            return {
+                "success": True,
+                "preview_url": HLSPackager.package_url(package_id),
+                "preview_key": HLSPackager.package_prefix(package_id),
+                "preview_seconds": self.PREVIEW_SECONDS,
+                "stills": [HLSPackager.package_url(package_id, f"stills/{name}") for name in stills]
+            }
 
         except subprocess.CalledProcessError as e:
-            return {"success": False, "error": f"FFmpeg/Wget error: {e.stderr.decode()}"}
+            return {"success": False, "error": f"FFmpeg error: {e.stderr.decode(errors='replace')[-2000:] if e.stderr else e}"}
         except Exception as e:
             return {"success": False, "error": str(e)}
         finally:
-            # Limpar arquivos temporários
+            if os.path.exists(temp_dir):
+                subprocess.run(["rm", "-rf", temp_dir])
+
+    def _extract_stills(self, source_path: str, out_dir: str, count: int, width: int = 320,
+                        video_filter: str = None) -> list:
+        """Extrai stills em keyframes uniformemente espaçados (seek rápido, só keyframes decodificados)"""
+        os.makedirs(out_dir, exist_ok=True)
+        filters = f"{video_filter},scale={width}:-2" if video_filter else f"scale={width}:-2"
+        duration = self._probe_duration(source_path)
+        timestamps = [duration * (i + 0.5) / count for i in range(count)] if duration > 0 else [0.0]
+
+        def extract(index_and_time):
+            index, timestamp = index_and_time
+            name = f"still_{index:03d}.jpg"
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-ss", f"{timestamp:.3f}", "-skip_frame", "nokey",
+                "-i", source_path,
+                "-frames:v", "1", "-vf", filters, "-q:v", "4",
+                os.path.join(out_dir, name)
+            ], check=True, capture_output=True)
+            return name
+
+        with ThreadPoolExecutor(max_workers=min(4, len(timestamps))) as executor:
+            return list(executor.map(extract, enumerate(timestamps)))
+
+    @staticmethod
+    def _probe_duration(source_path: str) -> float:
+        """Duração do container em segundos (0 se desconhecida)"""
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", source_path],
+            capture_output=True, text=True
+        )
+        try:
+            return float(result.stdout.strip())
+        except ValueError:
+            return 0.0
+
+    def _encode_proxy(self, media_file_id: int, original_file_key: str, source_etag: str, package_id: str,
+                      settings: dict, dash: bool, lut: dict = None):
+        """Gera o pacote HLS do proxy a partir da fonte em cache local (executado apenas em miss do cache)"""
+        # Criar diretório temporário para o packaging
+        temp_dir = f"/tmp/conversion_{media_file_id}_{package_id}"
+        os.makedirs(temp_dir, exist_ok=True)
+
+        try:
+            # 1. Obter o arquivo original (cache local de fontes, baixa do R2 em miss)
+            with self.source_cache.checkout(original_file_key, source_etag) as original_path:
+                # 2. Um encode -> escada de renditions H.264 em HLS fMP4/CMAF
+                package = self.packager.package(
+                    original_path, temp_dir, HLSPackager.PROXY_LADDER,
+                    codec=settings["codec"], crf=settings["crf"], preset=settings["preset"],
+                    audio_bitrate="128k", dash=dash,
+                    video_filter=self._lut_filter(lut)
+                )
+
+            # 3. Enviar o pacote para o R2 (servido por /api/conversion/packages/...)
+            upload_result = self.packager.upload(temp_dir, package_id)
+            if not upload_result["success"]:
+                return upload_result
+
+            return {
+                "success": True,
+                "proxy_url": HLSPackager.package_url(package_id),
+                "proxy_key": HLSPackager.package_prefix(package_id),
+                "dash_url": HLSPackager.package_url(package_id, package["dash_manifest"]) if dash else None,
+                "renditions": package["renditions"]
+            }
+
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFmpeg error: {e.stderr.decode(errors='replace')[-2000:] if e.stderr else e}"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            # Limpar arquivos temporários (a fonte permanece no cache)
             if os.path.exists(temp_dir):
                 subprocess.run(["rm", "-rf", temp_dir])
 
@@ -86,9 +480,101 @@ class ConversionService:
             return {"success": False, "error": "MediaFile not found"}
 
         if media_file.proxy_stream_url:
-            return {"success": True, "status": "completed", "proxy_url": media_file.proxy_stream_url}
+            return {
+                "success": True,
+                "status": media_file.proxy_status or "completed",
+                "proxy_url": media_file.proxy_stream_url,
+                "preview": (media_file.file_metadata or {}).get("preview")
+            }
         else:
-            return {"success": True, "status": "pending"}
+            return {"success": True, "status": media_file.proxy_status or "pending"}
+
+    def get_jit_playlist(self, media_file_id: int, rendition: str = None):
+        """
+        Playlist HLS sob demanda: master (rendition=None) ou playlist da rendition.
+        Os segmentos só são transcodificados quando requisitados.
+        """
+        source = self._get_jit_source(media_file_id)
+        if not source["success"]:
+            return source
+
+        try:
+            if rendition is None:
+                playlist = self.jit_segmenter.master_playlist()
+            else:
+                playlist = self.jit_segmenter.media_playlist(source["storage_key"], source["etag"], rendition,
+                                                             source["cuts"])
+            return {"success": True, "playlist": playlist}
+        except ValueError as e:
+            return {"success": False, "error": str(e), "status": 404}
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFprobe error: {e.stderr}"}
+
+    def get_jit_segment(self, media_file_id: int, rendition: str, index: int):
+        """Segmento HLS sob demanda (cacheado em disco, com prefetch dos próximos)"""
+        source = self._get_jit_source(media_file_id)
+        if not source["success"]:
+            return source
+
+        try:
+            data = self.jit_segmenter.get_segment(source["storage_key"], source["etag"], rendition, index,
+                                                  source["cuts"])
+            return {"success": True, "data": data}
+        except IndexError as e:
+            return {"success": False, "error": str(e), "status": 404}
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFmpeg error: {e.stderr}"}
+
+    def build_keyframe_index(self, media_file_id: int):
+        """
+        Indexa os keyframes do MediaFile (uma vez por versão da fonte)
+        e registra o resumo em file_metadata
+        """
+        source = self._get_jit_source(media_file_id)
+        if not source["success"]:
+            return source
+
+        try:
+            index = self.keyframe_indexer.get_index(source["storage_key"], source["etag"])
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFprobe error: {e.stderr}"}
+
+        summary = index.get_summary()
+        media_file = MediaFile.query.get(media_file_id)
+        media_file.file_metadata = {**(media_file.file_metadata or {}), "keyframe_index": summary}
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {"success": True, **summary}
+
+    def lookup_keyframe(self, media_file_id: int, timestamp: float, nearest: bool = False):
+        """Keyframe para um instante (em ou antes dele, ou o mais próximo) e a faixa de bytes do GOP"""
+        source = self._get_jit_source(media_file_id)
+        if not source["success"]:
+            return source
+
+        try:
+            index = self.keyframe_indexer.get_index(source["storage_key"], source["etag"])
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFprobe error: {e.stderr}"}
+
+        keyframe = index.nearest(timestamp) if nearest else index.lookup(timestamp)
+        if keyframe is None:
+            return {"success": False, "error": "No keyframes found", "status": 404}
+        return {"success": True, "keyframe": keyframe}
+
+    def _get_jit_source(self, media_file_id: int):
+        """Chave e ETag da fonte (a ETag versiona playlists e segmentos em cache) e os cortes de cena detectados"""
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        source_info = self.r2_service.get_object_info(media_file.storage_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+
+        return {"success": True, "storage_key": media_file.storage_key, "etag": source_info["etag"],
+                "cuts": SceneDetector.cut_times(media_file.file_metadata)}
 
     def get_media_metadata(self, file_key: str):
         """
@@ -103,89 +589,96 @@ class ConversionService:
             "bitrate": "10Mbps"
         }
 
-    def start_h265_conversion(self, media_file_id: int, output_format: str = "h265", quality: str = "high"):
+    # Master H.265 em rendition única na resolução original
+    H265_MASTER_LADDER = [{'name': 'master', 'width': None}]
+
+    # Qualidade -> parâmetros do libx265
+    H265_QUALITY_SETTINGS = {
+        "low": {"crf": "32", "preset": "fast"},
+        "medium": {"crf": "28", "preset": "medium"},
+        "high": {"crf": "23", "preset": "slow"},
+        "ultra": {"crf": "18", "preset": "veryslow"}
+    }
+
+    def start_h265_conversion(self, media_file_id: int, output_format: str = "h265", quality: str = "high", dash: bool = False,
+                              apply_lut: bool = True):
         """Iniciar conversão de arquivo RAW para H.265"""
         media_file = MediaFile.query.get(media_file_id)
         if not media_file:
             return {"success": False, "error": "MediaFile not found"}
 
+        # Master graduado no mesmo pass: LUT do projeto via lut3d
+        grade = self._resolve_grade(media_file.project_id) if apply_lut else {"success": True, "lut": None}
+        if not grade["success"]:
+            return grade
+        return self.render_h265(media_file, grade["lut"], output_format, quality, dash)
+
+    def render_h265(self, media_file, lut: dict = None, output_format: str = "h265", quality: str = "high",
+                    dash: bool = False):
+        """Master H.265 de um MediaFile com uma grade já resolvida (lut: {id, hash, path} ou None)"""
+        media_file_id = media_file.id
+
+        # Definir qualidade baseada no parâmetro
+        settings = self.H265_QUALITY_SETTINGS.get(quality, self.H265_QUALITY_SETTINGS["high"])
+
+        # Identidade da fonte (key + ETag) para o cache de resultados
+        source_info = self.r2_service.get_object_info(media_file.storage_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+
+        params = TranscodeResultCache.normalize_params(
+            codec="h265", crf=settings["crf"], preset=settings["preset"], lut=self._lut_key(lut),
+            output_format=output_format, package="hls-cmaf", dash=dash, audio_bitrate="192k"
+        )
+        cache_key = TranscodeResultCache.make_key(media_file.storage_key, source_info["etag"], params)
+
+        result, cache_status = self.result_cache.get_or_run(
+            cache_key,
+            lambda: self._encode_h265(media_file_id, media_file.storage_key, source_info["etag"], cache_key[:32], settings, dash, lut)
+        )
+        if not result["success"]:
+            return result
+
+        # 5. Atualizar MediaFile com informações da conversão (também em hits do cache)
+        media_file.converted_file_key = result["converted_file_key"]
+        media_file.stream_url = result["stream_url"]
+        media_file.conversion_status = "completed"
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {**result, "cache": cache_status, "lut": lut["id"] if lut else None}
+
+    def _encode_h265(self, media_file_id: int, storage_key: str, source_etag: str, package_id: str,
+                     settings: dict, dash: bool, lut: dict = None):
+        """Converte a fonte em cache local para H.265 em HLS fMP4/CMAF (executado apenas em miss do cache)"""
         # Gerar ID único para a conversão
         conversion_id = str(uuid.uuid4())
         
         # Criar diretório temporário para conversão
         temp_dir = f"/tmp/h265_conversion_{conversion_id}"
         os.makedirs(temp_dir, exist_ok=True)
-        
-        original_path = None
-        output_path = None
 
         try:
-            # 1. Baixar o arquivo original do R2
-            download_url_response = self.r2_service.generate_presigned_url(media_file.storage_key)
+            # 1. Obter o arquivo original (cache local de fontes, baixa do R2 em miss)
+            with self.source_cache.checkout(storage_key, source_etag) as original_path:
+                # 2-3. Master H.265 na resolução original, empacotado em HLS fMP4 (tag hvc1)
+                # Em produção, isso deveria ser executado em uma fila de tarefas (Celery, RQ, etc.)
+                if self.r2_service.is_test_mode():
+                    print(f"🧪 [TEST MODE] Simulando conversão FFmpeg para {temp_dir}")
+                else:
+                    self.packager.package(
+                        original_path, temp_dir, self.H265_MASTER_LADDER,
+                        codec="h265", crf=settings["crf"], preset=settings["preset"],
+                        audio_bitrate="192k", dash=dash,
+                        video_filter=self._lut_filter(lut)
+                    )
 
-            if not download_url_response["success"]:
-                return {"success": False, "error": f"Failed to get presigned URL: {download_url_response['error']}"}
-            
-            download_url = download_url_response["url"]
-            original_path = os.path.join(temp_dir, f"original_{media_file_id}.{self._get_file_extension(media_file.filename)}")
-            
-            # Baixar o arquivo
-            if self.r2_service.is_test_mode():
-                print(f"🧪 [TEST MODE] Simulando download de {download_url} para {original_path}")
-                with open(original_path, "w") as f:
-                    f.write("dummy video content") # Criar um arquivo dummy
-            else:
-                subprocess.run(["wget", "-O", original_path, download_url], check=True)
-            
-            # 2. Configurar parâmetros de conversão H.265
-            output_filename = f"h265_{media_file_id}_{conversion_id}.mp4"
-            output_path = os.path.join(temp_dir, output_filename)
-            
-            # Definir qualidade baseada no parâmetro
-            quality_settings = {
-                "low": {"crf": "32", "preset": "fast"},
-                "medium": {"crf": "28", "preset": "medium"},
-                "high": {"crf": "23", "preset": "slow"},
-                "ultra": {"crf": "18", "preset": "veryslow"}
-            }
-            
-            settings = quality_settings.get(quality, quality_settings["high"])
-            
-            # 3. Comando FFmpeg para conversão H.265
-            ffmpeg_command = [
-                "ffmpeg",
-                "-i", original_path,
-                "-c:v", "libx265",
-                "-preset", settings["preset"],
-                "-crf", settings["crf"],
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-movflags", "+faststart",  # Otimização para streaming
-                "-y",  # Sobrescrever se existir
-                output_path
-            ]
-            
-            # Executar conversão em background (simulado)
-            # Em produção, isso deveria ser executado em uma fila de tarefas (Celery, RQ, etc.)
-            if self.r2_service.is_test_mode():
-                print(f"🧪 [TEST MODE] Simulando conversão FFmpeg para {output_path}")
-                with open(output_path, "w") as f:
-                    f.write("dummy converted video content") # Criar um arquivo dummy
-            else:
-                subprocess.run(ffmpeg_command, check=True)
+            # 4. Upload do pacote para o R2 (servido por /api/conversion/packages/...)
+            upload_result = self.packager.upload(temp_dir, package_id)
+            if not upload_result["success"]:
+                return upload_result
 
-            
-            # 4. Upload do arquivo convertido para Cloudflare Stream
-            # Simular upload para Cloudflare Stream
-            stream_uid = f"h265_{conversion_id}"
-            stream_url = f"https://customer-5dr3ublgoe3wg2wj.cloudflarestream.com/{stream_uid}/manifest/video.m3u8"
-            
-            # 5. Atualizar MediaFile com informações da conversão
-            media_file.converted_file_key = output_filename
-            media_file.stream_url = stream_url
-            media_file.conversion_status = "completed"
-            media_file.updated_at = datetime.utcnow()
-            db.session.commit()
+            stream_url = HLSPackager.package_url(package_id)
             
             # Salvar status da conversão em arquivo temporário (em produção, usar Redis ou banco)
             status_file = f"/tmp/conversion_status_{conversion_id}.json"
@@ -202,7 +695,9 @@ class ConversionService:
                 "success": True, 
                 "conversion_id": conversion_id,
                 "status": "completed",
-                "stream_url": stream_url
+                "stream_url": stream_url,
+                "dash_url": HLSPackager.package_url(package_id, "dash/manifest.mpd") if dash else None,
+                "converted_file_key": HLSPackager.package_prefix(package_id)
             }
             
         except subprocess.CalledProcessError as e:
@@ -220,11 +715,7 @@ class ConversionService:
         except Exception as e:
             return {"success": False, "error": str(e)}
         finally:
-            # Limpar arquivos temporários (manter apenas o status)
-            if original_path and os.path.exists(original_path):
-                os.remove(original_path)
-            if output_path and os.path.exists(output_path):
-                os.remove(output_path)
+            # Limpar arquivos temporários (manter apenas o status; a fonte permanece no cache)
             if os.path.exists(temp_dir):
                 subprocess.run(["rm", "-rf", temp_dir])
 
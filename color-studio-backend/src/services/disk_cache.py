@@ -0,0 +1,203 @@
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class DiskLRUCache:
+    """
+    Cache de arquivos em disco com orçamento de bytes e eviction LRU.
+
+    Arquivos em uso são protegidos por contagem de referências: uma entrada só
+    pode ser removida quando nenhum chamador a mantém com acquire().
+    Preenchimentos simultâneos da mesma chave são agrupados em um único fill.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, name: str = 'cache'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.name = name
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._filling: Dict[str, Future] = {}
+        self._total_bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'bytes_saved': 0,
+            'bytes_filled': 0,
+            'bytes_evicted': 0,
+        }
+
+        self._load_existing()
+
+    def acquire(self, key: str, fill: Callable[[str], None], suffix: str = '') -> str:
+        """
+        Retorna o caminho local da entrada, mantendo-a referenciada.
+
+        Em caso de miss, fill(tmp_path) deve escrever o conteúdo em tmp_path.
+        Todo acquire() precisa de um release() correspondente.
+        """
+        entry_id = self._entry_id(key, suffix)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(entry_id)
+                if entry is not None:
+                    entry['refs'] += 1
+                    entry['last_access'] = time.time()
+                    self._entries.move_to_end(entry_id)
+                    self.stats['hits'] += 1
+                    self.stats['bytes_saved'] += entry['size']
+                    return entry['path']
+
+                future = self._filling.get(entry_id)
+                if future is None:
+                    future = Future()
+                    self._filling[entry_id] = future
+                    self.stats['misses'] += 1
+                    break
+
+            # Outro chamador já está preenchendo esta chave: aguardar e tentar de novo
+            future.result()
+
+        path = os.path.join(self.cache_dir, entry_id)
+        tmp_path = f"{path}.part"
+        try:
+            fill(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._entries[entry_id] = {
+                    'path': path,
+                    'size': size,
+                    'refs': 1,
+                    'last_access': time.time(),
+                }
+                self._total_bytes += size
+                self.stats['bytes_filled'] += size
+                self._evict_locked()
+                self._filling.pop(entry_id, None)
+            future.set_result(path)
+            return path
+
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self._filling.pop(entry_id, None)
+            future.set_exception(e)
+            raise
+
+    def release(self, key: str, suffix: str = ''):
+        """Libera uma referência obtida com acquire()"""
+        entry_id = self._entry_id(key, suffix)
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None and entry['refs'] > 0:
+                entry['refs'] -= 1
+            self._evict_locked()
+
+    @contextmanager
+    def checkout(self, key: str, fill: Callable[[str], None], suffix: str = ''):
+        """Context manager: acquire() na entrada e release() na saída"""
+        path = self.acquire(key, fill, suffix)
+        try:
+            yield path
+        finally:
+            self.release(key, suffix)
+
+    def contains(self, key: str, suffix: str = '') -> bool:
+        """Verifica se a chave está no cache (sem contar hit)"""
+        with self._lock:
+            return self._entry_id(key, suffix) in self._entries
+
+    def get_path(self, key: str, suffix: str = '') -> Optional[str]:
+        """Retorna o caminho de uma entrada presente (sem referenciá-la)"""
+        with self._lock:
+            entry = self._entries.get(self._entry_id(key, suffix))
+            return entry['path'] if entry else None
+
+    def discard(self, key: str, suffix: str = '') -> bool:
+        """Remove uma entrada se ela não estiver em uso"""
+        entry_id = self._entry_id(key, suffix)
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry['refs'] > 0:
+                return False
+            self._remove_locked(entry_id)
+            return True
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas do cache"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'name': self.name,
+                'entries': len(self._entries),
+                'pinned': sum(1 for e in self._entries.values() if e['refs'] > 0),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+            }
+
+    def _evict_locked(self):
+        """Remove entradas LRU não referenciadas até caber no orçamento"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for entry_id in list(self._entries.keys()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._entries[entry_id]['refs'] == 0:
+                self.stats['evictions'] += 1
+                self.stats['bytes_evicted'] += self._entries[entry_id]['size']
+                self._remove_locked(entry_id)
+
+        if self._total_bytes > self.max_bytes:
+            print(f"⚠️ Cache '{self.name}' acima do orçamento ({self._total_bytes}/{self.max_bytes} bytes): entradas em uso")
+
+    def _remove_locked(self, entry_id: str):
+        """Remove a entrada do índice e do disco"""
+        entry = self._entries.pop(entry_id)
+        self._total_bytes -= entry['size']
+        try:
+            os.remove(entry['path'])
+        except FileNotFoundError:
+            pass
+
+    def _load_existing(self):
+        """Reconstrói o índice a partir dos arquivos já presentes no diretório"""
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if filename.endswith('.part'):
+                # Restos de preenchimentos interrompidos (ignora os recentes, que podem ser de outro worker)
+                if time.time() - os.path.getmtime(path) > 3600:
+                    os.remove(path)
+                continue
+            if not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, filename, path, stat.st_size))
+
+        for mtime, filename, path, size in sorted(found):
+            self._entries[filename] = {'path': path, 'size': size, 'refs': 0, 'last_access': mtime}
+            self._total_bytes += size
+
+        self._evict_locked()
+
+    @staticmethod
+    def _entry_id(key: str, suffix: str = '') -> str:
+        """Nome de arquivo estável para a chave"""
+        digest = hashlib.sha256(key.encode()).hexdigest()[:40]
+        return f"{digest}{suffix}"
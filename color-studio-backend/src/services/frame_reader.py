@@ -0,0 +1,173 @@
+import json
+import subprocess
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+class FrameReader:
+    """
+    Lê frames decodificados pelo FFmpeg como arrays NumPy.
+
+    O FFmpeg amostra (filtro fps), reduz a resolução e entrega RGB cru por um
+    pipe; os frames são lidos em lotes de tamanho fixo em um buffer reutilizado,
+    então a memória usada não depende da duração do arquivo.
+    """
+
+    # rgb48le preserva fontes de 10/12 bits; rgb24 é suficiente para detecção de cortes
+    PIX_FMTS = {
+        'rgb48le': (np.dtype('<u2'), 65535.0),
+        'rgb24': (np.dtype('u1'), 255.0),
+        'gray': (np.dtype('u1'), 255.0),
+    }
+
+    def __init__(self, source_path: str, width: Optional[int] = None, sample_fps: Optional[float] = None,
+                 start: float = 0.0, duration: Optional[float] = None, pix_fmt: str = 'rgb48le',
+                 batch_size: int = 8, video_filter: Optional[str] = None):
+        if pix_fmt not in self.PIX_FMTS:
+            raise ValueError(f"pix_fmt não suportado: {pix_fmt}")
+
+        self.source_path = source_path
+        self.sample_fps = sample_fps
+        self.start = start
+        self.duration = duration
+        self.pix_fmt = pix_fmt
+        self.batch_size = batch_size
+        self.video_filter = video_filter
+
+        info = self.probe_video(source_path)
+        self.source_width, self.source_height = info['width'], info['height']
+        self.source_fps = info['fps']
+        self.color_transfer = info['color_transfer']
+        self.color_primaries = info['color_primaries']
+        self.width, self.height = self._output_size(width)
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.pix_fmt == 'gray' else 3
+
+    @property
+    def frame_interval(self) -> float:
+        """Intervalo entre frames entregues, em segundos"""
+        fps = self.sample_fps or self.source_fps or 1.0
+        return 1.0 / fps
+
+    def build_command(self) -> list:
+        """Comando FFmpeg que escreve os frames amostrados em rawvideo no stdout"""
+        filters = []
+        if self.video_filter:
+            filters.append(self.video_filter)
+        if self.sample_fps:
+            filters.append(f"fps={self.sample_fps}")
+        if (self.width, self.height) != (self.source_width, self.source_height):
+            filters.append(f"scale={self.width}:{self.height}:flags=area")
+
+        command = ['ffmpeg', '-v', 'error', '-nostdin']
+        if self.start:
+            command += ['-ss', str(self.start)]
+        command += ['-i', self.source_path]
+        if self.duration:
+            command += ['-t', str(self.duration)]
+        command += ['-map', '0:v:0', '-an', '-sn']
+        if filters:
+            command += ['-vf', ','.join(filters)]
+        command += ['-f', 'rawvideo', '-pix_fmt', self.pix_fmt, 'pipe:1']
+        return command
+
+    def iter_batches(self, normalize: bool = True) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Gera (timestamps, frames) em lotes de até batch_size frames.
+
+        frames tem shape (n, altura, largura, canais); com normalize=True os
+        valores são float32 em [0, 1]. O array pertence a um buffer reutilizado:
+        copie-o se precisar mantê-lo depois da próxima iteração.
+        """
+        dtype, max_value = self.PIX_FMTS[self.pix_fmt]
+        frame_bytes = self.width * self.height * self.channels * dtype.itemsize
+        buffer = bytearray(frame_bytes * self.batch_size)
+        view = memoryview(buffer)
+
+        process = subprocess.Popen(self.build_command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   bufsize=frame_bytes)
+        frame_index = 0
+        try:
+            while True:
+                count = 0
+                while count < self.batch_size:
+                    if not self._read_exact(process.stdout, view[count * frame_bytes:(count + 1) * frame_bytes]):
+                        break
+                    count += 1
+                if count == 0:
+                    break
+
+                raw = np.frombuffer(buffer, dtype=dtype, count=count * frame_bytes // dtype.itemsize)
+                frames = raw.reshape(count, self.height, self.width, self.channels)
+                if normalize:
+                    frames = frames.astype(np.float32) / max_value
+
+                timestamps = self.start + (frame_index + np.arange(count)) * self.frame_interval
+                frame_index += count
+                yield timestamps, frames
+
+                if count < self.batch_size:
+                    break
+        finally:
+            process.stdout.close()
+            process.kill()
+            stderr = process.stderr.read().decode(errors='replace')
+            process.stderr.close()
+            returncode = process.wait()
+
+        if frame_index == 0 and returncode not in (0, -9):
+            raise RuntimeError(f"FFmpeg não entregou frames: {stderr.strip()}")
+
+    @staticmethod
+    def read_frame(source_path: str, timestamp: float, width: Optional[int] = None,
+                   pix_fmt: str = 'rgb48le', video_filter: Optional[str] = None) -> np.ndarray:
+        """Um único frame (float32 em [0, 1]) no instante pedido, com seek rápido"""
+        reader = FrameReader(source_path, width=width, start=timestamp, pix_fmt=pix_fmt, batch_size=1,
+                             video_filter=video_filter)
+        for _, frames in reader.iter_batches():
+            return frames[0].copy()
+        raise RuntimeError(f"Nenhum frame em {timestamp}s")
+
+    @staticmethod
+    def probe_video(source_path: str) -> Dict:
+        """Dimensões, fps e metadados de cor do primeiro stream de vídeo"""
+        result = subprocess.run([
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,r_frame_rate,color_transfer,color_primaries',
+            '-of', 'json', source_path
+        ], capture_output=True, text=True, check=True)
+        streams = json.loads(result.stdout).get('streams', [])
+        if not streams:
+            raise ValueError("Nenhum stream de vídeo encontrado")
+
+        stream = streams[0]
+        num, _, den = stream.get('r_frame_rate', '0/1').partition('/')
+        fps = float(num) / float(den) if den and float(den) else 0.0
+        return {
+            'width': int(stream['width']),
+            'height': int(stream['height']),
+            'fps': fps,
+            'color_transfer': stream.get('color_transfer', ''),
+            'color_primaries': stream.get('color_primaries', ''),
+        }
+
+    def _output_size(self, width: Optional[int]) -> Tuple[int, int]:
+        """Tamanho de saída mantendo a proporção (dimensões pares, nunca maior que a fonte)"""
+        if not width or width >= self.source_width:
+            return self.source_width, self.source_height
+        height = round(self.source_height * width / self.source_width)
+        return width - width % 2, max(2, height - height % 2)
+
+    @staticmethod
+    def _read_exact(stream, view: memoryview) -> bool:
+        """Preenche view inteira a partir do pipe (False no fim do stream)"""
+        filled = 0
+        while filled < len(view):
+            read = stream.readinto(view[filled:])
+            if not read:
+                return False
+            filled += read
+        return True
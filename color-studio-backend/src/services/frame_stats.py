@@ -0,0 +1,180 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.services.color_science import ColorScience
+from src.services.frame_reader import FrameReader
+
+
+class FrameStatsEngine:
+    """
+    Estatísticas de frames medidas nos pixels (não nos metadados).
+
+    Para cada frame amostrado calcula histogramas de luma e RGB, níveis de luz
+    em nits (MaxCLL/MaxFALL no padrão CTA-861.3), porcentagem de pixels
+    clipados e excursão de gamut (pixels BT.2020 fora do Rec.709). Os frames
+    são processados em lotes vetorizados; só um lote fica em memória.
+    """
+
+    HISTOGRAM_BINS = 256
+
+    # Coeficientes de luma (Y') por matriz
+    LUMA_COEFFICIENTS = {
+        'bt709': (0.2126, 0.7152, 0.0722),
+        'bt2020': (0.2627, 0.6780, 0.0593),
+    }
+
+    # BT.2020 linear -> BT.709 linear (ITU-R BT.2087)
+    BT2020_TO_BT709 = ColorScience.gamut_matrix('rec2020', 'rec709')
+
+    SDR_REFERENCE_WHITE = 100.0  # nits
+    HLG_NOMINAL_PEAK = 1000.0  # nits
+    CLIP_HIGH = 1.0 - 1.0 / 1023  # último code value de 10 bits
+    CLIP_LOW = 1.0 / 1023
+
+    def __init__(self, analysis_width: int = 960, sample_fps: float = 1.0, batch_size: int = 8):
+        self.analysis_width = analysis_width
+        self.sample_fps = sample_fps
+        self.batch_size = batch_size
+
+    def analyze(self, source_path: str, start: float = 0.0, duration: Optional[float] = None,
+                include_frame_histograms: bool = False) -> Dict:
+        """
+        Analisa os frames amostrados do arquivo.
+
+        A redução de resolução (analysis_width) suaviza highlights especulares
+        muito pequenos; use analysis_width=None para medir na resolução original.
+        """
+        reader = FrameReader(source_path, width=self.analysis_width, sample_fps=self.sample_fps,
+                             start=start, duration=duration, batch_size=self.batch_size)
+        transfer = self._transfer_of(reader.color_transfer)
+        is_bt2020 = 'bt2020' in (reader.color_primaries or '')
+        coefficients = self.LUMA_COEFFICIENTS['bt2020' if is_bt2020 else 'bt709']
+
+        frames_out = []
+        luma_total = np.zeros(self.HISTOGRAM_BINS, dtype=np.int64)
+        rgb_total = np.zeros((3, self.HISTOGRAM_BINS), dtype=np.int64)
+
+        for timestamps, frames in reader.iter_batches():
+            stats = self.analyze_batch(frames, transfer, coefficients, is_bt2020)
+            luma_total += stats['luma_histograms'].sum(axis=0)
+            rgb_total += stats['rgb_histograms'].sum(axis=0)
+
+            for i, timestamp in enumerate(timestamps):
+                frame = {
+                    'time': round(float(timestamp), 3),
+                    'max_cll': round(float(stats['max_cll'][i]), 2),
+                    'fall': round(float(stats['fall'][i]), 2),
+                    'average_luma': round(float(stats['average_luma'][i]), 4),
+                    'clipped_high_pct': round(float(stats['clipped_high'][i]) * 100, 3),
+                    'clipped_low_pct': round(float(stats['clipped_low'][i]) * 100, 3),
+                    'gamut_excursion_pct': round(float(stats['gamut_excursion'][i]) * 100, 3),
+                }
+                if include_frame_histograms:
+                    frame['luma_histogram'] = stats['luma_histograms'][i].tolist()
+                frames_out.append(frame)
+
+        return {
+            'transfer': transfer,
+            'primaries': 'bt2020' if is_bt2020 else 'bt709',
+            'analysis_size': [reader.width, reader.height],
+            'summary': self.summarize(frames_out),
+            'luma_histogram': luma_total.tolist(),
+            'rgb_histograms': {channel: rgb_total[c].tolist() for c, channel in enumerate('rgb')},
+            'frames': frames_out,
+        }
+
+    def analyze_batch(self, frames: np.ndarray, transfer: str, coefficients=None,
+                      is_bt2020: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Estatísticas vetorizadas de um lote (n, h, w, 3) de RGB não linear em [0, 1]
+        """
+        n = frames.shape[0]
+        pixels = frames.reshape(n, -1, 3)
+        coefficients = np.asarray(coefficients or self.LUMA_COEFFICIENTS['bt709'], dtype=np.float32)
+
+        # Histogramas de todos os frames do lote com um único bincount (offset por frame)
+        bins = self.HISTOGRAM_BINS
+        luma = pixels @ coefficients
+        luma_histograms = self._batched_histogram(luma, bins)
+        rgb_histograms = np.stack(
+            [self._batched_histogram(pixels[:, :, c], bins) for c in range(3)], axis=1
+        )
+
+        # Luz em nits: MaxCLL usa o maior componente RGB de cada pixel (CTA-861.3)
+        linear = self.to_nits(pixels, transfer)
+        max_rgb = linear.max(axis=2)
+
+        clipped_high = (pixels >= self.CLIP_HIGH).any(axis=2).mean(axis=1)
+        clipped_low = (pixels <= self.CLIP_LOW).all(axis=2).mean(axis=1)
+
+        if is_bt2020:
+            # Fora do Rec.709: algum componente negativo após a conversão
+            in_709 = linear @ self.BT2020_TO_BT709.T
+            peak = max_rgb.max(axis=1, keepdims=True)
+            tolerance = 1e-3 * np.maximum(peak, 1.0)
+            outside = (in_709 < -tolerance[..., None]).any(axis=2)
+            gamut_excursion = outside.mean(axis=1)
+        else:
+            gamut_excursion = np.zeros(n, dtype=np.float32)
+
+        return {
+            'luma_histograms': luma_histograms,
+            'rgb_histograms': rgb_histograms,
+            'max_cll': max_rgb.max(axis=1),
+            'fall': max_rgb.mean(axis=1),
+            'average_luma': luma.mean(axis=1),
+            'clipped_high': clipped_high,
+            'clipped_low': clipped_low,
+            'gamut_excursion': gamut_excursion,
+        }
+
+    @staticmethod
+    def summarize(frames: list) -> Dict:
+        """MaxCLL/MaxFALL do arquivo e médias de clipping"""
+        if not frames:
+            return {'frames_analyzed': 0}
+
+        max_cll = max(frame['max_cll'] for frame in frames)
+        max_fall = max(frame['fall'] for frame in frames)
+        count = len(frames)
+        return {
+            'frames_analyzed': count,
+            'max_cll': round(max_cll),
+            'max_fall': round(max_fall),
+            'average_fall': round(sum(frame['fall'] for frame in frames) / count, 2),
+            'clipped_high_pct': round(sum(frame['clipped_high_pct'] for frame in frames) / count, 3),
+            'clipped_low_pct': round(sum(frame['clipped_low_pct'] for frame in frames) / count, 3),
+            'gamut_excursion_pct': round(sum(frame['gamut_excursion_pct'] for frame in frames) / count, 3),
+            # Conteúdo com luz acima do branco de referência SDR
+            'is_hdr_measured': max_cll > FrameStatsEngine.SDR_REFERENCE_WHITE * 1.5,
+        }
+
+    @classmethod
+    def to_nits(cls, pixels: np.ndarray, transfer: str) -> np.ndarray:
+        """RGB não linear [0, 1] -> luz de display em nits"""
+        if transfer == 'pq':
+            return ColorScience.pq_decode(pixels) * 10000.0
+        if transfer == 'hlg':
+            # OETF inversa + OOTF (gamma 1.2 em display de 1000 nits)
+            scene = ColorScience.hlg_decode(np.clip(pixels, 0.0, 1.0))
+            return ColorScience.hlg_ootf(scene, cls.HLG_NOMINAL_PEAK)
+        return ColorScience.bt1886_decode(pixels) * cls.SDR_REFERENCE_WHITE
+
+    @staticmethod
+    def _batched_histogram(values: np.ndarray, bins: int) -> np.ndarray:
+        """Histograma por linha de um array (n, pixels) em [0, 1]"""
+        n = values.shape[0]
+        indices = np.clip((values * bins).astype(np.int32), 0, bins - 1)
+        indices += (np.arange(n, dtype=np.int32) * bins)[:, None]
+        return np.bincount(indices.ravel(), minlength=n * bins).reshape(n, bins)
+
+    @staticmethod
+    def _transfer_of(color_transfer: str) -> str:
+        """Curva a partir do color_transfer do stream"""
+        color_transfer = (color_transfer or '').lower()
+        if color_transfer == 'smpte2084':
+            return 'pq'
+        if color_transfer == 'arib-std-b67':
+            return 'hlg'
+        return 'sdr'
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.services.lut_engine import LUT3D
+
+
+class CompiledGrade:
+    """
+    Parâmetros de grade já reduzidos às operações por pixel:
+    y = (a·x + b)^(1/gamma) + offset (lift/gamma/gain/offset por canal),
+    saturação em torno da luma e as curvas (master composta com a do canal)
+    amostradas em uma tabela única de 3 x CURVE_SIZE valores
+    """
+
+    def __init__(self, params: Dict, curve_size: int, chunk_pixels: int):
+        lift = np.asarray(params['lift'], dtype=np.float32)
+        gain = np.asarray(params['gain'], dtype=np.float32)
+        exponent = 1.0 / np.asarray(params['gamma'], dtype=np.float32)
+        offset = np.asarray(params['offset'], dtype=np.float32)
+
+        # Coeficientes por canal repetidos no tamanho do bloco: operações elemento a
+        # elemento entre arrays contíguos são muito mais rápidas que o broadcast de (3,)
+        self.scale = self._tile(gain * (1.0 - lift), chunk_pixels)
+        self.bias = self._tile(gain * lift, chunk_pixels)
+        self.exponent = self._tile(exponent, chunk_pixels)
+        self.offset = self._tile(offset, chunk_pixels)
+        self.saturation = np.float32(params['saturation'])
+        self.luma = np.asarray(GradeEngine.LUMA_COEFFICIENTS, dtype=np.float32) * (1.0 - self.saturation)
+
+        self.has_power = bool(np.any(exponent != 1.0))
+        self.has_offset = bool(np.any(offset != 0.0))
+        self.has_saturation = bool(self.saturation != 1.0)
+
+        curves = params['curves']
+        self.has_curves = any(curves[name] != GradeEngine.IDENTITY_CURVE for name in GradeEngine.CURVES)
+        self.curve_size = curve_size
+        self.curve_table = None
+        if self.has_curves:
+            axis = np.linspace(0.0, 1.0, curve_size, dtype=np.float32)
+            master = GradeEngine.sample_curve(curves['master'], axis)
+            self.curve_table = np.concatenate([
+                GradeEngine.sample_curve(curves[channel], master) for channel in ('red', 'green', 'blue')
+            ]).astype(np.float32)
+            # Índice de cada canal na tabela única: canal c ocupa [c·N, (c+1)·N)
+            self.curve_offsets = self._tile(np.arange(3) * curve_size, chunk_pixels).astype(np.uint16)
+
+    @staticmethod
+    def _tile(values: np.ndarray, chunk_pixels: int) -> np.ndarray:
+        return np.ascontiguousarray(np.broadcast_to(np.asarray(values, dtype=np.float32), (chunk_pixels, 3)))
+
+
+class GradeEngine:
+    """
+    Primárias paramétricas (lift/gamma/gain, offset, saturação e curvas RGB)
+    aplicadas de forma vetorizada em frames ou lotes de frames.
+
+    Os parâmetros são compilados uma vez (LRU pelo hash) em coeficientes por
+    canal e uma tabela de curvas. A aplicação percorre a imagem em blocos de
+    CHUNK_PIXELS e faz todas as etapas sobre o bloco antes do próximo, com
+    operações in-place no buffer de saída: as únicas alocações por bloco são
+    a luma da saturação e os índices das curvas. Etapas neutras são puladas.
+
+    Os mesmos parâmetros podem ser assados em LUT 3D para o lut3d do FFmpeg.
+    """
+
+    CURVES = ('master', 'red', 'green', 'blue')
+    IDENTITY_CURVE = [[0.0, 0.0], [1.0, 1.0]]
+    DEFAULTS = {
+        'lift': [0.0, 0.0, 0.0],
+        'gamma': [1.0, 1.0, 1.0],
+        'gain': [1.0, 1.0, 1.0],
+        'offset': [0.0, 0.0, 0.0],
+        'saturation': 1.0,
+        'curves': dict.fromkeys(CURVES, IDENTITY_CURVE),
+    }
+
+    LUMA_COEFFICIENTS = (0.2126, 0.7152, 0.0722)  # Rec.709
+    CURVE_SIZE = 4096  # amostras por curva (precisão de 12 bits na entrada)
+    MAX_CURVE_POINTS = 32
+    CHUNK_PIXELS = 1 << 14  # bloco que cabe no cache do processador
+    MAX_COMPILED = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled: "OrderedDict[str, CompiledGrade]" = OrderedDict()
+
+    # ==========================================
+    # PARÂMETROS
+    # ==========================================
+
+    @classmethod
+    def normalize(cls, params: Optional[Dict]) -> Dict:
+        """
+        Valida e completa os parâmetros com os neutros. lift/gamma/gain/offset
+        aceitam um número (os três canais) ou [r, g, b]; curvas são listas de
+        pontos [x, y] com x crescente em [0, 1]. Levanta ValueError
+        """
+        params = params or {}
+        if not isinstance(params, dict):
+            raise ValueError("Parâmetros de grade devem ser um objeto")
+        unknown = set(params) - set(cls.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Parâmetros desconhecidos: {', '.join(sorted(unknown))}")
+
+        normalized = {}
+        for name in ('lift', 'gamma', 'gain', 'offset'):
+            value = params.get(name, cls.DEFAULTS[name])
+            try:
+                values = [float(value)] * 3 if isinstance(value, (int, float)) else [float(v) for v in value]
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} deve ser um número ou [r, g, b]")
+            if len(values) != 3 or not all(np.isfinite(values)):
+                raise ValueError(f"{name} deve ser um número ou [r, g, b]")
+            normalized[name] = [round(v, 6) for v in values]
+
+        if min(normalized['gamma']) <= 0:
+            raise ValueError("gamma deve ser positivo")
+        if not all(-1.0 <= v < 1.0 for v in normalized['lift']):
+            raise ValueError("lift deve estar em [-1, 1)")
+
+        try:
+            saturation = float(params.get('saturation', 1.0))
+        except (TypeError, ValueError):
+            raise ValueError("saturation deve ser um número")
+        if not 0.0 <= saturation <= 4.0:
+            raise ValueError("saturation deve estar entre 0 e 4")
+        normalized['saturation'] = round(saturation, 6)
+
+        curves = params.get('curves') or {}
+        if not isinstance(curves, dict) or set(curves) - set(cls.CURVES):
+            raise ValueError(f"curves aceita apenas {', '.join(cls.CURVES)}")
+        normalized['curves'] = {name: cls._normalize_curve(name, curves.get(name)) for name in cls.CURVES}
+        return normalized
+
+    @classmethod
+    def params_hash(cls, params: Dict) -> str:
+        payload = json.dumps(cls.normalize(params), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()[:40]
+
+    def compile(self, params: Dict) -> CompiledGrade:
+        """Parâmetros -> CompiledGrade (cacheado pelo hash dos parâmetros normalizados)"""
+        key = self.params_hash(params)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                return compiled
+
+        compiled = CompiledGrade(self.normalize(params), self.CURVE_SIZE, self.CHUNK_PIXELS)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.MAX_COMPILED:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    # ==========================================
+    # APLICAÇÃO
+    # ==========================================
+
+    def apply(self, image: np.ndarray, params, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Aplica a grade a uma imagem ou lote (..., 3) float32 em [0, 1].
+        params pode ser um dict ou um CompiledGrade; out pode ser a própria
+        imagem (aplicação in-place, sem nenhum buffer do tamanho do frame)
+        """
+        grade = params if isinstance(params, CompiledGrade) else self.compile(params)
+        pixels = image.reshape(-1, 3)
+        if out is None:
+            out = np.empty(image.shape, dtype=np.float32)
+        result = out.reshape(-1, 3)
+
+        for start in range(0, len(pixels), self.CHUNK_PIXELS):
+            chunk = slice(start, start + self.CHUNK_PIXELS)
+            self._apply_chunk(pixels[chunk], result[chunk], grade)
+        return out
+
+    def bake(self, params: Dict, size: int = 33) -> LUT3D:
+        """Grade assada em LUT 3D (para o lut3d do FFmpeg e para cadeias do LUTChainBaker)"""
+        table = LUT3D.identity(size).table
+        return LUT3D(self.apply(table, params, out=table), title="Primary grade")
+
+    @staticmethod
+    def _apply_chunk(source: np.ndarray, target: np.ndarray, grade: CompiledGrade):
+        n = len(source)
+        # lift/gain: uma multiplicação e uma soma por valor
+        np.multiply(source, grade.scale[:n], out=target)
+        target += grade.bias[:n]
+        if grade.has_power:
+            np.maximum(target, 0.0, out=target)
+            np.power(target, grade.exponent[:n], out=target)
+        if grade.has_offset:
+            target += grade.offset[:n]
+
+        if grade.has_saturation:
+            # y = sat·x + (1 - sat)·luma(x), sem matriz 3x3 por pixel
+            luma = target @ grade.luma
+            target *= grade.saturation
+            target += luma[:, None]
+
+        np.clip(target, 0.0, 1.0, out=target)
+        if grade.has_curves:
+            # Consulta na tabela de curvas pelo valor quantizado em CURVE_SIZE passos
+            target *= grade.curve_size - 1
+            target += 0.5
+            index = target.astype(np.uint16)
+            index += grade.curve_offsets[:n]
+            np.take(grade.curve_table, index, out=target, mode='clip')
+
+    # ==========================================
+    # CURVAS
+    # ==========================================
+
+    @staticmethod
+    def sample_curve(points, values: np.ndarray) -> np.ndarray:
+        """
+        Avalia a curva (spline monotônica de Fritsch-Carlson pelos pontos) nos valores.
+        Com dois pontos é uma reta
+        """
+        points = np.asarray(points, dtype=np.float64)
+        x, y = points[:, 0], points[:, 1]
+        values = np.clip(np.asarray(values, dtype=np.float64), x[0], x[-1])
+        if len(x) == 2:
+            return np.interp(values, x, y)
+
+        h = np.diff(x)
+        delta = np.diff(y) / h
+        slopes = np.empty_like(y)
+        slopes[0], slopes[-1] = delta[0], delta[-1]
+        same_sign = delta[:-1] * delta[1:] > 0
+        # Média harmônica ponderada: preserva monotonicidade e não cria overshoot
+        w1, w2 = 2 * h[1:] + h[:-1], h[1:] + 2 * h[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+        segment = np.clip(np.searchsorted(x, values, side='right') - 1, 0, len(x) - 2)
+        t = (values - x[segment]) / h[segment]
+        t2, t3 = t * t, t * t * t
+        return ((2 * t3 - 3 * t2 + 1) * y[segment] + (t3 - 2 * t2 + t) * h[segment] * slopes[segment]
+                + (-2 * t3 + 3 * t2) * y[segment + 1] + (t3 - t2) * h[segment] * slopes[segment + 1])
+
+    @classmethod
+    def _normalize_curve(cls, name: str, points) -> list:
+        if points is None:
+            return cls.IDENTITY_CURVE
+        try:
+            points = np.asarray(points, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Curva {name}: pontos inválidos")
+        if points.ndim != 2 or points.shape[1] != 2 or not 2 <= len(points) <= cls.MAX_CURVE_POINTS:
+            raise ValueError(f"Curva {name}: use de 2 a {cls.MAX_CURVE_POINTS} pontos [x, y]")
+        if np.any(np.diff(points[:, 0]) <= 0) or points.min() < 0.0 or points.max() > 1.0:
+            raise ValueError(f"Curva {name}: x deve ser crescente e os valores em [0, 1]")
+        return np.round(points, 6).tolist()
+
+
+_grade_engine = None
+_grade_engine_lock = threading.Lock()
+
+
+def get_grade_engine() -> GradeEngine:
+    """Retorna a instância compartilhada do engine de grade (uma por processo)"""
+    global _grade_engine
+    with _grade_engine_lock:
+        if _grade_engine is None:
+            _grade_engine = GradeEngine()
+        return _grade_engine
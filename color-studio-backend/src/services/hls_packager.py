@@ -0,0 +1,209 @@
+import os
+import subprocess
+from typing import Dict, List
+
+from src.services.r2_upload_service import R2UploadService
+
+
+class HLSPackager:
+    """
+    Gera pacotes HLS (fMP4/CMAF) a partir de um único encode.
+
+    Todas as renditions da escada saem da mesma decodificação (filtro split),
+    com GOPs alinhados aos segmentos. Cada rendition é um único arquivo .m4s
+    endereçado por playlists com EXT-X-BYTERANGE. Opcionalmente gera um
+    manifesto DASH remuxando os mesmos segmentos (sem novo encode).
+    """
+
+    # Escada padrão dos proxies de preview
+    PROXY_LADDER = [
+        {'name': '720p', 'width': 1280, 'maxrate': '3500k', 'bufsize': '7000k'},
+        {'name': '360p', 'width': 640, 'maxrate': '900k', 'bufsize': '1800k'},
+    ]
+
+    SEGMENT_DURATION = 4  # segundos
+
+    # Segmentos são imutáveis (o id do pacote muda quando o conteúdo muda)
+    CACHE_CONTROL_SEGMENT = 'public, max-age=31536000, immutable'
+    CACHE_CONTROL_PLAYLIST = 'public, max-age=300'
+
+    CONTENT_TYPES = {
+        '.m3u8': 'application/vnd.apple.mpegurl',
+        '.m4s': 'video/iso.segment',
+        '.mp4': 'video/mp4',
+        '.mpd': 'application/dash+xml',
+        '.jpg': 'image/jpeg',
+        '.vtt': 'text/vtt',
+    }
+
+    ENCODERS = {
+        'h264': 'libx264',
+        'h265': 'libx265',
+    }
+
+    def __init__(self, r2_service: R2UploadService = None):
+        self.r2_service = r2_service or R2UploadService()
+
+    @staticmethod
+    def package_prefix(package_id: str) -> str:
+        """Prefixo no R2 onde o pacote é armazenado"""
+        return f"packages/{package_id}/"
+
+    @staticmethod
+    def package_url(package_id: str, asset: str = 'master.m3u8') -> str:
+        """URL servida pelo backend para um arquivo do pacote"""
+        return f"/api/conversion/packages/{package_id}/{asset}"
+
+    @staticmethod
+    def build_command(source_path: str, out_dir: str, ladder: List[Dict], codec: str = 'h264',
+                      crf=23, preset: str = 'medium', audio_bitrate: str = '128k',
+                      has_audio: bool = True, segment_duration: int = None,
+                      max_duration: float = None, video_filter: str = None) -> List[str]:
+        """
+        Monta o comando FFmpeg que codifica todas as renditions e escreve o HLS.
+        max_duration limita o pacote aos primeiros N segundos (previews).
+        video_filter (ex.: lut3d) é aplicado uma vez, antes do split da escada.
+        """
+        segment_duration = segment_duration or HLSPackager.SEGMENT_DURATION
+        encoder = HLSPackager.ENCODERS.get(codec, codec)
+
+        # Um decode, N escalas
+        chains = []
+        source_label = '0:v'
+        if video_filter:
+            chains.append(f"[0:v]{video_filter}[graded]")
+            source_label = 'graded'
+        if len(ladder) == 1:
+            splits = [source_label]
+        else:
+            splits = [f"s{i}" for i in range(len(ladder))]
+            chains.append(f"[{source_label}]split={len(ladder)}" + ''.join(f"[{s}]" for s in splits))
+
+        for i, rendition in enumerate(ladder):
+            width = rendition.get('width')
+            scale = f"scale=w='min({width},iw)':h=-2" if width else 'null'
+            chains.append(f"[{splits[i]}]{scale}[v{i}]")
+
+        command = ['ffmpeg', '-y', '-i', source_path, '-filter_complex', ';'.join(chains)]
+        if max_duration:
+            command += ['-t', str(max_duration)]
+
+        stream_map = []
+        for i, rendition in enumerate(ladder):
+            command += ['-map', f"[v{i}]"]
+            entry = f"v:{i}"
+            if has_audio:
+                command += ['-map', '0:a:0']
+                entry += f",a:{i}"
+            stream_map.append(f"{entry},name:{rendition['name']}")
+
+        command += ['-c:v', encoder, '-preset', preset, '-crf', str(crf)]
+        for i, rendition in enumerate(ladder):
+            if rendition.get('maxrate'):
+                command += [f"-maxrate:v:{i}", rendition['maxrate'], f"-bufsize:v:{i}", rendition['bufsize']]
+
+        if codec == 'h264':
+            command += ['-pix_fmt', 'yuv420p', '-sc_threshold', '0']
+        elif codec == 'h265':
+            command += ['-tag:v', 'hvc1', '-x265-params', 'scenecut=0']
+
+        # GOPs alinhados aos segmentos para troca limpa entre renditions
+        command += ['-force_key_frames', f"expr:gte(t,n_forced*{segment_duration})"]
+
+        if has_audio:
+            command += ['-c:a', 'aac', '-b:a', audio_bitrate, '-ac', '2']
+
+        command += [
+            '-f', 'hls',
+            '-hls_time', str(segment_duration),
+            '-hls_playlist_type', 'vod',
+            '-hls_segment_type', 'fmp4',
+            '-hls_flags', 'single_file+independent_segments',
+            '-hls_fmp4_init_filename', 'init.mp4',
+            '-hls_segment_filename', os.path.join(out_dir, '%v', 'stream.m4s'),
+            '-master_pl_name', 'master.m3u8',
+            '-var_stream_map', ' '.join(stream_map),
+            os.path.join(out_dir, '%v', 'index.m3u8'),
+        ]
+        return command
+
+    @staticmethod
+    def build_dash_command(out_dir: str, ladder: List[Dict], has_audio: bool = True,
+                           segment_duration: int = None) -> List[str]:
+        """Remuxa as renditions HLS em um manifesto DASH (sem novo encode)"""
+        segment_duration = segment_duration or HLSPackager.SEGMENT_DURATION
+        command = ['ffmpeg', '-y']
+        for rendition in ladder:
+            command += ['-allowed_extensions', 'ALL', '-i', os.path.join(out_dir, rendition['name'], 'index.m3u8')]
+        for i in range(len(ladder)):
+            command += ['-map', f"{i}:v:0"]
+        if has_audio:
+            command += ['-map', '0:a:0']
+        command += [
+            '-c', 'copy',
+            '-f', 'dash',
+            '-seg_duration', str(segment_duration),
+            '-use_template', '1',
+            '-use_timeline', '1',
+            os.path.join(out_dir, 'dash', 'manifest.mpd'),
+        ]
+        return command
+
+    def package(self, source_path: str, out_dir: str, ladder: List[Dict], codec: str = 'h264',
+                crf=23, preset: str = 'medium', audio_bitrate: str = '128k', dash: bool = False,
+                max_duration: float = None, video_filter: str = None) -> Dict:
+        """Executa o encode/packaging localmente em out_dir"""
+        has_audio = self._has_audio(source_path)
+        for rendition in ladder:
+            os.makedirs(os.path.join(out_dir, rendition['name']), exist_ok=True)
+
+        command = self.build_command(source_path, out_dir, ladder, codec, crf, preset,
+                                     audio_bitrate, has_audio, max_duration=max_duration,
+                                     video_filter=video_filter)
+        subprocess.run(command, check=True, capture_output=True)
+
+        if dash:
+            os.makedirs(os.path.join(out_dir, 'dash'), exist_ok=True)
+            subprocess.run(self.build_dash_command(out_dir, ladder, has_audio), check=True, capture_output=True)
+
+        return {
+            'master': 'master.m3u8',
+            'dash_manifest': 'dash/manifest.mpd' if dash else None,
+            'renditions': [r['name'] for r in ladder],
+            'has_audio': has_audio,
+        }
+
+    def upload(self, out_dir: str, package_id: str) -> Dict:
+        """Envia o pacote para o R2 com Content-Type e Cache-Control corretos"""
+        prefix = self.package_prefix(package_id)
+        uploaded = 0
+
+        for root, _, files in os.walk(out_dir):
+            for filename in files:
+                local_path = os.path.join(root, filename)
+                relative = os.path.relpath(local_path, out_dir).replace(os.sep, '/')
+                ext = os.path.splitext(filename)[1].lower()
+                is_playlist = ext in ('.m3u8', '.mpd')
+
+                result = self.r2_service.upload_file(
+                    local_path,
+                    f"{prefix}{relative}",
+                    content_type=self.CONTENT_TYPES.get(ext),
+                    cache_control=self.CACHE_CONTROL_PLAYLIST if is_playlist else self.CACHE_CONTROL_SEGMENT
+                )
+                if not result['success']:
+                    return {'success': False, 'error': f"Falha no upload de {relative}: {result['error']}"}
+                uploaded += 1
+
+        print(f"✅ Pacote HLS enviado: {prefix} ({uploaded} arquivos)")
+        return {'success': True, 'prefix': prefix, 'files': uploaded}
+
+    @staticmethod
+    def _has_audio(source_path: str) -> bool:
+        """Verifica se a fonte tem stream de áudio"""
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=index', '-of', 'csv=p=0', source_path],
+            capture_output=True, text=True
+        )
+        return bool(result.stdout.strip())
@@ -0,0 +1,231 @@
+import os
+import math
+import subprocess
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from src.services.disk_cache import DiskLRUCache
+from src.services.keyframe_index import get_keyframe_indexer
+from src.services.metrics import metrics
+from src.services.scene_detector import SceneDetector
+from src.services.source_cache import get_source_cache
+
+
+class JITSegmenter:
+    """
+    HLS sob demanda (just-in-time).
+
+    A playlist de cada MediaFile é gerada de antemão a partir do índice de
+    keyframes da fonte, mas cada segmento só é transcodificado quando requisitado pela
+    primeira vez. Segmentos ficam em um cache LRU em disco e os próximos
+    segmentos são pré-carregados à frente da reprodução.
+
+    Com cortes de cena detectados, cada corte abre um segmento no primeiro
+    keyframe após ele: nenhum segmento atravessa uma troca de plano.
+    """
+
+    TARGET_SEGMENT_DURATION = 4.0  # segundos
+
+    RENDITIONS = {
+        '720p': {'width': 1280, 'crf': 26, 'maxrate': '3500k', 'bufsize': '7000k', 'bandwidth': 3500000},
+        '360p': {'width': 640, 'crf': 28, 'maxrate': '900k', 'bufsize': '1800k', 'bandwidth': 900000},
+    }
+
+    MAX_PLANS = 256
+    DEFAULT_SEGMENT_CACHE_BYTES = 10 * 1024 * 1024 * 1024  # 10GB
+
+    def __init__(self, source_cache=None, keyframe_indexer=None):
+        self.source_cache = source_cache or get_source_cache()
+        self.keyframe_indexer = keyframe_indexer or get_keyframe_indexer()
+        self.segment_cache = DiskLRUCache(
+            cache_dir=os.getenv('JIT_SEGMENT_CACHE_DIR', 'uploads/cache/segments'),
+            max_bytes=int(os.getenv('JIT_SEGMENT_CACHE_MAX_BYTES', self.DEFAULT_SEGMENT_CACHE_BYTES)),
+            name='segments'
+        )
+        self.prefetch_ahead = int(os.getenv('JIT_PREFETCH_SEGMENTS', 3))
+
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[Tuple, List[Tuple[float, float]]]" = OrderedDict()
+        self._prefetching = set()
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv('JIT_PREFETCH_WORKERS', 2)))
+
+    # ==========================================
+    # PLAYLISTS
+    # ==========================================
+
+    def master_playlist(self) -> str:
+        """Playlist master com a escada de renditions"""
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+        for name, rendition in self.RENDITIONS.items():
+            lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={rendition['bandwidth']},NAME=\"{name}\"")
+            lines.append(f"{name}/index.m3u8")
+        return '\n'.join(lines) + '\n'
+
+    def media_playlist(self, storage_key: str, etag: str, rendition: str, cuts: Tuple[float, ...] = ()) -> str:
+        """Playlist VOD de uma rendition (segmentos ainda não precisam existir)"""
+        if rendition not in self.RENDITIONS:
+            raise ValueError(f"Rendition desconhecida: {rendition}")
+
+        plan = self.get_plan(storage_key, etag, cuts)
+        target = math.ceil(max((duration for _, duration in plan), default=self.TARGET_SEGMENT_DURATION))
+
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f"#EXT-X-TARGETDURATION:{target}",
+            '#EXT-X-PLAYLIST-TYPE:VOD',
+            '#EXT-X-MEDIA-SEQUENCE:0',
+        ]
+        for index, (_, duration) in enumerate(plan):
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(f"seg_{index}.ts")
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def get_plan(self, storage_key: str, etag: str, cuts: Tuple[float, ...] = ()) -> List[Tuple[float, float]]:
+        """Plano de segmentos (início, duração) derivado dos keyframes e cortes de cena, memoizado por fonte"""
+        plan_key = (storage_key, etag, cuts)
+        with self._lock:
+            plan = self._plans.get(plan_key)
+            if plan is not None:
+                self._plans.move_to_end(plan_key)
+                return plan
+
+        index = self.keyframe_indexer.get_index(storage_key, etag)
+        plan = self.build_segment_plan(list(index.times), index.duration, self.TARGET_SEGMENT_DURATION, cuts)
+
+        with self._lock:
+            self._plans[plan_key] = plan
+            while len(self._plans) > self.MAX_PLANS:
+                self._plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def build_segment_plan(keyframes: List[float], duration: float, target: float,
+                           cuts: Tuple[float, ...] = ()) -> List[Tuple[float, float]]:
+        """
+        Agrupa keyframes em segmentos de pelo menos target segundos.
+        Todo segmento começa em um keyframe, então pode ser codificado isoladamente.
+        O primeiro keyframe após um corte de cena (até target/2 depois dele)
+        também abre um segmento, desde que o anterior tenha ao menos target/4
+        """
+        if not keyframes or keyframes[0] > 0:
+            keyframes = [0.0] + list(keyframes)
+
+        boundaries = [keyframes[0]]
+        for previous, timestamp in zip(keyframes, keyframes[1:]):
+            position = bisect_right(cuts, timestamp)
+            at_cut = position > 0 and previous < cuts[position - 1] and timestamp - cuts[position - 1] <= target / 2
+            length = timestamp - boundaries[-1]
+            if (length >= target or (at_cut and length >= target / 4)) and duration - timestamp > target / 4:
+                boundaries.append(timestamp)
+
+        plan = []
+        for i, start in enumerate(boundaries):
+            end = boundaries[i + 1] if i + 1 < len(boundaries) else duration
+            if end > start:
+                plan.append((start, end - start))
+        return plan
+
+    # ==========================================
+    # SEGMENTOS
+    # ==========================================
+
+    def get_segment(self, storage_key: str, etag: str, rendition: str, index: int,
+                    cuts: Tuple[float, ...] = ()) -> bytes:
+        """Retorna o segmento (transcodifica em miss) e agenda o prefetch dos próximos"""
+        plan = self.get_plan(storage_key, etag, cuts)
+        if rendition not in self.RENDITIONS or not 0 <= index < len(plan):
+            raise IndexError(f"Segmento inexistente: {rendition}/{index}")
+
+        plan_id = SceneDetector.cuts_digest(cuts)
+        data = self._load_segment(storage_key, etag, rendition, index, plan, plan_id)
+
+        for ahead in range(index + 1, min(index + 1 + self.prefetch_ahead, len(plan))):
+            self._schedule_prefetch(storage_key, etag, rendition, ahead, plan, plan_id)
+
+        return data
+
+    def get_stats(self) -> Dict:
+        """Métricas do cache de segmentos"""
+        return self.segment_cache.get_stats()
+
+    def _load_segment(self, storage_key: str, etag: str, rendition: str, index: int, plan,
+                      plan_id: str = None) -> bytes:
+        """Lê o segmento do cache, transcodificando-o em miss"""
+        segment_key = self._segment_key(storage_key, etag, rendition, index, plan_id)
+        fill = lambda tmp_path: self._transcode_segment(storage_key, etag, rendition, plan[index], tmp_path)
+
+        with self.segment_cache.checkout(segment_key, fill, '.ts') as path:
+            with open(path, 'rb') as f:
+                return f.read()
+
+    def _schedule_prefetch(self, storage_key: str, etag: str, rendition: str, index: int, plan,
+                           plan_id: str = None):
+        """Pré-carrega um segmento em background (no-op se já estiver em cache ou agendado)"""
+        segment_key = self._segment_key(storage_key, etag, rendition, index, plan_id)
+        with self._lock:
+            if segment_key in self._prefetching or self.segment_cache.contains(segment_key, '.ts'):
+                return
+            self._prefetching.add(segment_key)
+
+        def prefetch():
+            try:
+                fill = lambda tmp_path: self._transcode_segment(storage_key, etag, rendition, plan[index], tmp_path)
+                self.segment_cache.acquire(segment_key, fill, '.ts')
+                self.segment_cache.release(segment_key, '.ts')
+            except Exception as e:
+                print(f"⚠️ Prefetch do segmento {rendition}/{index} falhou: {e}")
+            finally:
+                with self._lock:
+                    self._prefetching.discard(segment_key)
+
+        self._prefetch_pool.submit(prefetch)
+
+    def _transcode_segment(self, storage_key: str, etag: str, rendition: str,
+                           segment: Tuple[float, float], dest_path: str):
+        """Codifica um único segmento MPEG-TS com timestamps contínuos"""
+        start, duration = segment
+        settings = self.RENDITIONS[rendition]
+        started = time.time()
+
+        with self.source_cache.checkout(storage_key, etag) as source_path:
+            subprocess.run([
+                'ffmpeg', '-y', '-v', 'error',
+                '-ss', f"{start:.6f}", '-i', source_path,
+                '-t', f"{duration:.6f}",
+                '-vf', f"scale=w='min({settings['width']},iw)':h=-2",
+                '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(settings['crf']),
+                '-maxrate', settings['maxrate'], '-bufsize', settings['bufsize'],
+                '-pix_fmt', 'yuv420p',
+                '-force_key_frames', 'expr:eq(n,0)',
+                '-c:a', 'aac', '-b:a', '128k', '-ac', '2',
+                '-output_ts_offset', f"{start:.6f}",
+                '-muxdelay', '0',
+                '-f', 'mpegts', dest_path
+            ], check=True, capture_output=True, text=True)
+
+        metrics.observe('jit.segment_transcode_s', time.time() - started)
+
+    @staticmethod
+    def _segment_key(storage_key: str, etag: str, rendition: str, index: int, plan_id: str = None) -> str:
+        """Chave do segmento no cache (plan_id separa planos com cortes de cena diferentes)"""
+        key = f"{storage_key}@{etag}/{rendition}/{index}"
+        return f"{key}/{plan_id}" if plan_id else key
+
+
+_jit_segmenter = None
+_jit_segmenter_lock = threading.Lock()
+
+
+def get_jit_segmenter() -> JITSegmenter:
+    """Retorna a instância compartilhada do segmentador (uma por processo)"""
+    global _jit_segmenter
+    with _jit_segmenter_lock:
+        if _jit_segmenter is None:
+            _jit_segmenter = JITSegmenter()
+        return _jit_segmenter
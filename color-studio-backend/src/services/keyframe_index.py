@@ -0,0 +1,232 @@
+import os
+import hashlib
+import struct
+import subprocess
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.services.source_cache import get_source_cache
+
+
+class KeyframeIndex:
+    """
+    Índice compacto dos keyframes do primeiro stream de vídeo.
+
+    Guarda timestamps (array de double) e offsets em bytes (array de int64)
+    ordenados por tempo; consultas por tempo usam busca binária (O(log n)).
+    Serializa em um sidecar binário: cabeçalho fixo + os dois arrays crus.
+
+    Tempos e duração são relativos ao start_time do container (a mesma
+    referência do -ss do FFmpeg): em MPEG-TS e alguns MOV/MXF o primeiro
+    pts não é zero e os pts absolutos deslocariam cada seek.
+    """
+
+    MAGIC = b'KFI2'
+    HEADER = struct.Struct('<4sIdqd')  # magic, count, duração (s), tamanho do arquivo, start_time (s)
+
+    def __init__(self, times: array = None, offsets: array = None, duration: float = 0.0, file_size: int = 0,
+                 start_time: float = 0.0):
+        self.times = times if times is not None else array('d')
+        self.offsets = offsets if offsets is not None else array('q')
+        self.duration = duration
+        self.file_size = file_size
+        self.start_time = start_time
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def build(cls, source_path: str) -> 'KeyframeIndex':
+        """
+        Varre os pacotes com ffprobe e registra os keyframes.
+        A saída é consumida em streaming (arquivos longos têm milhões de pacotes).
+        """
+        start_time = cls._probe_start_time(source_path)
+        index = cls(file_size=os.path.getsize(source_path), start_time=start_time)
+        end_time = 0.0
+
+        process = subprocess.Popen([
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,duration_time,pos,flags',
+            '-of', 'csv=p=0', source_path
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1024 * 1024)
+
+        try:
+            for line in process.stdout:
+                fields = line.rstrip('\n').split(',')
+                if len(fields) < 4 or fields[0] in ('', 'N/A'):
+                    continue
+                pts = float(fields[0])
+                packet_duration = float(fields[1]) if fields[1] not in ('', 'N/A') else 0.0
+                end_time = max(end_time, pts + packet_duration)
+                if 'K' in fields[3] and fields[2] not in ('', 'N/A'):
+                    index.times.append(max(0.0, pts - start_time))
+                    index.offsets.append(int(fields[2]))
+            stderr = process.stderr.read()
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, 'ffprobe', stderr=stderr)
+
+        index.duration = max(0.0, end_time - start_time)
+        index._sort()
+        return index
+
+    @staticmethod
+    def _probe_start_time(source_path: str) -> float:
+        """start_time do container (0 se ausente)"""
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=start_time', '-of', 'csv=p=0', source_path],
+            capture_output=True, text=True
+        )
+        try:
+            return float(result.stdout.strip())
+        except ValueError:
+            return 0.0
+
+    def lookup(self, timestamp: float) -> Optional[Dict]:
+        """Keyframe em ou imediatamente antes de timestamp, com a faixa de bytes do GOP"""
+        if not self.times:
+            return None
+        position = max(0, bisect_right(self.times, timestamp) - 1)
+        return self._entry(position)
+
+    def nearest(self, timestamp: float) -> Optional[Dict]:
+        """Keyframe mais próximo de timestamp (antes ou depois)"""
+        if not self.times:
+            return None
+        position = bisect_right(self.times, timestamp)
+        if position == 0:
+            return self._entry(0)
+        if position == len(self.times):
+            return self._entry(position - 1)
+        before, after = self.times[position - 1], self.times[position]
+        return self._entry(position - 1 if timestamp - before <= after - timestamp else position)
+
+    def save(self, path: str):
+        """Grava o sidecar de forma atômica"""
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(self.times), self.duration, self.file_size, self.start_time))
+            self.times.tofile(f)
+            self.offsets.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'KeyframeIndex':
+        """Lê um sidecar gravado por save() (ValueError para sidecars inválidos ou de versões anteriores)"""
+        with open(path, 'rb') as f:
+            header = f.read(cls.HEADER.size)
+            if len(header) != cls.HEADER.size or header[:4] != cls.MAGIC:
+                raise ValueError(f"Sidecar de keyframes inválido: {path}")
+            magic, count, duration, file_size, start_time = cls.HEADER.unpack(header)
+            times, offsets = array('d'), array('q')
+            times.fromfile(f, count)
+            offsets.fromfile(f, count)
+        return cls(times, offsets, duration, file_size, start_time)
+
+    def get_summary(self) -> Dict:
+        """Resumo do índice (quantidade de keyframes e GOP médio)"""
+        return {
+            'keyframes': len(self.times),
+            'duration': round(self.duration, 3),
+            'start_time': round(self.start_time, 6),
+            'avg_gop_seconds': round(self.duration / len(self.times), 3) if self.times else None,
+        }
+
+    def _entry(self, position: int) -> Dict:
+        """Keyframe na posição, com o fim do GOP em tempo e em bytes"""
+        is_last = position + 1 >= len(self.times)
+        return {
+            'index': position,
+            'time': self.times[position],
+            'end_time': self.duration if is_last else self.times[position + 1],
+            'byte_start': self.offsets[position],
+            'byte_end': (self.file_size if is_last else self.offsets[position + 1]) - 1,
+        }
+
+    def _sort(self):
+        """Garante ordem por tempo (B-frames/containers podem emitir fora de ordem)"""
+        if all(a <= b for a, b in zip(self.times, self.times[1:])):
+            return
+        pairs = sorted(zip(self.times, self.offsets))
+        self.times = array('d', (t for t, _ in pairs))
+        self.offsets = array('q', (o for _, o in pairs))
+
+
+class KeyframeIndexer:
+    """
+    Constrói (uma vez por fonte) e carrega índices de keyframes.
+
+    Sidecars ficam em disco, chaveados por key + ETag do objeto no R2, e os
+    índices mais usados ficam em memória.
+    """
+
+    MAX_IN_MEMORY = 512
+
+    def __init__(self, source_cache=None, index_dir: str = None):
+        self.source_cache = source_cache or get_source_cache()
+        self.index_dir = index_dir or os.getenv('KEYFRAME_INDEX_DIR', 'uploads/cache/keyframes')
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, KeyframeIndex]" = OrderedDict()
+        self._building: Dict[str, threading.Lock] = {}
+
+    def get_index(self, storage_key: str, etag: str) -> KeyframeIndex:
+        """Índice da fonte: memória -> sidecar -> varredura com ffprobe"""
+        sidecar_path = self.sidecar_path(storage_key, etag)
+
+        with self._lock:
+            index = self._indexes.get(sidecar_path)
+            if index is not None:
+                self._indexes.move_to_end(sidecar_path)
+                return index
+            build_lock = self._building.setdefault(sidecar_path, threading.Lock())
+
+        # Uma única varredura por fonte, mesmo com requisições simultâneas
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(sidecar_path)
+            if index is None and os.path.exists(sidecar_path):
+                try:
+                    index = KeyframeIndex.load(sidecar_path)
+                except ValueError:
+                    index = None  # sidecar de uma versão anterior (pts absolutos): reconstrói
+            if index is None:
+                with self.source_cache.checkout(storage_key, etag) as source_path:
+                    index = KeyframeIndex.build(source_path)
+                index.save(sidecar_path)
+                print(f"🔑 Índice de keyframes criado para {storage_key}: {len(index)} keyframes")
+
+        with self._lock:
+            self._indexes[sidecar_path] = index
+            self._indexes.move_to_end(sidecar_path)
+            while len(self._indexes) > self.MAX_IN_MEMORY:
+                self._indexes.popitem(last=False)
+            self._building.pop(sidecar_path, None)
+        return index
+
+    def sidecar_path(self, storage_key: str, etag: str) -> str:
+        """Caminho do sidecar da fonte"""
+        etag = etag.strip('"')
+        digest = hashlib.sha256(f"{storage_key}@{etag}".encode()).hexdigest()[:40]
+        return os.path.join(self.index_dir, f"{digest}.kfi")
+
+
+_keyframe_indexer = None
+_keyframe_indexer_lock = threading.Lock()
+
+
+def get_keyframe_indexer() -> KeyframeIndexer:
+    """Retorna a instância compartilhada do indexador (uma por processo)"""
+    global _keyframe_indexer
+    with _keyframe_indexer_lock:
+        if _keyframe_indexer is None:
+            _keyframe_indexer = KeyframeIndexer()
+        return _keyframe_indexer
@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.services.color_science import ColorScience
+from src.services.grade_engine import GradeEngine, get_grade_engine
+from src.services.lut_engine import LUT3D, get_lut_engine
+from src.services.lut_manager import LUTManager
+from src.services.metrics import metrics
+from src.services.tone_mapping import ToneMapper
+
+
+class LUTChainBaker:
+    """
+    Compõe uma pilha de grade (LUTs da biblioteca + operações de matriz e
+    curva) em uma única LUT 3D.
+
+    A cadeia é avaliada uma vez sobre a grade identidade do tamanho pedido;
+    previews e renders passam a fazer uma consulta por pixel em vez de N.
+    LUTs assadas são cacheadas pelo hash da cadeia (conteúdo das LUTs,
+    parâmetros das operações, tamanho e interpolação): em memória e como
+    .cube em disco, que é o que o FFmpeg (lut3d) consome.
+
+    Os .cube em disco têm orçamento de bytes (LRU pela data de uso, renovada a
+    cada acesso). Arquivos usados há menos de MIN_IDLE_S não são removidos,
+    para não apagar uma LUT entre a resolução da grade e a abertura pelo FFmpeg.
+    Um hash removido volta a existir ao assar a mesma cadeia de novo.
+    """
+
+    OP_TYPES = ('lut', 'grade', 'matrix', 'curve', 'convert', 'tonemap')
+    SIZES = (17, 33, 65)
+    DEFAULT_SIZE = 33
+    MAX_STEPS = 16
+    SAMPLE_POINTS = 20000  # pontos aleatórios para medir o erro da LUT assada
+    MAX_IN_MEMORY = 32
+    MIN_IDLE_S = 3600
+
+    def __init__(self, cache_dir: str = None, max_disk_bytes: int = None):
+        self.cache_dir = cache_dir or os.getenv('LUT_BAKE_CACHE_DIR', 'uploads/cache/luts')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv('LUT_BAKE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+        self.engine = get_lut_engine()
+
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._baked: "OrderedDict[str, LUT3D]" = OrderedDict()
+        self._baking: Dict[str, threading.Lock] = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'bakes': 0, 'disk_evictions': 0}
+
+    # ==========================================
+    # CADEIA
+    # ==========================================
+
+    def resolve(self, chain: List[Dict]) -> List[Dict]:
+        """
+        Valida a cadeia e carrega as LUTs. Passos aceitos:
+          {"type": "lut", "id": "slog3_rec709"}  (id da biblioteca ou hash de uma cadeia já assada)
+          {"type": "grade", "params": {"lift": 0.02, "gain": [1.05, 1, 0.95], "saturation": 1.1}}  (GradeEngine)
+          {"type": "matrix", "matrix": [[...], [...], [...]], "offset": [0, 0, 0]}
+          {"type": "curve", "gamma": 1.1} ou {"type": "curve", "points": [[0, 0], [0.5, 0.55], [1, 1]]}
+          {"type": "convert", "source": "S-Gamut3.Cine", "target": "Rec.709"}  (ColorScience)
+          {"type": "tonemap", "source": "Rec.2020 PQ", "operator": "bt2390", "peak": 1000}  (HDR -> SDR Rec.709)
+        """
+        if not isinstance(chain, list) or not chain:
+            raise ValueError("A cadeia precisa ter ao menos um passo")
+        if len(chain) > self.MAX_STEPS:
+            raise ValueError(f"Cadeia longa demais (máximo {self.MAX_STEPS} passos)")
+
+        steps = []
+        for position, step in enumerate(chain):
+            op_type = step.get('type') if isinstance(step, dict) else None
+            if op_type not in self.OP_TYPES:
+                raise ValueError(f"Passo {position}: tipo inválido (use {', '.join(self.OP_TYPES)})")
+
+            if op_type == 'lut':
+                lut = self.load_lut(str(step.get('id', '')))
+                if lut is None:
+                    raise ValueError(f"Passo {position}: LUT não encontrada: {step.get('id')}")
+                steps.append({'type': 'lut', 'id': step['id'], 'lut': lut})
+
+            elif op_type == 'grade':
+                try:
+                    params = GradeEngine.normalize(step.get('params'))
+                except ValueError as e:
+                    raise ValueError(f"Passo {position}: {e}")
+                steps.append({'type': 'grade', 'params': params})
+
+            elif op_type == 'convert':
+                try:
+                    source = ColorScience.resolve(step.get('source', ''))
+                    target = ColorScience.resolve(step.get('target', ''))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Passo {position}: espaço de cor desconhecido ({step.get('source')} -> {step.get('target')})")
+                steps.append({'type': 'convert', 'source': source, 'target': target})
+
+            elif op_type == 'tonemap':
+                try:
+                    primaries, transfer = ColorScience.resolve(step.get('source', ''))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Passo {position}: espaço de cor desconhecido ({step.get('source')})")
+                if primaries != 'rec2020' or transfer not in ToneMapper.TRANSFERS:
+                    raise ValueError(f"Passo {position}: tone mapping requer fonte BT.2020 PQ ou HLG")
+                operator = step.get('operator', 'bt2390')
+                if operator not in ToneMapper.OPERATORS:
+                    raise ValueError(f"Passo {position}: operador inválido (use {', '.join(ToneMapper.OPERATORS)})")
+                peak = float(step.get('peak') or ToneMapper.DEFAULT_SOURCE_PEAK)
+                if not ToneMapper.MIN_SOURCE_PEAK <= peak <= 10000.0:
+                    raise ValueError(f"Passo {position}: peak deve estar entre {ToneMapper.MIN_SOURCE_PEAK:g} e 10000 nits")
+                steps.append({'type': 'tonemap', 'operator': operator, 'transfer': transfer, 'peak': peak})
+
+            elif op_type == 'matrix':
+                matrix = np.asarray(step.get('matrix'), dtype=np.float32)
+                offset = np.asarray(step.get('offset', (0.0, 0.0, 0.0)), dtype=np.float32)
+                if matrix.shape != (3, 3) or offset.shape != (3,):
+                    raise ValueError(f"Passo {position}: matrix deve ser 3x3 e offset ter 3 valores")
+                steps.append({'type': 'matrix', 'matrix': matrix, 'offset': offset})
+
+            else:
+                if 'points' in step:
+                    points = np.asarray(step['points'], dtype=np.float32)
+                    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 2 or np.any(np.diff(points[:, 0]) <= 0):
+                        raise ValueError(f"Passo {position}: points deve ter pares [x, y] com x crescente")
+                    steps.append({'type': 'curve', 'points': points})
+                else:
+                    gamma = float(step.get('gamma', 1.0))
+                    if gamma <= 0:
+                        raise ValueError(f"Passo {position}: gamma deve ser positivo")
+                    steps.append({'type': 'curve', 'gamma': gamma})
+        return steps
+
+    def evaluate(self, steps: List[Dict], pixels: np.ndarray, method: str = 'tetrahedral') -> np.ndarray:
+        """Aplica a cadeia passo a passo (referência exata para a LUT assada)"""
+        values = np.array(pixels, dtype=np.float32).reshape(-1, 3)
+        for step in steps:
+            if step['type'] == 'lut':
+                values = self.engine.apply(values, step['lut'], method)
+            elif step['type'] == 'grade':
+                values = get_grade_engine().apply(values, step['params'])
+            elif step['type'] == 'convert':
+                values = ColorScience.convert(values, step['source'], step['target'])
+            elif step['type'] == 'tonemap':
+                values = ToneMapper(step['operator']).tone_map(values, step['transfer'], step['peak'])
+            elif step['type'] == 'matrix':
+                values = values @ step['matrix'].T + step['offset']
+            elif 'points' in step:
+                x, y = step['points'][:, 0], step['points'][:, 1]
+                values = np.interp(values, x, y).astype(np.float32)
+            else:
+                values = np.power(np.maximum(values, 0.0), step['gamma'], dtype=np.float32)
+        return values.reshape(np.shape(pixels))
+
+    def chain_hash(self, steps: List[Dict], size: int, method: str) -> str:
+        """Hash estável da cadeia: LUTs entram pelo hash do conteúdo, não pelo id"""
+        canonical = []
+        for step in steps:
+            if step['type'] == 'lut':
+                canonical.append(['lut', step['lut'].content_hash()])
+            elif step['type'] == 'grade':
+                canonical.append(['grade', GradeEngine.params_hash(step['params'])])
+            elif step['type'] == 'convert':
+                canonical.append(['convert', list(step['source']), list(step['target'])])
+            elif step['type'] == 'tonemap':
+                canonical.append(['tonemap', step['operator'], step['transfer'], round(step['peak'], 1)])
+            elif step['type'] == 'matrix':
+                canonical.append(['matrix', step['matrix'].round(6).tolist(), step['offset'].round(6).tolist()])
+            elif 'points' in step:
+                canonical.append(['curve', step['points'].round(6).tolist()])
+            else:
+                canonical.append(['curve', round(step['gamma'], 6)])
+        payload = json.dumps({'steps': canonical, 'size': size, 'method': method}, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()[:40]
+
+    # ==========================================
+    # ASSAR
+    # ==========================================
+
+    def bake(self, chain: List[Dict], size: int = None, method: str = 'tetrahedral',
+             with_accuracy: bool = True) -> Dict:
+        """
+        LUT única equivalente à cadeia (cacheada). Retorna hash, caminho do
+        .cube, a LUT3D e, opcionalmente, o erro medido contra a cadeia exata
+        """
+        size = size or self.DEFAULT_SIZE
+        if size not in self.SIZES:
+            raise ValueError(f"Tamanho inválido (use {', '.join(map(str, self.SIZES))})")
+        if method not in self.engine.METHODS:
+            raise ValueError(f"Interpolação desconhecida: {method}")
+
+        steps = self.resolve(chain)
+        chain_hash = self.chain_hash(steps, size, method)
+        lut, cache_status = self._get_or_bake(chain_hash, steps, size, method)
+
+        result = {
+            'hash': chain_hash,
+            'size': size,
+            'method': method,
+            'steps': len(steps),
+            'path': self.cube_path(chain_hash),
+            'lut': lut,
+            'cache': cache_status,
+        }
+        if with_accuracy:
+            result['accuracy'] = self.measure_accuracy(steps, lut, method)
+        return result
+
+    def tradeoffs(self, chain: List[Dict], method: str = 'tetrahedral') -> List[Dict]:
+        """Erro x tamanho para cada tamanho de LUT suportado"""
+        report = []
+        for size in self.SIZES:
+            started = time.time()
+            baked = self.bake(chain, size, method)
+            report.append({
+                'size': size,
+                'points': size ** 3,
+                'memory_bytes': size ** 3 * 3 * 4,
+                'cube_bytes': os.path.getsize(baked['path']),
+                'bake_s': round(time.time() - started, 3),
+                'cache': baked['cache'],
+                **baked['accuracy'],
+            })
+        return report
+
+    def measure_accuracy(self, steps: List[Dict], lut: LUT3D, method: str = 'tetrahedral') -> Dict:
+        """Erro absoluto da LUT assada contra a cadeia exata em pontos aleatórios do domínio"""
+        rng = np.random.default_rng(0)
+        samples = lut.domain_min + rng.random((self.SAMPLE_POINTS, 3), dtype=np.float32) * (lut.domain_max - lut.domain_min)
+        error = np.abs(self.engine.apply(samples, lut, method) - self.evaluate(steps, samples, method))
+        return {
+            'max_error': round(float(error.max()), 6),
+            'mean_error': round(float(error.mean()), 6),
+            'p99_error': round(float(np.percentile(error, 99)), 6),
+            'max_error_10bit': round(float(error.max()) * 1023, 2),  # em code values de 10 bits
+        }
+
+    def materialize(self, lut_ref: str) -> Optional[Dict]:
+        """
+        Arquivo .cube pronto para o lut3d do FFmpeg a partir do id de uma LUT
+        da biblioteca ou do hash de uma cadeia assada. LUTs da biblioteca são
+        reescritas pelo engine em .cube canônico, nomeado pelo hash do
+        conteúdo (que também entra na chave do cache de transcodes).
+        output_space é o espaço de saída declarado na biblioteca (None para cadeias)
+        """
+        lut = LUTManager.load_lut(lut_ref)
+        output_space = None
+        if lut is not None:
+            content_hash = lut.content_hash()[:40]
+            path = self.store(content_hash, lut)
+            output_space = (LUTManager.get_lut_by_id(lut_ref) or {}).get('output_space')
+        elif lut_ref.isalnum() and self._touch(self.cube_path(lut_ref)):
+            content_hash, path = lut_ref, self.cube_path(lut_ref)
+        else:
+            return None
+        return {'id': lut_ref, 'hash': content_hash, 'path': os.path.abspath(path), 'output_space': output_space}
+
+    def load_lut(self, lut_ref: str) -> Optional[LUT3D]:
+        """LUT da biblioteca ou .cube de uma cadeia assada (permite encadear cadeias)"""
+        lut = LUTManager.load_lut(lut_ref)
+        if lut is None and lut_ref.isalnum() and self._touch(self.cube_path(lut_ref)):
+            lut = self.engine.load(self.cube_path(lut_ref))
+        return lut
+
+    def cube_path(self, chain_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{chain_hash}.cube")
+
+    def store(self, lut_hash: str, lut: LUT3D) -> str:
+        """Grava (ou renova o uso de) o .cube de uma LUT no cache em disco e aplica o orçamento"""
+        path = self.cube_path(lut_hash)
+        if not self._touch(path):
+            lut.write_cube(path)
+            self._evict_disk()
+        return path
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {**self.stats, 'in_memory': len(self._baked)}
+        return {**stats, 'disk_bytes': sum(size for _, size, _ in self._disk_entries()),
+                'max_disk_bytes': self.max_disk_bytes}
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Renova a data de uso do arquivo (False se ele não existe)"""
+        try:
+            os.utime(path, None)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _disk_entries(self) -> List[tuple]:
+        """(data de uso, bytes, caminho) dos .cube em disco"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.cube'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict_disk(self):
+        """Remove os .cube menos usados até caber no orçamento (poupando os usados há menos de MIN_IDLE_S)"""
+        with self._disk_lock:
+            entries = sorted(self._disk_entries())
+            total = sum(size for _, size, _ in entries)
+            idle_before = time.time() - self.MIN_IDLE_S
+            for used_at, size, path in entries:
+                if total <= self.max_disk_bytes or used_at > idle_before:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                with self._lock:
+                    self.stats['disk_evictions'] += 1
+
+    def _get_or_bake(self, chain_hash: str, steps: List[Dict], size: int, method: str):
+        """Memória -> .cube em disco -> avaliação da cadeia (uma única vez por hash)"""
+        with self._lock:
+            lut = self._baked.get(chain_hash)
+            if lut is not None:
+                self._baked.move_to_end(chain_hash)
+                self.stats['memory_hits'] += 1
+            else:
+                bake_lock = self._baking.setdefault(chain_hash, threading.Lock())
+        if lut is not None:
+            # O .cube pode ter saído do disco enquanto a LUT seguia em memória
+            self.store(chain_hash, lut)
+            return lut, 'memory'
+
+        with bake_lock:
+            with self._lock:
+                lut = self._baked.get(chain_hash)
+            cache_status = 'memory'
+            if lut is None:
+                path = self.cube_path(chain_hash)
+                if self._touch(path):
+                    lut, cache_status = self.engine.load(path), 'disk'
+                else:
+                    lut, cache_status = self._bake_table(steps, size, method), 'baked'
+            self.store(chain_hash, lut)
+
+        with self._lock:
+            self.stats[{'memory': 'memory_hits', 'disk': 'disk_hits', 'baked': 'bakes'}[cache_status]] += 1
+            self._baked[chain_hash] = lut
+            self._baked.move_to_end(chain_hash)
+            while len(self._baked) > self.MAX_IN_MEMORY:
+                self._baked.popitem(last=False)
+            self._baking.pop(chain_hash, None)
+        return lut, cache_status
+
+    def _bake_table(self, steps: List[Dict], size: int, method: str) -> LUT3D:
+        """Avalia a cadeia nos pontos da grade; o domínio é o da primeira LUT da cadeia"""
+        started = time.time()
+        first = steps[0]['lut'] if steps[0]['type'] == 'lut' else None
+        domain_min = first.domain_min if first is not None else np.zeros(3, dtype=np.float32)
+        domain_max = first.domain_max if first is not None else np.ones(3, dtype=np.float32)
+
+        lattice = domain_min + LUT3D.identity(size).table * (domain_max - domain_min)
+        table = self.evaluate(steps, lattice, method)
+        metrics.observe('lut.bake_s', time.time() - started)
+        return LUT3D(table, domain_min, domain_max, title=f"Baked chain ({len(steps)} steps)")
+
+
+_lut_chain_baker = None
+_lut_chain_baker_lock = threading.Lock()
+
+
+def get_lut_chain_baker() -> LUTChainBaker:
+    """Retorna a instância compartilhada do baker de cadeias de LUT (uma por processo)"""
+    global _lut_chain_baker
+    with _lut_chain_baker_lock:
+        if _lut_chain_baker is None:
+            _lut_chain_baker = LUTChainBaker()
+        return _lut_chain_baker
@@ -0,0 +1,303 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class LUT3D:
+    """
+    LUT 3D em memória: tabela float32 (N, N, N, 3) indexada por [r][g][b].
+
+    A entrada é normalizada pelo domínio (DOMAIN_MIN/MAX do .cube) antes da
+    interpolação; a saída é o valor interpolado da tabela.
+    """
+
+    def __init__(self, table: np.ndarray, domain_min=(0.0, 0.0, 0.0), domain_max=(1.0, 1.0, 1.0),
+                 title: str = ''):
+        if table.ndim != 4 or table.shape[3] != 3 or not (table.shape[0] == table.shape[1] == table.shape[2]):
+            raise ValueError(f"Tabela de LUT inválida: shape {table.shape}")
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+        self.domain_min = np.asarray(domain_min, dtype=np.float32)
+        self.domain_max = np.asarray(domain_max, dtype=np.float32)
+        self.title = title
+
+    @property
+    def size(self) -> int:
+        return self.table.shape[0]
+
+    @classmethod
+    def identity(cls, size: int = 33) -> 'LUT3D':
+        """LUT identidade (útil como base para composição e testes)"""
+        axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+        r, g, b = np.meshgrid(axis, axis, axis, indexing='ij')
+        return cls(np.stack([r, g, b], axis=-1))
+
+    def content_hash(self) -> str:
+        """Hash do conteúdo da tabela e do domínio"""
+        digest = hashlib.sha256(self.table.tobytes())
+        digest.update(self.domain_min.tobytes())
+        digest.update(self.domain_max.tobytes())
+        return digest.hexdigest()
+
+    def to_cube(self) -> str:
+        """Serializa em .cube (vermelho varia mais rápido, como exige o formato)"""
+        lines = []
+        if self.title:
+            lines.append(f'TITLE "{self.title}"')
+        lines.append(f"LUT_3D_SIZE {self.size}")
+        if not (np.allclose(self.domain_min, 0.0) and np.allclose(self.domain_max, 1.0)):
+            lines.append("DOMAIN_MIN " + " ".join(f"{v:.6f}" for v in self.domain_min))
+            lines.append("DOMAIN_MAX " + " ".join(f"{v:.6f}" for v in self.domain_max))
+        rows = self.table.transpose(2, 1, 0, 3).reshape(-1, 3)
+        lines.extend(f"{r:.6f} {g:.6f} {b:.6f}" for r, g, b in rows)
+        return "\n".join(lines) + "\n"
+
+    def write_cube(self, path: str):
+        """
+        Grava o .cube de forma atômica. O temporário é único por chamada: escritas
+        concorrentes do mesmo arquivo não truncam uma à outra (a última vence)
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=f"{os.path.basename(path)}.", suffix='.part')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.to_cube())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class LUTEngine:
+    """
+    Leitura de LUTs .cube/.3dl e aplicação vetorizada em frames.
+
+    LUTs parseadas ficam em um LRU em memória chaveado pelo hash do conteúdo
+    do arquivo, então o mesmo arquivo (ou cópias dele) é parseado uma única vez.
+    A aplicação processa os pixels em blocos para limitar a memória em 4K.
+    """
+
+    METHODS = ('trilinear', 'tetrahedral')
+    OUTPUT_BITS = (10, 12, 16)  # profundidades de saída de .3dl
+    CHUNK_PIXELS = 1 << 20  # ~1M pixels por bloco
+    MAX_CACHED = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, LUT3D]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    # ==========================================
+    # LEITURA
+    # ==========================================
+
+    def load(self, path: str) -> LUT3D:
+        """Carrega uma LUT do disco (reaproveitando o parse pelo hash do conteúdo)"""
+        with open(path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        with self._lock:
+            lut = self._cache.get(content_hash)
+            if lut is not None:
+                self._cache.move_to_end(content_hash)
+                self.stats['hits'] += 1
+                return lut
+            self.stats['misses'] += 1
+
+        text = content.decode('utf-8', errors='replace')
+        lut = self.parse_3dl(text) if path.lower().endswith('.3dl') else self.parse_cube(text)
+
+        with self._lock:
+            self._cache[content_hash] = lut
+            while len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+        return lut
+
+    @staticmethod
+    def parse_cube(text: str) -> LUT3D:
+        """Formato .cube (Resolve/Adobe): cabeçalho + linhas RGB com vermelho variando mais rápido"""
+        size = None
+        title = ''
+        domain_min, domain_max = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+        values = []
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            keyword = line.split(None, 1)[0].upper()
+            if keyword == 'TITLE':
+                title = line[5:].strip().strip('"')
+            elif keyword == 'LUT_3D_SIZE':
+                size = int(line.split()[1])
+            elif keyword == 'LUT_1D_SIZE':
+                raise ValueError("LUTs 1D não são suportadas")
+            elif keyword == 'DOMAIN_MIN':
+                domain_min = tuple(float(v) for v in line.split()[1:4])
+            elif keyword == 'DOMAIN_MAX':
+                domain_max = tuple(float(v) for v in line.split()[1:4])
+            elif keyword[0].isdigit() or keyword[0] in '-.+':
+                values.append(line)
+            # Outras palavras-chave (LUT_3D_INPUT_RANGE etc.) são ignoradas
+
+        if not size:
+            raise ValueError("LUT_3D_SIZE ausente")
+
+        data = np.array(' '.join(values).split(), dtype=np.float32)
+        if data.size != size ** 3 * 3:
+            raise ValueError(f"Esperados {size ** 3} pontos, encontrados {data.size // 3}")
+
+        # Arquivo: índice = r + g*N + b*N² -> tabela [r][g][b]
+        table = data.reshape(size, size, size, 3).transpose(2, 1, 0, 3)
+        return LUT3D(table, domain_min, domain_max, title)
+
+    @staticmethod
+    def parse_3dl(text: str) -> LUT3D:
+        """
+        Formato .3dl (Lustre/Flame): linha de shaper com os níveis de entrada,
+        seguida de triplas inteiras com azul variando mais rápido
+        """
+        shaper = None
+        output_bits = None
+        rows = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith('Mesh'):
+                # Cabeçalho do Flame: "Mesh <bits de entrada> <bits de saída>"
+                mesh = line.split()
+                if len(mesh) == 3 and mesh[2].isdigit():
+                    output_bits = int(mesh[2])
+                continue
+            if not line or line.startswith('#') or not (line[0].isdigit() or line[0] == '-'):
+                continue
+            numbers = line.split()
+            if shaper is None and len(numbers) > 3:
+                shaper = numbers
+            elif len(numbers) == 3:
+                rows.append(line)
+
+        data = np.array(' '.join(rows).split(), dtype=np.float32).reshape(-1, 3)
+        size = len(shaper) if shaper else round(len(data) ** (1 / 3))
+        if size ** 3 != len(data):
+            raise ValueError(f"Esperados {size ** 3} pontos, encontrados {len(data)}")
+
+        # Profundidade de saída do cabeçalho Mesh; sem ele, a menor de 10, 12 ou 16 bits
+        # que comporta o maior valor (uma LUT de 12 bits que escurece não chega a 4095)
+        max_value = float(data.max())
+        if output_bits is None and max_value > 1:
+            output_bits = next((bits for bits in LUTEngine.OUTPUT_BITS if max_value <= 2 ** bits - 1),
+                               LUTEngine.OUTPUT_BITS[-1])
+        if output_bits:
+            data /= float(2 ** output_bits - 1)
+
+        return LUT3D(data.reshape(size, size, size, 3))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'cached': len(self._cache)}
+
+    @staticmethod
+    def ffmpeg_filter(path: str, method: str = 'tetrahedral') -> str:
+        """Filtro lut3d equivalente para passes do FFmpeg (caminho sem aspas simples)"""
+        if "'" in path:
+            raise ValueError("Caminho de LUT inválido para o FFmpeg")
+        return f"lut3d=file='{path}':interp={method}"
+
+    # ==========================================
+    # APLICAÇÃO
+    # ==========================================
+
+    def apply(self, image: np.ndarray, lut: LUT3D, method: str = 'tetrahedral',
+              out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Aplica a LUT a uma imagem (..., 3) float32. Processa em blocos de
+        CHUNK_PIXELS; out pode ser a própria imagem (aplicação in-place)
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Interpolação desconhecida: {method}")
+
+        pixels = image.reshape(-1, 3)
+        result = out.reshape(-1, 3) if out is not None else np.empty_like(pixels, dtype=np.float32)
+        interpolate = self._tetrahedral if method == 'tetrahedral' else self._trilinear
+
+        for start in range(0, len(pixels), self.CHUNK_PIXELS):
+            chunk = slice(start, start + self.CHUNK_PIXELS)
+            result[chunk] = interpolate(pixels[chunk], lut)
+        return result.reshape(image.shape)
+
+    @staticmethod
+    def _lattice(pixels: np.ndarray, lut: LUT3D):
+        """Índice do canto inferior da célula e frações dentro dela"""
+        n = lut.size
+        scaled = (pixels - lut.domain_min) / (lut.domain_max - lut.domain_min) * (n - 1)
+        scaled = np.clip(scaled, 0.0, n - 1)
+        base = np.minimum(scaled.astype(np.int32), n - 2)
+        fraction = (scaled - base).astype(np.float32)
+        return base, fraction
+
+    @staticmethod
+    def _trilinear(pixels: np.ndarray, lut: LUT3D) -> np.ndarray:
+        """Interpolação trilinear (8 vizinhos)"""
+        n = lut.size
+        table = lut.table.reshape(-1, 3)
+        base, f = LUTEngine._lattice(pixels, lut)
+        index = (base[:, 0] * n + base[:, 1]) * n + base[:, 2]
+        fr, fg, fb = f[:, 0:1], f[:, 1:2], f[:, 2:3]
+
+        stride_r, stride_g = n * n, n
+        c000, c001 = table[index], table[index + 1]
+        c010, c011 = table[index + stride_g], table[index + stride_g + 1]
+        c100, c101 = table[index + stride_r], table[index + stride_r + 1]
+        c110, c111 = table[index + stride_r + stride_g], table[index + stride_r + stride_g + 1]
+
+        c00 = c000 + (c001 - c000) * fb
+        c01 = c010 + (c011 - c010) * fb
+        c10 = c100 + (c101 - c100) * fb
+        c11 = c110 + (c111 - c110) * fb
+        c0 = c00 + (c01 - c00) * fg
+        c1 = c10 + (c11 - c10) * fg
+        return c0 + (c1 - c0) * fr
+
+    @staticmethod
+    def _tetrahedral(pixels: np.ndarray, lut: LUT3D) -> np.ndarray:
+        """
+        Interpolação tetraédrica (4 vizinhos): ordena as frações f1 >= f2 >= f3
+        e caminha do canto 000 ao 111 pelos eixos nessa ordem
+        """
+        n = lut.size
+        table = lut.table.reshape(-1, 3)
+        base, f = LUTEngine._lattice(pixels, lut)
+        index = (base[:, 0] * n + base[:, 1]) * n + base[:, 2]
+
+        order = np.argsort(-f, axis=1, kind='stable')
+        f_sorted = np.take_along_axis(f, order, axis=1)
+        strides = np.array([n * n, n, 1], dtype=np.int32)[order]
+
+        first = index + strides[:, 0]
+        second = first + strides[:, 1]
+        last = index + (n * n + n + 1)
+
+        w0 = 1.0 - f_sorted[:, 0:1]
+        w1 = f_sorted[:, 0:1] - f_sorted[:, 1:2]
+        w2 = f_sorted[:, 1:2] - f_sorted[:, 2:3]
+        w3 = f_sorted[:, 2:3]
+        return w0 * table[index] + w1 * table[first] + w2 * table[second] + w3 * table[last]
+
+
+_lut_engine = None
+_lut_engine_lock = threading.Lock()
+
+
+def get_lut_engine() -> LUTEngine:
+    """Retorna a instância compartilhada do engine de LUTs (uma por processo)"""
+    global _lut_engine
+    with _lut_engine_lock:
+        if _lut_engine is None:
+            _lut_engine = LUTEngine()
+        return _lut_engine
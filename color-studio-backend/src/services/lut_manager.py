@@ -1,8 +1,17 @@
-from typing import List, Dict
+import os
+import re
+import threading
+from typing import List, Dict, Optional, Tuple
 
 class LUTManager:
     """Gerencia biblioteca de LUTs e compatibilidade"""
     
+    # Diretório com os arquivos .cube/.3dl (nome do arquivo = id da LUT)
+    LUT_DIR = os.getenv('LUT_DIR', 'luts')
+
+    # Ids viram nomes de arquivo e chaves de cache: sem separadores de caminho
+    LUT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+    
     # Biblioteca de LUTs organizadas por formato de entrada
     LUT_LIBRARY = {
         'BRAW': {
@@ -60,25 +69,57 @@ class LUTManager:
         }
     }
     
+    # Índices derivados de LUT_LIBRARY (construídos sob demanda e mantidos
+    # incrementalmente por add_lut/remove_lut)
+    _index_lock = threading.RLock()
+    _by_id: Optional[Dict[str, Tuple[Dict, str, str]]] = None
+    _by_format: Dict[Tuple[str, str], List[Dict]] = {}
+    _by_space: Dict[Tuple[str, str], List[Dict]] = {}
+    _by_input: Dict[str, List[Dict]] = {}
+    _by_output: Dict[str, List[Dict]] = {}
+
+    # Memos: categoria por (color_space, gamma) e resultado de compatibilidade
+    MAX_MEMO_ENTRIES = 4096
+    _category_memo: Dict[Tuple[str, str], str] = {}
+    _compatible_memo: Dict[Tuple[str, str, str], List[Dict]] = {}
+
     @staticmethod
     def get_compatible_luts(color_space: str, gamma: str, project_type: str) -> List[Dict]:
         """
         Retorna LUTs compatíveis baseado no color space detectado e tipo de projeto
         """
-        # Determinar categoria do formato
-        format_category = LUTManager._categorize_format(color_space, gamma)
-        
-        # Buscar LUTs compatíveis
-        if format_category in LUTManager.LUT_LIBRARY:
-            if project_type in LUTManager.LUT_LIBRARY[format_category]:
-                return LUTManager.LUT_LIBRARY[format_category][project_type]
-        
-        # Fallback para Rec.709 SDR
-        return LUTManager.LUT_LIBRARY['Rec.709']['SDR']
-    
+        memo_key = (color_space, gamma, project_type)
+        luts = LUTManager._compatible_memo.get(memo_key)
+        if luts is not None:
+            return luts
+
+        with LUTManager._index_lock:
+            LUTManager._ensure_index()
+
+            # Determinar categoria do formato
+            format_category = LUTManager._categorize_format(color_space, gamma)
+
+            # Buscar LUTs compatíveis (fallback para Rec.709 SDR)
+            luts = LUTManager._by_format.get((format_category, project_type))
+            if luts is None:
+                luts = LUTManager._by_format.get(('Rec.709', 'SDR'), [])
+
+            LUTManager._remember(LUTManager._compatible_memo, memo_key, luts)
+            return luts
+
     @staticmethod
     def _categorize_format(color_space: str, gamma: str) -> str:
         """Categoriza o formato detectado"""
+        memo_key = (color_space, gamma)
+        category = LUTManager._category_memo.get(memo_key)
+        if category is None:
+            category = LUTManager._detect_category(color_space, gamma)
+            LUTManager._remember(LUTManager._category_memo, memo_key, category)
+        return category
+
+    @staticmethod
+    def _detect_category(color_space: str, gamma: str) -> str:
+        """Regras de categorização (sem memo)"""
         color_space_lower = color_space.lower()
         gamma_lower = gamma.lower()
         
@@ -95,6 +136,13 @@ class LUTManager:
         
         # Default
         return 'Rec.709'
+
+    @staticmethod
+    def _remember(memo: Dict, key, value):
+        """Grava no memo, descartando tudo ao atingir o limite (entradas são baratas de recalcular)"""
+        if len(memo) >= LUTManager.MAX_MEMO_ENTRIES:
+            memo.clear()
+        memo[key] = value
     
     @staticmethod
     def get_all_luts() -> Dict:
@@ -108,10 +156,127 @@ class LUTManager:
         """
         Busca uma LUT específica por ID
         """
-        for format_cat in LUTManager.LUT_LIBRARY.values():
-            for project_type in format_cat.values():
-                for lut in project_type:
-                    if lut['id'] == lut_id:
-                        return lut
-        return None
+        by_id = LUTManager._by_id
+        if by_id is None:
+            with LUTManager._index_lock:
+                by_id = LUTManager._ensure_index()
+        entry = by_id.get(lut_id)
+        return entry[0] if entry else None
+
+    @staticmethod
+    def find_luts(input_space: Optional[str] = None, output_space: Optional[str] = None) -> List[Dict]:
+        """
+        LUTs por espaço de entrada e/ou saída (sem filtros, a biblioteca inteira)
+        """
+        with LUTManager._index_lock:
+            by_id = LUTManager._ensure_index()
+            if input_space and output_space:
+                return list(LUTManager._by_space.get((input_space, output_space), []))
+            if input_space:
+                return list(LUTManager._by_input.get(input_space, []))
+            if output_space:
+                return list(LUTManager._by_output.get(output_space, []))
+            return [lut for lut, _, _ in by_id.values()]
 
+    @staticmethod
+    def add_lut(format_category: str, project_type: str, lut: Dict) -> Dict:
+        """
+        Adiciona uma LUT à biblioteca (ex.: upload do usuário) e atualiza os índices
+        """
+        missing = [field for field in ('id', 'name', 'input_space', 'output_space') if not lut.get(field)]
+        if missing:
+            raise ValueError(f"Campos obrigatórios ausentes: {', '.join(missing)}")
+        if not isinstance(lut['id'], str) or not LUTManager.LUT_ID_PATTERN.fullmatch(lut['id']):
+            raise ValueError(f"id de LUT inválido: {lut['id']!r} (use letras, números, '_', '.' ou '-')")
+
+        with LUTManager._index_lock:
+            by_id = LUTManager._ensure_index()
+            if lut['id'] in by_id:
+                raise ValueError(f"LUT já existe: {lut['id']}")
+
+            luts = LUTManager.LUT_LIBRARY.setdefault(format_category, {}).setdefault(project_type, [])
+            luts.append(lut)
+            LUTManager._index_lut(lut, format_category, project_type, luts)
+            LUTManager._compatible_memo.clear()
+        return lut
+
+    @staticmethod
+    def remove_lut(lut_id: str) -> bool:
+        """
+        Remove uma LUT da biblioteca e dos índices (False se não existir)
+        """
+        with LUTManager._index_lock:
+            entry = LUTManager._ensure_index().pop(lut_id, None)
+            if entry is None:
+                return False
+            lut, format_category, project_type = entry
+
+            LUTManager._discard(LUTManager.LUT_LIBRARY[format_category], project_type, lut)
+            LUTManager._discard(LUTManager._by_space, (lut['input_space'], lut['output_space']), lut)
+            LUTManager._discard(LUTManager._by_input, lut['input_space'], lut)
+            LUTManager._discard(LUTManager._by_output, lut['output_space'], lut)
+            if project_type not in LUTManager.LUT_LIBRARY[format_category]:
+                LUTManager._by_format.pop((format_category, project_type), None)
+                if not LUTManager.LUT_LIBRARY[format_category]:
+                    del LUTManager.LUT_LIBRARY[format_category]
+            LUTManager._compatible_memo.clear()
+            return True
+
+    @staticmethod
+    def _ensure_index() -> Dict[str, Tuple[Dict, str, str]]:
+        """Constrói os índices a partir de LUT_LIBRARY na primeira consulta (chamar com _index_lock)"""
+        if LUTManager._by_id is not None:
+            return LUTManager._by_id
+
+        LUTManager._by_id = {}
+        LUTManager._by_format = {}
+        LUTManager._by_space = {}
+        LUTManager._by_input = {}
+        LUTManager._by_output = {}
+        for format_category, project_types in LUTManager.LUT_LIBRARY.items():
+            for project_type, luts in project_types.items():
+                for lut in luts:
+                    LUTManager._index_lut(lut, format_category, project_type, luts)
+        return LUTManager._by_id
+
+    @staticmethod
+    def _index_lut(lut: Dict, format_category: str, project_type: str, luts: List[Dict]):
+        """Registra uma LUT em todos os índices"""
+        LUTManager._by_id[lut['id']] = (lut, format_category, project_type)
+        # Mesma lista da biblioteca: get_compatible_luts continua retornando LUT_LIBRARY[fmt][tipo]
+        LUTManager._by_format[(format_category, project_type)] = luts
+        LUTManager._by_space.setdefault((lut['input_space'], lut['output_space']), []).append(lut)
+        LUTManager._by_input.setdefault(lut['input_space'], []).append(lut)
+        LUTManager._by_output.setdefault(lut['output_space'], []).append(lut)
+
+    @staticmethod
+    def _discard(index: Dict, key, lut: Dict):
+        """Remove a LUT da lista index[key], apagando a chave se a lista esvaziar"""
+        luts = index.get(key)
+        if luts is None:
+            return
+        luts[:] = [item for item in luts if item is not lut]
+        if not luts:
+            del index[key]
+    
+    @staticmethod
+    def get_lut_path(lut_id: str) -> Optional[str]:
+        """
+        Caminho do arquivo .cube/.3dl de uma LUT da biblioteca (None se não existir)
+        """
+        if not LUTManager.get_lut_by_id(lut_id):
+            return None
+        for extension in ('.cube', '.3dl'):
+            path = os.path.join(LUTManager.LUT_DIR, f"{lut_id}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+    
+    @staticmethod
+    def load_lut(lut_id: str):
+        """
+        Dados da LUT (LUT3D) parseados pelo engine, ou None se o arquivo não existir
+        """
+        from .lut_engine import get_lut_engine
+        path = LUTManager.get_lut_path(lut_id)
+        return get_lut_engine().load(path) if path else None
@@ -0,0 +1,230 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.media_file import MediaFile
+from src.services.frame_reader import FrameReader
+from src.services.lut_chain import get_lut_chain_baker
+from src.services.lut_engine import get_lut_engine
+from src.services.scope_engine import ScopeEngine
+from src.services.source_cache import get_source_cache
+from src.services.tone_mapping import ToneMapper
+from src.services.video_analyzer import VideoAnalyzer
+
+
+class LUTPreviewService:
+    """
+    Stills antes/depois de um MediaFile sob uma LUT (biblioteca, cadeia
+    assada ou shot match) ou sob tone mapping HDR -> SDR.
+
+    Os frames representativos são decodificados uma única vez e mantidos em
+    memória (até MAX_DECODED_BYTES); cada LUT é aplicada pelo engine sobre o frame já decodificado.
+    Os PNGs ficam em um LRU chaveado por (mídia, frames, LUT), então percorrer
+    20 LUTs custa uma decodificação e 20 aplicações (e nada ao voltar).
+    """
+
+    DEFAULT_WIDTH = 640
+    MAX_WIDTH = 1280
+    MAX_FRAMES = 8  # frames por tira
+    # Frames float32 decodificados: ~11 MB cada em 1280 px 16:9, então o limite é em bytes
+    MAX_DECODED_BYTES = int(os.getenv('LUT_PREVIEW_DECODED_BYTES', 256 * 1024 * 1024))
+    MAX_RENDERS = 256
+    GUTTER = 4  # pixels entre os painéis
+
+    def __init__(self, source_cache=None):
+        self.source_cache = source_cache or get_source_cache()
+        self.engine = get_lut_engine()
+
+        self._lock = threading.Lock()
+        self._decoded: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._decoded_bytes = 0
+        self._renders: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._sources: Dict[str, Dict] = {}  # duração e curva de cada fonte
+        self.stats = {'render_hits': 0, 'decode_hits': 0, 'decodes': 0, 'renders': 0}
+
+    def render(self, media_file_id: int, lut_id: str, timestamp: float = None, frames: int = 1,
+               width: int = None) -> Dict:
+        """
+        PNG com uma linha por frame: original à esquerda, com a LUT à direita.
+        Sem timestamp, usa frames igualmente espaçados (o meio do arquivo para 1 frame)
+        """
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        lut = get_lut_chain_baker().load_lut(lut_id)
+        if lut is None:
+            return {"success": False, "error": f"LUT not found: {lut_id}", "status": 404}
+
+        lut_hash = lut.content_hash()
+        result = self._render(
+            media_file, timestamp, frames, width,
+            variant=lambda timestamps: ('lut', lut_hash),
+            grade=lambda originals, timestamps, source: [self.engine.apply(frame, lut) for frame in originals]
+        )
+        if result["success"]:
+            result["lut_id"] = lut_id
+        return result
+
+    def render_tone_mapped(self, media_file_id: int, operator: str = 'bt2390', timestamp: float = None,
+                           frames: int = 1, width: int = None) -> Dict:
+        """
+        PNG antes|depois de uma fonte HDR (PQ/HLG) vista em monitor SDR: sinal
+        original à esquerda, tone mapping para Rec.709 à direita. O pico de
+        cada frame vem das estatísticas da cena que o contém (file_metadata)
+        """
+        if operator not in ToneMapper.OPERATORS:
+            return {"success": False, "error": f"Unknown operator: {operator}", "status": 400}
+
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        mapper = ToneMapper(operator)
+        scene_peaks = ToneMapper.scene_peaks(media_file.file_metadata)
+
+        def grade(originals, timestamps, source):
+            if source['transfer'] not in ToneMapper.TRANSFERS:
+                raise ValueError("Source is not HDR (PQ/HLG)")
+            peaks = [ToneMapper.peak_at(scene_peaks, t) for t in timestamps]
+            return list(mapper.tone_map(np.stack(originals), source['transfer'], peaks))
+
+        result = self._render(
+            media_file, timestamp, frames, width,
+            variant=lambda timestamps: ('tonemap', operator,
+                                        tuple(ToneMapper.peak_at(scene_peaks, t) for t in timestamps)),
+            grade=grade
+        )
+        if result["success"]:
+            result["operator"] = operator
+        return result
+
+    def _render(self, media_file: MediaFile, timestamp: Optional[float], frames: int, width: Optional[int],
+                variant: Callable, grade: Callable) -> Dict:
+        """
+        Fluxo comum dos previews: cache de PNG -> frames decodificados (cacheados
+        sem grade) -> grade(originais, instantes, info da fonte) -> PNG.
+        variant(instantes) identifica a grade na chave do cache
+        """
+        width = min(width or self.DEFAULT_WIDTH, self.MAX_WIDTH)
+        frames = max(1, min(frames, self.MAX_FRAMES))
+
+        object_info = self.source_cache.r2_service.get_object_info(media_file.storage_key)
+        if not object_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {object_info['error']}"}
+        source_id = f"{media_file.storage_key}@{object_info['etag']}"
+
+        timestamps = self._timestamps(source_id, timestamp, frames)
+        cached = self._get_render((source_id, tuple(timestamps), width, variant(timestamps))) if timestamps else None
+        if cached is not None:
+            return self._result(timestamps, cached, 'hit')
+
+        try:
+            with self.source_cache.checkout(media_file.storage_key, object_info["etag"]) as source_path:
+                source = self._source_info(source_id, source_path)
+                if not timestamps:
+                    timestamps = self._timestamps(source_id, timestamp, frames)
+                    cached = self._get_render((source_id, tuple(timestamps), width, variant(timestamps)))
+                    if cached is not None:
+                        return self._result(timestamps, cached, 'hit')
+
+                originals = [self._get_frame(source_path, source_id, t, width) for t in timestamps]
+        except Exception as e:
+            return {"success": False, "error": f"Preview decoding failed: {str(e)}"}
+
+        try:
+            graded = grade(originals, timestamps, source)
+        except ValueError as e:
+            return {"success": False, "error": str(e), "status": 400}
+        data = ScopeEngine.encode_png(self.compose(originals, graded))
+
+        with self._lock:
+            self.stats['renders'] += 1
+            self._renders[(source_id, tuple(timestamps), width, variant(timestamps))] = data
+            while len(self._renders) > self.MAX_RENDERS:
+                self._renders.popitem(last=False)
+        return self._result(timestamps, data, 'miss')
+
+    def compose(self, originals: List[np.ndarray], graded: List[np.ndarray]) -> np.ndarray:
+        """Monta a grade antes|depois (uint8 RGB) a partir de frames float em [0, 1]"""
+        height, width = originals[0].shape[:2]
+        rows = len(originals)
+        canvas = np.zeros((rows * height + (rows - 1) * self.GUTTER, 2 * width + self.GUTTER, 3), dtype=np.uint8)
+        for row, (before, after) in enumerate(zip(originals, graded)):
+            top = row * (height + self.GUTTER)
+            canvas[top:top + height, :width] = self._to_uint8(before)
+            canvas[top:top + height, width + self.GUTTER:] = self._to_uint8(after)
+        return canvas
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'decoded': len(self._decoded), 'decoded_bytes': self._decoded_bytes,
+                    'cached_renders': len(self._renders)}
+
+    def _timestamps(self, source_id: str, timestamp: float, frames: int) -> List[float]:
+        """
+        Instantes dos frames da tira (arredondados para reaproveitar o cache).
+        Vazio se a duração da fonte ainda não é conhecida
+        """
+        if timestamp is not None:
+            return [round(max(timestamp, 0.0), 3)]
+        with self._lock:
+            source = self._sources.get(source_id)
+        if source is None:
+            return []
+        return [round(source['duration'] * (i + 0.5) / frames, 3) for i in range(frames)]
+
+    def _source_info(self, source_id: str, source_path: str) -> Dict:
+        """Duração e curva ('pq', 'hlg' ou 'sdr') da fonte, lidas uma vez por versão do objeto"""
+        with self._lock:
+            source = self._sources.get(source_id)
+        if source is None:
+            analysis = VideoAnalyzer.analyze_video(source_path)
+            source = {'duration': analysis['duration'], 'transfer': ToneMapper.transfer_from_gamma(analysis['gamma'])}
+            with self._lock:
+                self._sources[source_id] = source
+        return source
+
+    def _get_render(self, render_key: Tuple):
+        with self._lock:
+            cached = self._renders.get(render_key)
+            if cached is not None:
+                self._renders.move_to_end(render_key)
+                self.stats['render_hits'] += 1
+            return cached
+
+    def _get_frame(self, source_path: str, source_id: str, timestamp: float, width: int) -> np.ndarray:
+        """Frame decodificado (sem LUT), decodificado uma vez e reaproveitado entre LUTs"""
+        frame_key = (source_id, timestamp, width)
+        with self._lock:
+            frame = self._decoded.get(frame_key)
+            if frame is not None:
+                self._decoded.move_to_end(frame_key)
+                self.stats['decode_hits'] += 1
+                return frame
+            self.stats['decodes'] += 1
+
+        frame = FrameReader.read_frame(source_path, timestamp, width=width)
+
+        with self._lock:
+            previous = self._decoded.pop(frame_key, None)
+            if previous is not None:
+                self._decoded_bytes -= previous.nbytes
+            self._decoded[frame_key] = frame
+            self._decoded_bytes += frame.nbytes
+            # O frame recém-decodificado fica mesmo se sozinho passar do limite
+            while self._decoded_bytes > self.MAX_DECODED_BYTES and len(self._decoded) > 1:
+                _, evicted = self._decoded.popitem(last=False)
+                self._decoded_bytes -= evicted.nbytes
+        return frame
+
+    @staticmethod
+    def _to_uint8(frame: np.ndarray) -> np.ndarray:
+        return (np.clip(frame, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+    @staticmethod
+    def _result(timestamps: List[float], data: bytes, cache_status: str) -> Dict:
+        return {"success": True, "timestamps": timestamps, "data": data, "cache": cache_status}
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+
+class MetricsRegistry:
+    """
+    Registro simples de métricas em memória (por processo).
+
+    Cada métrica guarda as últimas observações em uma janela limitada e
+    expõe contagem, média e percentis.
+    """
+
+    WINDOW_SIZE = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def observe(self, name: str, value: float):
+        """Registra uma observação"""
+        with self._lock:
+            series = self._series.setdefault(name, deque(maxlen=self.WINDOW_SIZE))
+            series.append(float(value))
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mede a duração do bloco em segundos"""
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.observe(name, time.time() - started)
+
+    def snapshot(self) -> Dict:
+        """Resumo de todas as métricas"""
+        with self._lock:
+            return {name: self._summarize(name, list(series)) for name, series in self._series.items()}
+
+    def _summarize(self, name: str, values: list) -> Dict:
+        """Contagem, última, média e percentis da janela"""
+        ordered = sorted(values)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+        return {
+            'count': self._counts[name],
+            'last': round(values[-1], 4),
+            'avg': round(sum(values) / len(values), 4),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'max': round(ordered[-1], 4),
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,148 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+
+class ProbeCache:
+    """
+    Cache dos resultados do ffprobe.
+
+    Cada mídia tem uma identidade (caminho local ou key no R2) e uma impressão
+    digital da versão (tamanho + mtime, ou ETag). Uma entrada cuja impressão
+    digital não confere é descartada, então arquivos alterados são reanalisados.
+    Um LRU em memória fica na frente das entradas persistidas em disco.
+    """
+
+    DEFAULT_MEMORY_ENTRIES = 1024
+
+    def __init__(self, cache_dir: str = None, memory_entries: int = None):
+        self.cache_dir = cache_dir or os.getenv('PROBE_CACHE_DIR', 'uploads/cache/probe')
+        self.memory_entries = memory_entries or int(os.getenv('PROBE_CACHE_MEMORY_ENTRIES', self.DEFAULT_MEMORY_ENTRIES))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @staticmethod
+    def local_identity(file_path: str) -> Tuple[str, Dict]:
+        """Identidade e impressão digital de um arquivo local"""
+        stat = os.stat(file_path)
+        identity = f"file:{os.path.abspath(file_path)}"
+        return identity, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def remote_identity(r2_key: str, etag: str) -> Tuple[str, Dict]:
+        """Identidade e impressão digital de um objeto no R2"""
+        return f"r2:{r2_key}", {'etag': (etag or '').strip('"')}
+
+    def get(self, identity: str, fingerprint: Dict) -> Optional[Dict]:
+        """Resultado do probe para a versão atual da mídia, ou None"""
+        with self._lock:
+            entry = self._memory.get(identity)
+            if entry is not None:
+                if entry['fingerprint'] == fingerprint:
+                    self._memory.move_to_end(identity)
+                    self.stats['memory_hits'] += 1
+                    return entry['data']
+                self._invalidate_locked(identity)
+                self.stats['misses'] += 1
+                return None
+
+        entry = self._read_entry(identity)
+        with self._lock:
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if entry['fingerprint'] != fingerprint:
+                self._invalidate_locked(identity)
+                self.stats['misses'] += 1
+                return None
+
+            self._remember_locked(identity, entry)
+            self.stats['disk_hits'] += 1
+            return entry['data']
+
+    def put(self, identity: str, fingerprint: Dict, data: Dict):
+        """Armazena o resultado do probe"""
+        entry = {
+            'identity': identity,
+            'fingerprint': fingerprint,
+            'data': data,
+            'created_at': datetime.now().isoformat(),
+        }
+
+        entry_path = self._get_entry_path(identity)
+        tmp_path = f"{entry_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+        with self._lock:
+            self._remember_locked(identity, entry)
+
+    def invalidate(self, identity: str) -> bool:
+        """Remove a entrada (ex: arquivo sobrescrito ou removido)"""
+        with self._lock:
+            return self._invalidate_locked(identity)
+
+    def get_stats(self) -> Dict:
+        """Métricas do cache"""
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            total = hits + self.stats['misses']
+            return {
+                **self.stats,
+                'memory_entries': len(self._memory),
+                'hit_rate': round(hits / total, 3) if total else 0.0,
+            }
+
+    def _remember_locked(self, identity: str, entry: Dict):
+        """Coloca a entrada no LRU em memória"""
+        self._memory[identity] = entry
+        self._memory.move_to_end(identity)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _invalidate_locked(self, identity: str) -> bool:
+        """Remove a entrada da memória e do disco"""
+        removed = self._memory.pop(identity, None) is not None
+        try:
+            os.remove(self._get_entry_path(identity))
+            removed = True
+        except FileNotFoundError:
+            pass
+        if removed:
+            self.stats['invalidations'] += 1
+        return removed
+
+    def _read_entry(self, identity: str) -> Optional[Dict]:
+        """Lê a entrada persistida (None se ausente ou corrompida)"""
+        try:
+            with open(self._get_entry_path(identity), 'r') as f:
+                entry = json.load(f)
+            return entry if entry.get('identity') == identity else None
+        except (OSError, ValueError):
+            return None
+
+    def _get_entry_path(self, identity: str) -> str:
+        """Caminho da entrada no disco"""
+        digest = hashlib.sha256(identity.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    """Retorna a instância compartilhada do cache de probes (uma por processo)"""
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = ProbeCache()
+        return _probe_cache
@@ -289,6 +289,131 @@ class R2UploadService:
                 'error': str(e)
             }
     
+    def get_object_info(self, key):
+        """
+        Retorna tamanho e ETag de um objeto (identidade da fonte para caches)
+        """
+        # Modo de teste - simular metadados
+        if self.test_mode:
+            print(f"🧪 [TEST MODE] Simulando HEAD de {key}")
+            return {
+                'success': True,
+                'key': key,
+                'size': 0,
+                'etag': f"test-{uuid.uuid5(uuid.NAMESPACE_URL, key).hex}"
+            }
+
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=key
+            )
+
+            return {
+                'success': True,
+                'key': key,
+                'size': response['ContentLength'],
+                'etag': response['ETag'].strip('"'),
+                'content_type': response.get('ContentType'),
+                'last_modified': response['LastModified'].isoformat()
+            }
+
+        except ClientError as e:
+            print(f"❌ Erro ao obter metadados do objeto: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        except Exception as e:
+            print(f"❌ Erro inesperado ao obter metadados do objeto: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def upload_file(self, local_path, key, content_type=None, cache_control=None):
+        """
+        Faz upload de um arquivo local (saídas de conversão/packaging) para o R2
+        """
+        # Modo de teste - simular upload
+        if self.test_mode:
+            print(f"🧪 [TEST MODE] Upload simulado de {local_path} para {key}")
+            return {'success': True, 'key': key}
+
+        try:
+            extra_args = {
+                'ContentType': content_type or mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+            }
+            if cache_control:
+                extra_args['CacheControl'] = cache_control
+
+            self.s3_client.upload_file(
+                local_path,
+                self.bucket_name,
+                key,
+                ExtraArgs=extra_args
+            )
+
+            return {'success': True, 'key': key}
+
+        except ClientError as e:
+            print(f"❌ Erro ao fazer upload de {key}: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        except Exception as e:
+            print(f"❌ Erro inesperado ao fazer upload de {key}: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def get_object(self, key, byte_range=None, if_none_match=None):
+        """
+        Lê um objeto do R2 (opcionalmente um range 'bytes=inicio-fim')
+        Retorna o corpo como stream para ser repassado ao cliente
+        """
+        if self.test_mode:
+            return {'success': False, 'status': 404, 'error': 'Objeto indisponível em modo de teste'}
+
+        try:
+            params = {'Bucket': self.bucket_name, 'Key': key}
+            if byte_range:
+                params['Range'] = byte_range
+            if if_none_match:
+                params['IfNoneMatch'] = if_none_match
+
+            response = self.s3_client.get_object(**params)
+
+            return {
+                'success': True,
+                'status': 206 if byte_range else 200,
+                'body': response['Body'],
+                'content_type': response.get('ContentType'),
+                'content_length': response.get('ContentLength'),
+                'content_range': response.get('ContentRange'),
+                'cache_control': response.get('CacheControl'),
+                'etag': response.get('ETag')
+            }
+
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 500)
+            if status != 304:
+                print(f"❌ Erro ao ler objeto {key}: {e}")
+            return {
+                'success': False,
+                'status': status,
+                'error': str(e)
+            }
+        except Exception as e:
+            print(f"❌ Erro inesperado ao ler objeto {key}: {e}")
+            return {
+                'success': False,
+                'status': 500,
+                'error': str(e)
+            }
+
     def delete_file(self, key):
         """
         Deleta um arquivo do R2
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RangeDownloadError(Exception):
+    """Falha no download por ranges (rede, tamanho ou ETag divergente)"""
+
+
+class RangeDownloader:
+    """
+    Downloader HTTP paralelo por ranges (substitui o wget).
+
+    O objeto é dividido em chunks baixados simultaneamente por um pool de
+    conexões reutilizáveis e gravados com pwrite em um arquivo pré-alocado.
+    O progresso fica em um arquivo de estado ao lado do destino, permitindo
+    retomar o download após falhas. Tamanho e ETag são verificados no final.
+    """
+
+    DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024  # 16MB
+    DEFAULT_WORKERS = 8
+    READ_SIZE = 1024 * 1024  # 1MB por leitura do socket
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None,
+                 max_retries: int = 3, timeout: int = 60):
+        self.max_workers = max_workers or int(os.getenv('DOWNLOAD_WORKERS', self.DEFAULT_WORKERS))
+        self.chunk_size = chunk_size or int(os.getenv('DOWNLOAD_CHUNK_SIZE', self.DEFAULT_CHUNK_SIZE))
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        # Pool de conexões dimensionado para o número de workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def download(self, url: str, dest_path: str, expected_size: int = None, expected_etag: str = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Baixa url para dest_path e retorna estatísticas do download
+
+        Raises:
+            RangeDownloadError: se o download falhar ou a verificação divergir
+        """
+        started = time.time()
+        size, etag, supports_ranges = self._probe(url)
+
+        if expected_size is not None and size != expected_size:
+            raise RangeDownloadError(f"Tamanho divergente: esperado {expected_size}, servidor {size}")
+        if expected_etag and etag and etag != expected_etag.strip('"'):
+            raise RangeDownloadError(f"ETag divergente: esperado {expected_etag}, servidor {etag}")
+
+        if not supports_ranges:
+            self._download_single(url, dest_path, size, progress_callback)
+            resumed_bytes = 0
+        else:
+            resumed_bytes = self._download_ranges(url, dest_path, size, etag, progress_callback)
+
+        actual_size = os.path.getsize(dest_path)
+        if actual_size != size:
+            raise RangeDownloadError(f"Tamanho final divergente: esperado {size}, gravado {actual_size}")
+
+        if etag and self._is_plain_md5(etag):
+            digest = self._md5_file(dest_path)
+            if digest != etag:
+                self._clear_state(dest_path)
+                raise RangeDownloadError(f"Checksum divergente: ETag {etag}, arquivo {digest}")
+
+        self._clear_state(dest_path)
+
+        elapsed = time.time() - started
+        transferred = size - resumed_bytes
+        return {
+            'size': size,
+            'etag': etag,
+            'elapsed': round(elapsed, 3),
+            'resumed_bytes': resumed_bytes,
+            'throughput_mbps': round((transferred / (1024 * 1024)) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def _probe(self, url: str):
+        """
+        Descobre tamanho, ETag e suporte a ranges com um GET bytes=0-0
+        (URLs presigned de GET não aceitam HEAD)
+        """
+        response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.timeout)
+        try:
+            if response.status_code == 206:
+                content_range = response.headers.get('Content-Range', '')
+                total = content_range.rsplit('/', 1)[-1]
+                if not total.isdigit():
+                    raise RangeDownloadError(f"Content-Range inválido: {content_range}")
+                return int(total), self._clean_etag(response.headers.get('ETag')), True
+
+            if response.status_code == 200:
+                length = response.headers.get('Content-Length')
+                if length is None:
+                    raise RangeDownloadError("Servidor não informou o tamanho do objeto")
+                return int(length), self._clean_etag(response.headers.get('ETag')), False
+
+            raise RangeDownloadError(f"HTTP {response.status_code} ao consultar {url}")
+        finally:
+            response.close()
+
+    def _download_ranges(self, url: str, dest_path: str, size: int, etag: Optional[str],
+                         progress_callback) -> int:
+        """Baixa os chunks pendentes em paralelo; retorna bytes reaproveitados de uma execução anterior"""
+        num_chunks = max(1, -(-size // self.chunk_size))
+        state = self._load_state(dest_path)
+
+        if state and state.get('size') == size and state.get('etag') == etag \
+                and state.get('chunk_size') == self.chunk_size and os.path.exists(dest_path):
+            done = set(state['done'])
+            print(f"🔁 Retomando download: {len(done)}/{num_chunks} chunks já concluídos")
+        else:
+            done = set()
+
+        resumed_bytes = sum(self._chunk_length(i, size) for i in done)
+        progress = {'bytes': resumed_bytes}
+        state_lock = threading.Lock()
+
+        fd = os.open(dest_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._preallocate(fd, size)
+            self._save_state(dest_path, size, etag, done)
+
+            def on_bytes(count):
+                with state_lock:
+                    progress['bytes'] += count
+                    current = progress['bytes']
+                if progress_callback:
+                    progress_callback(current, size)
+
+            pending = [i for i in range(num_chunks) if i not in done]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(pending)))) as executor:
+                futures = {
+                    executor.submit(self._fetch_chunk, url, fd, i, size, etag, on_bytes): i
+                    for i in pending
+                }
+                errors = []
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(f"chunk {index}: {e}")
+                        continue
+                    with state_lock:
+                        done.add(index)
+                        self._save_state(dest_path, size, etag, done)
+
+            if errors:
+                raise RangeDownloadError(f"{len(errors)} chunk(s) falharam (retomável): {errors[0]}")
+
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        return resumed_bytes
+
+    def _fetch_chunk(self, url: str, fd: int, index: int, size: int, etag: Optional[str], on_bytes):
+        """Baixa um chunk com retries, retomando a partir do último byte gravado"""
+        start = index * self.chunk_size
+        end = start + self._chunk_length(index, size) - 1
+        offset = start
+        attempt = 0
+
+        while True:
+            headers = {'Range': f"bytes={offset}-{end}"}
+            if etag:
+                # Garante que todos os ranges venham da mesma versão do objeto
+                headers['If-Match'] = f'"{etag}"'
+
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 412:
+                        raise RangeDownloadError("Objeto alterado durante o download (If-Match falhou)")
+                    if response.status_code != 206:
+                        raise requests.HTTPError(f"HTTP {response.status_code} para range {offset}-{end}")
+
+                    for data in response.iter_content(chunk_size=self.READ_SIZE):
+                        if offset + len(data) > end + 1:
+                            raise RangeDownloadError(f"Servidor enviou bytes além do range {offset}-{end}")
+                        written = os.pwrite(fd, data, offset)
+                        offset += written
+                        on_bytes(written)
+
+                if offset != end + 1:
+                    raise requests.ConnectionError(f"Range {start}-{end} incompleto em {offset}")
+                return
+
+            except RangeDownloadError:
+                raise
+            except requests.RequestException as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise RangeDownloadError(f"Range {start}-{end} falhou após {self.max_retries} tentativas: {e}")
+                time.sleep(min(2 ** attempt * 0.25, 5))
+
+    def _download_single(self, url: str, dest_path: str, size: int, progress_callback):
+        """Fallback para servidores sem suporte a Range"""
+        done = 0
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(dest_path, 'wb') as f:
+                for data in response.iter_content(chunk_size=self.READ_SIZE):
+                    f.write(data)
+                    done += len(data)
+                    if progress_callback:
+                        progress_callback(done, size)
+
+    def _chunk_length(self, index: int, size: int) -> int:
+        """Tamanho do chunk index (o último pode ser menor)"""
+        start = index * self.chunk_size
+        return min(self.chunk_size, size - start)
+
+    @staticmethod
+    def _preallocate(fd: int, size: int):
+        """Reserva o espaço do arquivo de destino"""
+        if size == 0:
+            return
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                pass
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+
+    @staticmethod
+    def _get_state_path(dest_path: str) -> str:
+        """Caminho do arquivo de estado do download"""
+        return f"{dest_path}.state.json"
+
+    def _load_state(self, dest_path: str) -> Optional[Dict]:
+        """Carrega o estado de uma execução anterior"""
+        state_path = self._get_state_path(dest_path)
+        if not os.path.exists(state_path):
+            return None
+        try:
+            with open(state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, dest_path: str, size: int, etag: Optional[str], done: set):
+        """Persiste os chunks concluídos"""
+        state_path = self._get_state_path(dest_path)
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'size': size,
+                'etag': etag,
+                'chunk_size': self.chunk_size,
+                'done': sorted(done)
+            }, f)
+        os.replace(tmp_path, state_path)
+
+    def _clear_state(self, dest_path: str):
+        """Remove o arquivo de estado"""
+        state_path = self._get_state_path(dest_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    @staticmethod
+    def _clean_etag(etag: Optional[str]) -> Optional[str]:
+        """Remove aspas e prefixo de ETag fraco"""
+        if not etag:
+            return None
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        return etag.strip('"')
+
+    @staticmethod
+    def _is_plain_md5(etag: str) -> bool:
+        """ETags de upload simples no S3/R2 são o MD5 do conteúdo (multipart contém '-')"""
+        return len(etag) == 32 and all(c in '0123456789abcdef' for c in etag.lower())
+
+    @staticmethod
+    def _md5_file(path: str) -> str:
+        """MD5 do arquivo em blocos"""
+        digest = hashlib.md5()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
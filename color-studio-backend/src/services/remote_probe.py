@@ -0,0 +1,232 @@
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RangeBlockCache:
+    """
+    Cache em memória de blocos de objetos remotos (LRU com orçamento de bytes).
+
+    Probes repetidos do mesmo objeto (mesma key + ETag) leem cabeçalhos e
+    índices do cache em vez de refazer requisições ao R2. Blocos ausentes e
+    contíguos são buscados com uma única requisição Range.
+    """
+
+    DEFAULT_BLOCK_SIZE = 256 * 1024  # 256KB
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
+    def __init__(self, block_size: int = None, max_bytes: int = None, timeout: int = 30):
+        self.block_size = block_size or int(os.getenv('PROBE_BLOCK_SIZE', self.DEFAULT_BLOCK_SIZE))
+        self.max_bytes = max_bytes or int(os.getenv('PROBE_BLOCK_CACHE_MAX_BYTES', self.DEFAULT_MAX_BYTES))
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._blocks: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._total_bytes = 0
+        self.stats = {'block_hits': 0, 'block_misses': 0, 'requests': 0, 'bytes_fetched': 0, 'bytes_served': 0}
+
+    def read(self, identity: str, url: str, size: int, start: int, end: int) -> bytes:
+        """Bytes [start, end] (inclusivo) do objeto, buscando só os blocos ausentes"""
+        end = min(end, size - 1)
+        first_block, last_block = start // self.block_size, end // self.block_size
+
+        blocks = {}
+        missing = []
+        with self._lock:
+            for block in range(first_block, last_block + 1):
+                data = self._blocks.get((identity, block))
+                if data is None:
+                    missing.append(block)
+                    self.stats['block_misses'] += 1
+                else:
+                    self._blocks.move_to_end((identity, block))
+                    blocks[block] = data
+                    self.stats['block_hits'] += 1
+
+        # Uma requisição por sequência contígua de blocos ausentes
+        for run_start, run_end in self._contiguous_runs(missing):
+            blocks.update(self._fetch(identity, url, size, run_start, run_end))
+
+        data = b''.join(blocks[block] for block in range(first_block, last_block + 1))
+        offset = start - first_block * self.block_size
+        chunk = data[offset:offset + (end - start + 1)]
+
+        with self._lock:
+            self.stats['bytes_served'] += len(chunk)
+        return chunk
+
+    def get_stats(self) -> Dict:
+        """Métricas do cache de blocos"""
+        with self._lock:
+            lookups = self.stats['block_hits'] + self.stats['block_misses']
+            return {
+                **self.stats,
+                'blocks': len(self._blocks),
+                'total_bytes': self._total_bytes,
+                'hit_rate': round(self.stats['block_hits'] / lookups, 3) if lookups else 0.0,
+            }
+
+    def _fetch(self, identity: str, url: str, size: int, first_block: int, last_block: int) -> Dict[int, bytes]:
+        """Busca uma sequência de blocos com uma requisição Range e armazena cada um"""
+        start = first_block * self.block_size
+        end = min((last_block + 1) * self.block_size, size) - 1
+
+        response = self.session.get(url, headers={'Range': f"bytes={start}-{end}"}, timeout=self.timeout)
+        if response.status_code not in (200, 206):
+            raise IOError(f"Leitura remota falhou: HTTP {response.status_code}")
+        payload = response.content
+        if response.status_code == 200:
+            payload = payload[start:end + 1]
+
+        fetched = {}
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_fetched'] += len(payload)
+            for block in range(first_block, last_block + 1):
+                offset = (block - first_block) * self.block_size
+                data = payload[offset:offset + self.block_size]
+                fetched[block] = data
+                if (identity, block) not in self._blocks:
+                    self._blocks[(identity, block)] = data
+                    self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and self._blocks:
+                _, evicted = self._blocks.popitem(last=False)
+                self._total_bytes -= len(evicted)
+        return fetched
+
+    @staticmethod
+    def _contiguous_runs(blocks):
+        """[1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]"""
+        runs = []
+        for block in blocks:
+            if runs and runs[-1][1] == block - 1:
+                runs[-1] = (runs[-1][0], block)
+            else:
+                runs.append((block, block))
+        return runs
+
+
+class RemoteProbeProxy:
+    """
+    Servidor HTTP local que expõe objetos remotos para o ffprobe.
+
+    O ffprobe lê a URL local com requisições Range (cabeçalhos, átomos de
+    índice) e o proxy atende a partir do RangeBlockCache, buscando no R2 só
+    os blocos que faltam. Nada é baixado por inteiro.
+    """
+
+    READAHEAD_BLOCKS = 4  # blocos buscados por vez em leituras sequenciais
+
+    def __init__(self, block_cache: RangeBlockCache = None):
+        self.block_cache = block_cache or RangeBlockCache()
+        self._lock = threading.Lock()
+        self._objects: Dict[str, Dict] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def register(self, identity: str, url: str, size: int) -> str:
+        """Registra um objeto remoto e retorna a URL local para o ffprobe"""
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._objects[token] = {'identity': identity, 'url': url, 'size': size}
+            port = self._ensure_server()
+        return f"http://127.0.0.1:{port}/{token}"
+
+    def unregister(self, local_url: str):
+        """Remove o objeto (a URL assinada não fica acessível depois do probe)"""
+        with self._lock:
+            self._objects.pop(local_url.rsplit('/', 1)[-1], None)
+
+    def get_object(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            return self._objects.get(token)
+
+    def _ensure_server(self) -> int:
+        """Sobe o servidor na primeira utilização (porta efêmera em loopback)"""
+        if self._server is None:
+            self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def _make_handler(self):
+        proxy = self
+
+        class ProbeHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(send_body=False)
+
+            def do_GET(self):
+                self._serve(send_body=True)
+
+            def _serve(self, send_body: bool):
+                obj = proxy.get_object(self.path.lstrip('/'))
+                if obj is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                size = obj['size']
+                start, end = 0, size - 1
+                match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f"bytes */{size}")
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+
+                self.send_response(206 if match else 200)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.send_header('Accept-Ranges', 'bytes')
+                if match:
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if not send_body:
+                    return
+
+                # Entrega sob demanda: se o ffprobe fechar a conexão, nada mais é buscado
+                step = proxy.block_cache.block_size * proxy.READAHEAD_BLOCKS
+                offset = start
+                try:
+                    while offset <= end:
+                        chunk_end = min(offset - offset % proxy.block_cache.block_size + step - 1, end)
+                        self.wfile.write(proxy.block_cache.read(obj['identity'], obj['url'], size, offset, chunk_end))
+                        offset = chunk_end + 1
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        return ProbeHandler
+
+
+_remote_probe_proxy = None
+_remote_probe_proxy_lock = threading.Lock()
+
+
+def get_remote_probe_proxy() -> RemoteProbeProxy:
+    """Retorna a instância compartilhada do proxy (uma por processo)"""
+    global _remote_probe_proxy
+    with _remote_probe_proxy_lock:
+        if _remote_probe_proxy is None:
+            _remote_probe_proxy = RemoteProbeProxy()
+        return _remote_probe_proxy
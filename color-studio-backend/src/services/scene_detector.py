@@ -0,0 +1,118 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.frame_reader import FrameReader
+
+
+class SceneDetector:
+    """
+    Detecção de cortes de cena sobre frames reduzidos.
+
+    Cada frame recebe uma pontuação que combina a diferença média absoluta de
+    pixels e a distância entre histogramas RGB em relação ao frame anterior,
+    calculadas de forma vetorizada sobre lotes. Um corte é marcado quando a
+    pontuação passa do limiar e a cena atual já tem a duração mínima.
+    """
+
+    HISTOGRAM_BINS = 16  # por canal
+
+    def __init__(self, threshold: float = 0.15, min_scene_seconds: float = 0.5,
+                 analysis_width: int = 160, batch_size: int = 64):
+        self.threshold = threshold
+        self.min_scene_seconds = min_scene_seconds
+        self.analysis_width = analysis_width
+        self.batch_size = batch_size
+
+    def detect(self, source_path: str) -> Dict:
+        """Lista de cenas (início, fim, duração) do arquivo inteiro"""
+        reader = FrameReader(source_path, width=self.analysis_width, pix_fmt='rgb24', batch_size=self.batch_size)
+        frame_interval = reader.frame_interval
+        min_scene_frames = max(1, round(self.min_scene_seconds / frame_interval))
+
+        cut_frames = [0]
+        previous = None
+        total_frames = 0
+
+        for _, frames in reader.iter_batches(normalize=False):
+            scores = self.score_batch(frames, previous)
+            for offset in np.flatnonzero(scores >= self.threshold):
+                frame_number = total_frames + int(offset)
+                if frame_number - cut_frames[-1] >= min_scene_frames:
+                    cut_frames.append(frame_number)
+            previous = frames[-1].copy()
+            total_frames += len(frames)
+
+        duration = total_frames * frame_interval
+        return {
+            'frames': total_frames,
+            'fps': round(1.0 / frame_interval, 3),
+            'scenes': self.build_scenes(cut_frames, total_frames, frame_interval),
+            'duration': round(duration, 3),
+        }
+
+    def score_batch(self, frames: np.ndarray, previous: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Pontuação de mudança [0, 1] de cada frame do lote (n, h, w, 3) uint8
+        em relação ao frame anterior (o último do lote anterior, se houver)
+        """
+        current = frames.astype(np.int16)
+        if previous is not None:
+            before = np.concatenate([previous[None].astype(np.int16), current[:-1]])
+        else:
+            before = np.concatenate([current[:1], current[:-1]])
+
+        pixel_diff = np.abs(current - before).mean(axis=(1, 2, 3)) / 255.0
+
+        histograms = self._rgb_histograms(current)
+        if previous is not None:
+            previous_histogram = self._rgb_histograms(previous[None].astype(np.int16))
+        else:
+            previous_histogram = histograms[:1]
+        histograms_before = np.concatenate([previous_histogram, histograms[:-1]])
+        pixels = frames.shape[1] * frames.shape[2]
+        histogram_distance = 0.5 * np.abs(histograms - histograms_before).sum(axis=2).mean(axis=1) / pixels
+
+        return 0.5 * pixel_diff + 0.5 * histogram_distance
+
+    @staticmethod
+    def build_scenes(cut_frames: List[int], total_frames: int, frame_interval: float) -> List[Dict]:
+        """Converte os frames de corte em cenas com tempos em segundos"""
+        boundaries = cut_frames + [total_frames]
+        scenes = []
+        for index in range(len(cut_frames)):
+            start, end = boundaries[index], boundaries[index + 1]
+            if end <= start:
+                continue
+            scenes.append({
+                'index': len(scenes),
+                'start_frame': start,
+                'end_frame': end - 1,
+                'start': round(start * frame_interval, 3),
+                'end': round(end * frame_interval, 3),
+                'duration': round((end - start) * frame_interval, 3),
+            })
+        return scenes
+
+    @staticmethod
+    def cut_times(metadata: Optional[Dict]) -> Tuple[float, ...]:
+        """Instantes dos cortes (início de cada cena após a primeira) gravados em file_metadata["scenes"]"""
+        scenes = (metadata or {}).get('scenes') or []
+        return tuple(sorted(float(scene['start']) for scene in scenes if scene['start'] > 0))
+
+    @staticmethod
+    def cuts_digest(cuts: Tuple[float, ...]) -> Optional[str]:
+        """Identidade curta de um conjunto de cortes (para chaves de cache); None sem cortes"""
+        if not cuts:
+            return None
+        return hashlib.sha256(','.join(f"{cut:.3f}" for cut in cuts).encode()).hexdigest()[:12]
+
+    def _rgb_histograms(self, frames: np.ndarray) -> np.ndarray:
+        """Histogramas por canal (n, 3, bins) de um lote inteiro com um único bincount"""
+        n = frames.shape[0]
+        bins = self.HISTOGRAM_BINS
+        quantized = (frames >> 4).reshape(n, -1, 3).astype(np.int32)  # 256 -> 16 níveis
+        offsets = (np.arange(n)[:, None] * 3 + np.arange(3)[None, :]) * bins
+        indices = quantized + offsets[:, None, :]
+        return np.bincount(indices.ravel(), minlength=n * 3 * bins).reshape(n, 3, bins)
@@ -0,0 +1,168 @@
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.services.frame_reader import FrameReader
+from src.services.lut_engine import LUTEngine
+
+
+class ScopeEngine:
+    """
+    Scopes de cor: waveform de luma, parade RGB e vectorscope.
+
+    Cada scope é um histograma 2D calculado com um único bincount sobre o
+    frame inteiro e renderizado como imagem de densidade (escala log) em PNG.
+    Frames decodificados e scopes renderizados ficam em caches LRU em memória,
+    chaveados por (mídia, instante, LUT), para scrubbing interativo.
+    """
+
+    SCOPES = ('waveform', 'parade', 'vectorscope')
+    LEVELS = 256  # resolução vertical do waveform
+    ANALYSIS_WIDTH = 640  # frames reduzidos: scopes não precisam da resolução total
+
+    LUMA_709 = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+    # Cb/Cr BT.709 a partir de R'G'B' (cada um em [-0.5, 0.5])
+    CHROMA_709 = np.array([
+        [-0.1146, -0.3854, 0.5],
+        [0.5, -0.4542, -0.0458],
+    ], dtype=np.float32)
+
+    PARADE_COLORS = np.array([[255, 64, 64], [64, 255, 64], [80, 128, 255]], dtype=np.float32)
+
+    MAX_FRAMES = 32
+    MAX_RENDERS = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._renders: "OrderedDict[Tuple, object]" = OrderedDict()
+        self.stats = {'render_hits': 0, 'frame_hits': 0, 'misses': 0}
+
+    def render(self, source_path: str, source_id: str, timestamp: float, scope: str, size: int = 256,
+               lut: Optional[Dict] = None, output: str = 'png'):
+        """
+        Scope do frame em timestamp. lut é a LUT materializada ({hash, path}).
+        output='png' retorna bytes PNG; output='array' retorna a matriz de densidade
+        """
+        if scope not in self.SCOPES:
+            raise ValueError(f"Scope desconhecido: {scope}")
+
+        cached = self.get_cached(source_id, timestamp, scope, size, lut, output)
+        if cached is not None:
+            return cached
+
+        timestamp = round(timestamp, 3)
+        render_key = (source_id, timestamp, lut['hash'] if lut else None, scope, size, output)
+        frame = self._get_frame(source_path, source_id, timestamp, lut)
+        density = self.compute(frame, scope, size)
+        result = self.encode_png(self.to_image(density, scope)) if output == 'png' else density.tolist()
+
+        with self._lock:
+            self._renders[render_key] = result
+            while len(self._renders) > self.MAX_RENDERS:
+                self._renders.popitem(last=False)
+        return result
+
+    def get_cached(self, source_id: str, timestamp: float, scope: str, size: int = 256,
+                   lut: Optional[Dict] = None, output: str = 'png'):
+        """Scope já renderizado (ou None), sem precisar da fonte em disco"""
+        render_key = (source_id, round(timestamp, 3), lut['hash'] if lut else None, scope, size, output)
+        with self._lock:
+            cached = self._renders.get(render_key)
+            if cached is not None:
+                self._renders.move_to_end(render_key)
+                self.stats['render_hits'] += 1
+            return cached
+
+    def compute(self, frame: np.ndarray, scope: str, size: int = 256) -> np.ndarray:
+        """Densidade do scope para um frame (h, w, 3) R'G'B' em [0, 1]"""
+        if scope == 'waveform':
+            return self.waveform(frame @ self.LUMA_709, size)
+        if scope == 'parade':
+            return np.stack([self.waveform(frame[:, :, c], size) for c in range(3)])
+        return self.vectorscope(frame, size)
+
+    def waveform(self, channel: np.ndarray, columns: int) -> np.ndarray:
+        """
+        Waveform (LEVELS, columns): para cada faixa de colunas da imagem, a
+        distribuição dos níveis. Linha 0 = nível máximo (topo do scope)
+        """
+        height, width = channel.shape
+        column_index = (np.arange(width) * columns // width).astype(np.int64)
+        level = np.clip((channel * (self.LEVELS - 1)).round().astype(np.int64), 0, self.LEVELS - 1)
+        flat = (self.LEVELS - 1 - level) * columns + column_index[None, :]
+        return np.bincount(flat.ravel(), minlength=self.LEVELS * columns).reshape(self.LEVELS, columns)
+
+    def vectorscope(self, frame: np.ndarray, size: int) -> np.ndarray:
+        """Densidade (size, size) de Cb (x) e Cr (y, para cima)"""
+        chroma = frame.reshape(-1, 3) @ self.CHROMA_709.T
+        x = np.clip(((chroma[:, 0] + 0.5) * (size - 1)).round().astype(np.int64), 0, size - 1)
+        y = np.clip(((0.5 - chroma[:, 1]) * (size - 1)).round().astype(np.int64), 0, size - 1)
+        return np.bincount(y * size + x, minlength=size * size).reshape(size, size)
+
+    def to_image(self, density: np.ndarray, scope: str) -> np.ndarray:
+        """Densidade -> imagem uint8 (escala log, para detalhes em áreas esparsas)"""
+        def normalize(counts):
+            peak = counts.max()
+            return np.log1p(counts) / np.log1p(peak) if peak else np.zeros(counts.shape, dtype=np.float32)
+
+        if scope == 'parade':
+            # Três waveforms lado a lado, cada um na cor do seu canal
+            panels = [normalize(density[c])[..., None] * self.PARADE_COLORS[c] for c in range(3)]
+            return np.concatenate(panels, axis=1).astype(np.uint8)
+        return (normalize(density) * 255).astype(np.uint8)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'frames': len(self._frames), 'renders': len(self._renders)}
+
+    @staticmethod
+    def encode_png(image: np.ndarray) -> bytes:
+        """PNG sem perdas (cinza ou RGB de 8 bits) com zlib, sem dependências de imagem"""
+        height, width = image.shape[:2]
+        color_type = 2 if image.ndim == 3 else 0
+        rows = np.ascontiguousarray(image).reshape(height, -1)
+        raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()  # filtro 0 por linha
+
+        def chunk(tag: bytes, data: bytes) -> bytes:
+            return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+        header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+        return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b'')
+
+    def _get_frame(self, source_path: str, source_id: str, timestamp: float, lut: Optional[Dict]) -> np.ndarray:
+        """Frame decodificado (com a LUT aplicada pelo FFmpeg), reaproveitado entre scopes"""
+        frame_key = (source_id, timestamp, lut['hash'] if lut else None)
+        with self._lock:
+            frame = self._frames.get(frame_key)
+            if frame is not None:
+                self._frames.move_to_end(frame_key)
+                self.stats['frame_hits'] += 1
+                return frame
+            self.stats['misses'] += 1
+
+        video_filter = LUTEngine.ffmpeg_filter(lut['path']) if lut else None
+        frame = FrameReader.read_frame(source_path, timestamp, width=self.ANALYSIS_WIDTH, video_filter=video_filter)
+
+        with self._lock:
+            self._frames[frame_key] = frame
+            while len(self._frames) > self.MAX_FRAMES:
+                self._frames.popitem(last=False)
+        return frame
+
+
+_scope_engine = None
+_scope_engine_lock = threading.Lock()
+
+
+def get_scope_engine() -> ScopeEngine:
+    """Retorna a instância compartilhada do engine de scopes (uma por processo)"""
+    global _scope_engine
+    with _scope_engine_lock:
+        if _scope_engine is None:
+            _scope_engine = ScopeEngine()
+        return _scope_engine
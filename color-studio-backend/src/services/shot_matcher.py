@@ -0,0 +1,198 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.services.color_science import ColorScience
+from src.services.frame_reader import FrameReader
+from src.services.lut_engine import LUT3D
+
+
+class ShotMatcher:
+    """
+    Casamento automático de cor entre clips por estatísticas compactas.
+
+    Cada clip é resumido uma única vez (frames amostrados em baixa resolução,
+    processados em lotes vetorizados) por média, covariância e histograma de
+    L no espaço perceptual Oklab. O resumo tem poucas centenas de números e
+    fica em file_metadata; casar um clip com a referência usa só os resumos:
+    curva de L por casamento de histogramas + matriz 2x2 de croma (transporte
+    ótimo entre gaussianas), assadas em uma LUT 3D.
+
+    O sinal é interpretado como Rec.709/BT.1886; a correção é aplicada no
+    próprio sinal da fonte, antes da LUT do projeto.
+    """
+
+    STATS_VERSION = 1
+    HISTOGRAM_BINS = 64
+    SAMPLE_FPS = 0.5
+    ANALYSIS_WIDTH = 320
+    BATCH_SIZE = 16
+    MAX_CHROMA_GAIN = 3.0  # limita a matriz de croma (clips quase monocromáticos)
+    COVARIANCE_EPSILON = 1e-6
+
+    # Oklab (Björn Ottosson): RGB linear (primárias sRGB/Rec.709) -> LMS -> Lab
+    OKLAB_M1 = np.array([
+        [0.4122214708, 0.5363325363, 0.0514459929],
+        [0.2119034982, 0.6806995451, 0.1073969566],
+        [0.0883024619, 0.2817188376, 0.6299787005],
+    ], dtype=np.float32)
+    OKLAB_M2 = np.array([
+        [0.2104542553, 0.7936177850, -0.0040720468],
+        [1.9779984951, -2.4285922050, 0.4505937099],
+        [0.0259040371, 0.7827717662, -0.8086757660],
+    ], dtype=np.float32)
+    OKLAB_M1_INV = np.linalg.inv(OKLAB_M1.astype(np.float64)).astype(np.float32)
+    OKLAB_M2_INV = np.linalg.inv(OKLAB_M2.astype(np.float64)).astype(np.float32)
+
+    def __init__(self, sample_fps: float = None, analysis_width: int = None):
+        self.sample_fps = sample_fps or self.SAMPLE_FPS
+        self.analysis_width = analysis_width or self.ANALYSIS_WIDTH
+
+    # ==========================================
+    # ESTATÍSTICAS
+    # ==========================================
+
+    def measure(self, source_path: str) -> Dict:
+        """Resumo de cor do clip (serializável em JSON), acumulado lote a lote"""
+        reader = FrameReader(source_path, width=self.analysis_width, sample_fps=self.sample_fps,
+                             batch_size=self.BATCH_SIZE)
+        totals = None
+        for _, frames in reader.iter_batches():
+            batch = self.batch_statistics(frames)
+            totals = batch if totals is None else {key: totals[key] + batch[key] for key in totals}
+        if totals is None:
+            raise RuntimeError("Nenhum frame amostrado")
+        return self.finalize(totals)
+
+    @classmethod
+    def batch_statistics(cls, frames: np.ndarray) -> Dict:
+        """Somas suficientes de um lote (n, h, w, 3): contagens, soma, produtos cruzados e histograma de L"""
+        lab = cls.to_oklab(frames).reshape(-1, 3).astype(np.float64)
+        bins = np.clip((lab[:, 0] * cls.HISTOGRAM_BINS).astype(np.int64), 0, cls.HISTOGRAM_BINS - 1)
+        return {
+            'frames': len(frames),
+            'pixels': len(lab),
+            'sum': lab.sum(axis=0),
+            'outer': lab.T @ lab,
+            'histogram': np.bincount(bins, minlength=cls.HISTOGRAM_BINS),
+        }
+
+    @classmethod
+    def finalize(cls, totals: Dict) -> Dict:
+        mean = totals['sum'] / totals['pixels']
+        covariance = totals['outer'] / totals['pixels'] - np.outer(mean, mean)
+        return {
+            'version': cls.STATS_VERSION,
+            'frames': int(totals['frames']),
+            'mean': np.round(mean, 6).tolist(),
+            'covariance': np.round(covariance, 8).tolist(),
+            'l_histogram': (totals['histogram'] / totals['pixels']).round(6).tolist(),
+        }
+
+    @classmethod
+    def is_current(cls, stats: Optional[Dict]) -> bool:
+        return bool(stats) and stats.get('version') == cls.STATS_VERSION
+
+    # ==========================================
+    # CORREÇÃO
+    # ==========================================
+
+    @classmethod
+    def solve(cls, source: Dict, target: Dict, strength: float = 1.0) -> Dict:
+        """
+        Correção source -> target: curva de L (CDFs dos histogramas) e, nos
+        eixos a/b, y = mean_t + A (x - mean_s) com A simétrica. strength
+        interpola entre identidade (0) e o casamento completo (1)
+        """
+        edges = np.linspace(0.0, 1.0, cls.HISTOGRAM_BINS + 1)
+        source_cdf = np.concatenate([[0.0], np.cumsum(source['l_histogram'])])
+        target_cdf = np.concatenate([[0.0], np.cumsum(target['l_histogram'])])
+        source_cdf /= max(source_cdf[-1], 1e-12)
+        target_cdf /= max(target_cdf[-1], 1e-12)
+
+        # L onde a CDF do alvo atinge a CDF da fonte; platôs (bins vazios) são saltados.
+        # Fora da faixa ocupada pela fonte a curva só interpola até preto e branco fixos
+        keep = np.concatenate([[True], np.diff(target_cdf) > 1e-9])
+        matched = np.interp(source_cdf, target_cdf[keep], edges[keep])
+        inside = (source_cdf > 1e-9) & (source_cdf < 1.0 - 1e-9)
+        matched = np.interp(edges, np.concatenate([[0.0], edges[inside], [1.0]]),
+                            np.concatenate([[0.0], matched[inside], [1.0]]))
+        curve_y = np.maximum.accumulate(edges + strength * (matched - edges))
+
+        source_ab = np.asarray(source['covariance'])[1:, 1:]
+        target_ab = np.asarray(target['covariance'])[1:, 1:]
+        matrix = cls._transport_matrix(source_ab, target_ab)
+        matrix = np.eye(2) + strength * (matrix - np.eye(2))
+
+        source_mean = np.asarray(source['mean'])[1:]
+        target_mean = np.asarray(target['mean'])[1:]
+        return {
+            'curve': np.round(np.stack([edges, curve_y], axis=1), 6).tolist(),
+            'matrix': np.round(matrix, 6).tolist(),
+            'source_mean': np.round(source_mean, 6).tolist(),
+            'target_mean': np.round(source_mean + strength * (target_mean - source_mean), 6).tolist(),
+        }
+
+    @classmethod
+    def apply(cls, rgb: np.ndarray, correction: Dict) -> np.ndarray:
+        """Aplica a correção exata a RGB (..., 3) no sinal da fonte"""
+        curve = np.asarray(correction['curve'], dtype=np.float32)
+        matrix = np.asarray(correction['matrix'], dtype=np.float32)
+        source_mean = np.asarray(correction['source_mean'], dtype=np.float32)
+        target_mean = np.asarray(correction['target_mean'], dtype=np.float32)
+
+        lab = cls.to_oklab(rgb)
+        lab[..., 0] = np.interp(lab[..., 0], curve[:, 0], curve[:, 1])
+        lab[..., 1:] = (lab[..., 1:] - source_mean) @ matrix.T + target_mean
+        return np.clip(cls.from_oklab(lab), 0.0, 1.0)
+
+    @classmethod
+    def bake(cls, correction: Dict, size: int = 33) -> LUT3D:
+        table = cls.apply(LUT3D.identity(size).table, correction)
+        return LUT3D(table, title="Shot match")
+
+    @staticmethod
+    def correction_hash(correction: Dict, size: int) -> str:
+        payload = json.dumps({'shot_match': correction, 'size': size}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()[:40]
+
+    # ==========================================
+    # OKLAB
+    # ==========================================
+
+    @classmethod
+    def to_oklab(cls, rgb: np.ndarray) -> np.ndarray:
+        """Sinal Rec.709 (BT.1886) (..., 3) -> Oklab (L em [0, 1] para o branco)"""
+        linear = ColorScience.bt1886_decode(np.clip(np.asarray(rgb, dtype=np.float32), 0.0, 1.0))
+        lms = np.cbrt(linear @ cls.OKLAB_M1.T)
+        return lms @ cls.OKLAB_M2.T
+
+    @classmethod
+    def from_oklab(cls, lab: np.ndarray) -> np.ndarray:
+        lms = lab @ cls.OKLAB_M2_INV.T
+        linear = (lms * lms * lms) @ cls.OKLAB_M1_INV.T
+        return ColorScience.bt1886_encode(np.clip(linear, 0.0, 1.0))
+
+    @classmethod
+    def _transport_matrix(cls, source_cov: np.ndarray, target_cov: np.ndarray) -> np.ndarray:
+        """
+        Transporte ótimo (Monge-Kantorovich) entre gaussianas:
+        A = S^-1/2 (S^1/2 T S^1/2)^1/2 S^-1/2, com autovalores limitados
+        """
+        epsilon = np.eye(len(source_cov)) * cls.COVARIANCE_EPSILON
+        source_sqrt = cls._sqrtm(source_cov + epsilon)
+        source_inv_sqrt = np.linalg.inv(source_sqrt)
+        middle = cls._sqrtm(source_sqrt @ (target_cov + epsilon) @ source_sqrt)
+        matrix = source_inv_sqrt @ middle @ source_inv_sqrt
+
+        values, vectors = np.linalg.eigh((matrix + matrix.T) / 2)
+        values = np.clip(values, 1.0 / cls.MAX_CHROMA_GAIN, cls.MAX_CHROMA_GAIN)
+        return vectors @ np.diag(values) @ vectors.T
+
+    @staticmethod
+    def _sqrtm(matrix: np.ndarray) -> np.ndarray:
+        """Raiz quadrada de uma matriz simétrica semidefinida positiva"""
+        values, vectors = np.linalg.eigh((matrix + matrix.T) / 2)
+        return vectors @ np.diag(np.sqrt(np.maximum(values, 0.0))) @ vectors.T
@@ -0,0 +1,90 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from src.services.disk_cache import DiskLRUCache
+from src.services.r2_upload_service import R2UploadService
+from src.services.range_downloader import RangeDownloader
+
+
+class SourceMediaCache:
+    """
+    Cache local compartilhado das mídias de origem baixadas do R2.
+
+    A chave é key + ETag do objeto, então proxy, master H.265 e análises do
+    mesmo clip reutilizam um único download. Arquivos em uso não são removidos.
+    """
+
+    DEFAULT_MAX_BYTES = 50 * 1024 * 1024 * 1024  # 50GB
+
+    def __init__(self, r2_service: R2UploadService = None, cache_dir: str = None, max_bytes: int = None):
+        self.r2_service = r2_service or R2UploadService()
+        self.downloader = RangeDownloader()
+        self.cache = DiskLRUCache(
+            cache_dir=cache_dir or os.getenv('SOURCE_CACHE_DIR', 'uploads/cache/sources'),
+            max_bytes=max_bytes or int(os.getenv('SOURCE_CACHE_MAX_BYTES', self.DEFAULT_MAX_BYTES)),
+            name='sources'
+        )
+
+        # Downloads parciais ficam fora das entradas do cache para poderem ser retomados
+        self.partial_dir = os.path.join(self.cache.cache_dir, 'partial')
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    @contextmanager
+    def checkout(self, r2_key: str, etag: Optional[str] = None):
+        """
+        Disponibiliza a mídia localmente enquanto o bloco estiver ativo
+
+        Uso:
+            with source_cache.checkout(key, etag) as path:
+                subprocess.run(["ffmpeg", "-i", path, ...])
+        """
+        if etag is None:
+            info = self.r2_service.get_object_info(r2_key)
+            if not info['success']:
+                raise RuntimeError(f"Falha ao obter metadados de {r2_key}: {info['error']}")
+            etag = info['etag']
+        etag = etag.strip('"')
+
+        cache_key = f"{r2_key}@{etag}"
+        suffix = f".{R2UploadService.get_file_extension(r2_key)}"
+
+        with self.cache.checkout(cache_key, lambda tmp_path: self._download(r2_key, etag, tmp_path), suffix) as path:
+            yield path
+
+    def get_stats(self) -> Dict:
+        """Métricas de hit/miss e bytes economizados"""
+        return self.cache.get_stats()
+
+    def _download(self, r2_key: str, etag: str, dest_path: str):
+        """Baixa o objeto do R2 para dest_path (download paralelo por ranges, retomável)"""
+        download_url_response = self.r2_service.generate_presigned_url(r2_key)
+        if not download_url_response["success"]:
+            raise RuntimeError(f"Failed to get presigned URL: {download_url_response['error']}")
+        download_url = download_url_response["url"]
+
+        if self.r2_service.is_test_mode():
+            print(f"🧪 [TEST MODE] Simulando download de {download_url} para {dest_path}")
+            with open(dest_path, "w") as f:
+                f.write("dummy video content") # Criar um arquivo dummy
+            return
+
+        partial_path = os.path.join(self.partial_dir, f"{os.path.basename(dest_path)}.{etag}")
+        print(f"⬇️ Baixando fonte {r2_key} para o cache local")
+        result = self.downloader.download(download_url, partial_path, expected_etag=etag)
+        os.replace(partial_path, dest_path)
+        print(f"✅ Download concluído: {result['size']} bytes em {result['elapsed']}s ({result['throughput_mbps']} MB/s)")
+
+
+_source_cache = None
+_source_cache_lock = threading.Lock()
+
+
+def get_source_cache() -> SourceMediaCache:
+    """Retorna a instância compartilhada do cache de fontes (uma por processo)"""
+    global _source_cache
+    with _source_cache_lock:
+        if _source_cache is None:
+            _source_cache = SourceMediaCache()
+        return _source_cache
@@ -0,0 +1,193 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+
+from src.models.media_file import MediaFile
+from src.models.project import db
+from src.services.frame_reader import FrameReader
+from src.services.hls_packager import HLSPackager
+from src.services.keyframe_index import get_keyframe_indexer
+from src.services.r2_upload_service import R2UploadService
+from src.services.scene_detector import SceneDetector
+from src.services.source_cache import get_source_cache
+from src.services.transcode_cache import TranscodeResultCache, get_transcode_cache
+from src.services.video_analyzer import VideoAnalyzer
+
+
+class ThumbnailService:
+    """
+    Thumbnails, sprite sheet (filmstrip) e trilha WebVTT de thumbnails.
+
+    Os frames são extraídos em paralelo, cada um por um processo FFmpeg com
+    seek rápido até o keyframe mais próximo (só keyframes são decodificados).
+    O resultado é cacheado pela identidade da fonte, então regerar é grátis.
+    Com cenas detectadas, cada thumbnail vem do maior trecho sem corte dentro
+    do seu intervalo, evitando frames de transição.
+    """
+
+    DEFAULT_COUNT = 60
+    DEFAULT_WIDTH = 160
+    DEFAULT_COLUMNS = 10
+    MAX_COUNT = 400
+
+    def __init__(self, r2_service: R2UploadService = None):
+        self.r2_service = r2_service or R2UploadService()
+        self.packager = HLSPackager(self.r2_service)
+        self.result_cache = get_transcode_cache()
+        self.source_cache = get_source_cache()
+        self.keyframe_indexer = get_keyframe_indexer()
+        self.max_workers = int(os.getenv('THUMBNAIL_WORKERS', os.cpu_count() or 4))
+
+    def generate(self, media_file_id: int, count: int = None, width: int = None, columns: int = None):
+        """Gera (ou reaproveita) sprite + WebVTT do MediaFile e registra em file_metadata"""
+        count = min(count or self.DEFAULT_COUNT, self.MAX_COUNT)
+        width = width or self.DEFAULT_WIDTH
+        columns = min(columns or self.DEFAULT_COLUMNS, count)
+
+        media_file = MediaFile.query.get(media_file_id)
+        if not media_file:
+            return {"success": False, "error": "MediaFile not found", "status": 404}
+
+        source_info = self.r2_service.get_object_info(media_file.storage_key)
+        if not source_info["success"]:
+            return {"success": False, "error": f"Failed to read source object: {source_info['error']}"}
+
+        # Cortes de cena entram na chave só quando existem (sem cenas, a chave não muda)
+        cuts = SceneDetector.cut_times(media_file.file_metadata)
+        scenes = {"scenes": SceneDetector.cuts_digest(cuts)} if cuts else {}
+        params = TranscodeResultCache.normalize_params(
+            codec="mjpeg", scale=f"{width}:-2", package="thumbnails", count=count, columns=columns, **scenes
+        )
+        cache_key = TranscodeResultCache.make_key(media_file.storage_key, source_info["etag"], params)
+
+        result, cache_status = self.result_cache.get_or_run(
+            cache_key,
+            lambda: self._render(media_file.storage_key, source_info["etag"], cache_key[:32], count, width, columns,
+                                 cuts)
+        )
+        if not result["success"]:
+            return result
+
+        thumbnails = {k: v for k, v in result.items() if k != "success"}
+        media_file.file_metadata = {**(media_file.file_metadata or {}), "thumbnails": thumbnails}
+        media_file.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return {**result, "cache": cache_status}
+
+    def _render(self, storage_key: str, etag: str, package_id: str, count: int, width: int, columns: int,
+                cuts: Tuple[float, ...] = ()) -> Dict:
+        """Extrai os frames, monta o sprite e a trilha VTT e envia o pacote ao R2"""
+        temp_dir = f"/tmp/thumbnails_{package_id}"
+        frames_dir = os.path.join(temp_dir, "frames")
+        out_dir = os.path.join(temp_dir, "out")
+        os.makedirs(frames_dir, exist_ok=True)
+        os.makedirs(out_dir, exist_ok=True)
+
+        try:
+            with self.source_cache.checkout(storage_key, etag) as source_path:
+                duration = VideoAnalyzer.analyze_video(source_path)["duration"]
+                info = FrameReader.probe_video(source_path)
+                tile_width = width - width % 2
+                tile_height = max(2, round(info["height"] * tile_width / info["width"] / 2) * 2)
+
+                index = self.keyframe_indexer.get_index(storage_key, etag)
+                cue_times = [duration * i / count for i in range(count + 1)]
+                seek_times = [self.seek_time(cue_times[i], cue_times[i + 1], cuts, index) for i in range(count)]
+
+                self._extract_frames(source_path, frames_dir, seek_times, tile_width, tile_height)
+
+            rows = -(-count // columns)
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-framerate", "1", "-i", os.path.join(frames_dir, "thumb_%04d.jpg"),
+                "-vf", f"tile={columns}x{rows}", "-frames:v", "1", "-q:v", "4",
+                os.path.join(out_dir, "sprite.jpg")
+            ], check=True, capture_output=True)
+
+            with open(os.path.join(out_dir, "thumbnails.vtt"), "w") as f:
+                f.write(self.build_vtt(cue_times, tile_width, tile_height, columns, "sprite.jpg"))
+
+            upload_result = self.packager.upload(out_dir, package_id)
+            if not upload_result["success"]:
+                return upload_result
+
+            return {
+                "success": True,
+                "sprite_url": HLSPackager.package_url(package_id, "sprite.jpg"),
+                "vtt_url": HLSPackager.package_url(package_id, "thumbnails.vtt"),
+                "count": count,
+                "columns": columns,
+                "rows": rows,
+                "tile_width": tile_width,
+                "tile_height": tile_height,
+                "interval": round(duration / count, 3) if count else 0,
+            }
+
+        except subprocess.CalledProcessError as e:
+            return {"success": False, "error": f"FFmpeg error: {e.stderr.decode(errors='replace')[-2000:] if e.stderr else e}"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            if os.path.exists(temp_dir):
+                subprocess.run(["rm", "-rf", temp_dir])
+
+    @staticmethod
+    def seek_time(start: float, end: float, cuts: Tuple[float, ...], index) -> float:
+        """
+        Instante do thumbnail do cue [start, end): o keyframe mais próximo do meio do
+        maior trecho sem corte de cena; se esse keyframe cair em outra cena, o próprio meio
+        """
+        bounds = [start] + list(cuts[bisect_right(cuts, start):bisect_left(cuts, end)]) + [end]
+        shot_start, shot_end = max(zip(bounds, bounds[1:]), key=lambda shot: shot[1] - shot[0])
+        middle = (shot_start + shot_end) / 2
+
+        keyframe = index.nearest(middle)
+        if keyframe is None:
+            return start
+        if len(bounds) > 2 and not shot_start <= keyframe["time"] < shot_end:
+            return middle
+        return keyframe["time"]
+
+    def _extract_frames(self, source_path: str, out_dir: str, seek_times: List[float], width: int, height: int):
+        """Um processo FFmpeg por thumbnail, em paralelo"""
+        def extract(index_and_time):
+            index, timestamp = index_and_time
+            output = os.path.join(out_dir, f"thumb_{index + 1:04d}.jpg")
+            command = [
+                "ffmpeg", "-y", "-v", "error",
+                "-skip_frame", "nokey", "-ss", f"{timestamp:.3f}", "-i", source_path,
+                "-frames:v", "1", "-vf", f"scale={width}:{height}", "-q:v", "4", output
+            ]
+            subprocess.run(command, check=True, capture_output=True)
+            if not os.path.exists(output):
+                # Sem keyframe depois do ponto (final do arquivo): decodifica normalmente
+                command.remove("-skip_frame")
+                command.remove("nokey")
+                subprocess.run(command, check=True, capture_output=True)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(seek_times))) as executor:
+            list(executor.map(extract, enumerate(seek_times)))
+
+    @staticmethod
+    def build_vtt(cue_times: List[float], tile_width: int, tile_height: int, columns: int, sprite_name: str) -> str:
+        """Trilha WebVTT com um cue por thumbnail apontando para a região do sprite (#xywh)"""
+        lines = ["WEBVTT", ""]
+        for i in range(len(cue_times) - 1):
+            x, y = (i % columns) * tile_width, (i // columns) * tile_height
+            lines.append(f"{ThumbnailService._vtt_time(cue_times[i])} --> {ThumbnailService._vtt_time(cue_times[i + 1])}")
+            lines.append(f"{sprite_name}#xywh={x},{y},{tile_width},{tile_height}")
+            lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _vtt_time(seconds: float) -> str:
+        """hh:mm:ss.mmm"""
+        milliseconds = int(round(seconds * 1000))
+        hours, milliseconds = divmod(milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        secs, milliseconds = divmod(milliseconds, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
@@ -0,0 +1,158 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.services.color_science import ColorScience
+
+
+class ToneMapper:
+    """
+    Tone mapping HDR (PQ/HLG, BT.2020) -> SDR (Rec.709, BT.1886) vetorizado.
+
+    O frame é levado a luz de display em nits, convertido para primárias
+    Rec.709 e o maior componente RGB de cada pixel passa pela curva escolhida
+    (BT.2390, Hable ou Reinhard); os três canais são escalados pela mesma
+    razão, preservando matiz. O pico de origem pode ser um escalar ou um
+    valor por frame (estatísticas por cena), e o custo por pixel é constante.
+    """
+
+    OPERATORS = ('bt2390', 'hable', 'reinhard')
+    TRANSFERS = ('pq', 'hlg')
+    OUTPUT_SPACE = 'Rec.709'  # espaço do sinal tone mapped (BT.709 / BT.1886)
+
+    SDR_PEAK = 100.0  # nits do display SDR
+    DEFAULT_SOURCE_PEAK = 1000.0  # sem estatísticas: masterização típica
+    HLG_DISPLAY_PEAK = 1000.0
+    MIN_SOURCE_PEAK = 100.0
+
+    # Curva filmic de Hable (Uncharted 2)
+    HABLE = {'A': 0.15, 'B': 0.50, 'C': 0.10, 'D': 0.20, 'E': 0.02, 'F': 0.30}
+
+    def __init__(self, operator: str = 'bt2390', target_peak: float = None):
+        if operator not in self.OPERATORS:
+            raise ValueError(f"Operador de tone mapping desconhecido: {operator}")
+        self.operator = operator
+        self.target_peak = float(target_peak or self.SDR_PEAK)
+        self._bt2020_to_bt709 = ColorScience.gamut_matrix('rec2020', 'rec709')
+
+    def tone_map(self, frames: np.ndarray, transfer: str, source_peak=None) -> np.ndarray:
+        """
+        RGB HDR não linear (..., 3) em [0, 1] -> RGB SDR Rec.709 (BT.1886) em [0, 1].
+        source_peak: nits (escalar) ou um valor por frame quando frames é (n, h, w, 3)
+        """
+        if transfer not in self.TRANSFERS:
+            raise ValueError(f"Curva HDR não suportada: {transfer}")
+
+        frames = np.asarray(frames, dtype=np.float32)
+        if transfer == 'pq':
+            nits = ColorScience.pq_decode(np.clip(frames, 0.0, 1.0)) * np.float32(10000.0)
+        else:
+            nits = ColorScience.hlg_ootf(ColorScience.hlg_decode(np.clip(frames, 0.0, 1.0)), self.HLG_DISPLAY_PEAK)
+
+        linear = nits @ self._bt2020_to_bt709.T
+        np.maximum(linear, 0.0, out=linear)  # fora do gamut Rec.709: corte suave seria um passo extra
+
+        max_rgb = linear.max(axis=-1)
+        peak = self._broadcast_peak(source_peak, max_rgb)
+        mapped = self.curve(max_rgb, peak)
+
+        ratio = mapped / np.maximum(max_rgb, 1e-6)
+        linear *= (ratio / self.target_peak)[..., None]
+        np.clip(linear, 0.0, 1.0, out=linear)
+        return ColorScience.bt1886_encode(linear)
+
+    def curve(self, nits: np.ndarray, source_peak) -> np.ndarray:
+        """Curva do operador: nits de origem -> nits no display alvo (pico da origem -> pico do alvo)"""
+        if self.operator == 'bt2390':
+            return self._bt2390(nits, source_peak)
+
+        x = nits / self.target_peak
+        white = np.maximum(source_peak / self.target_peak, 1.0)
+        if self.operator == 'reinhard':
+            # Reinhard estendido: o pico da origem vira exatamente o pico do alvo
+            y = x * (1.0 + x / (white * white)) / (1.0 + x)
+        else:
+            y = self._hable(x) / self._hable(white)
+        return np.minimum(y, 1.0) * self.target_peak
+
+    # ==========================================
+    # ESTATÍSTICAS POR CENA
+    # ==========================================
+
+    @classmethod
+    def scene_peaks(cls, file_metadata: Optional[Dict]) -> List[Dict]:
+        """
+        Pico (MaxCLL) de cada cena a partir de file_metadata: cenas detectadas
+        + linha do tempo de luminância das estatísticas de frames. Sem cenas,
+        o arquivo inteiro é uma cena; sem linha do tempo, usa o MaxCLL do
+        arquivo (ou DEFAULT_SOURCE_PEAK)
+        """
+        metadata = file_metadata or {}
+        frame_stats = metadata.get('frame_stats') or {}
+        timeline = frame_stats.get('timeline') or []
+        file_peak = frame_stats.get('max_cll') or cls.DEFAULT_SOURCE_PEAK
+        scenes = metadata.get('scenes') or [{'start': 0.0, 'end': float('inf')}]
+
+        result = []
+        for scene in scenes:
+            levels = [max_cll for time, max_cll, _ in timeline if scene['start'] <= time < scene['end']]
+            peak = max(levels) if levels else file_peak
+            result.append({
+                'start': scene['start'],
+                'end': scene['end'],
+                'peak': float(min(max(peak, cls.MIN_SOURCE_PEAK), 10000.0)),
+            })
+        return result
+
+    @staticmethod
+    def peak_at(scene_peaks: List[Dict], timestamp: float) -> float:
+        """Pico da cena que contém o instante (a última cena cobre o final do arquivo)"""
+        for scene in scene_peaks:
+            if timestamp < scene['end']:
+                return scene['peak']
+        return scene_peaks[-1]['peak'] if scene_peaks else ToneMapper.DEFAULT_SOURCE_PEAK
+
+    @staticmethod
+    def transfer_from_gamma(gamma: str) -> str:
+        """Curva ('pq', 'hlg' ou 'sdr') a partir do campo gamma do VideoAnalyzer"""
+        return {'PQ': 'pq', 'HLG': 'hlg'}.get(gamma or '', 'sdr')
+
+    @staticmethod
+    def hdr_space(transfer: str) -> Optional[str]:
+        """Espaço nomeado (ColorScience) de uma fonte HDR, ou None para SDR"""
+        return {'pq': 'Rec.2020 PQ', 'hlg': 'Rec.2020 HLG'}.get((transfer or '').lower())
+
+    # ==========================================
+    # OPERADORES
+    # ==========================================
+
+    def _bt2390(self, nits: np.ndarray, source_peak) -> np.ndarray:
+        """EETF da ITU-R BT.2390 (spline de Hermite no domínio PQ, sem elevação de preto)"""
+        source_pq = ColorScience.pq_encode(np.asarray(source_peak / 10000.0, dtype=np.float32))
+        target_pq = ColorScience.pq_encode(np.asarray(self.target_peak / 10000.0, dtype=np.float32))
+
+        e1 = ColorScience.pq_encode(nits / np.float32(10000.0)) / source_pq
+        max_lum = np.minimum(target_pq / source_pq, 1.0)
+        knee = 1.5 * max_lum - 0.5
+
+        t = np.clip((e1 - knee) / np.maximum(1.0 - knee, 1e-6), 0.0, 1.0)
+        t2, t3 = t * t, t * t * t
+        spline = (2 * t3 - 3 * t2 + 1) * knee + (t3 - 2 * t2 + t) * (1.0 - knee) + (-2 * t3 + 3 * t2) * max_lum
+        e2 = np.where(e1 < knee, e1, spline)
+
+        return ColorScience.pq_decode(np.clip(e2 * source_pq, 0.0, 1.0)) * np.float32(10000.0)
+
+    @classmethod
+    def _hable(cls, x):
+        h = cls.HABLE
+        return (x * (h['A'] * x + h['C'] * h['B']) + h['D'] * h['E']) / (x * (h['A'] * x + h['B']) + h['D'] * h['F']) \
+            - h['E'] / h['F']
+
+    @staticmethod
+    def _broadcast_peak(source_peak, reference: np.ndarray) -> np.ndarray:
+        """Pico escalar ou por frame (n,) alinhado ao shape (n, ...) do frame"""
+        peak = np.asarray(source_peak if source_peak is not None else ToneMapper.DEFAULT_SOURCE_PEAK,
+                          dtype=np.float32)
+        if peak.ndim == 1:
+            peak = peak.reshape((-1,) + (1,) * (reference.ndim - 1))
+        return np.maximum(peak, ToneMapper.MIN_SOURCE_PEAK)
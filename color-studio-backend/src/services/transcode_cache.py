@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+
+class TranscodeResultCache:
+    """
+    Cache de resultados de transcodificação.
+
+    A chave é a identidade da fonte (key no R2 + ETag) mais os parâmetros de
+    encode normalizados. Requisições idênticas simultâneas são agrupadas em um
+    único job em execução.
+    """
+
+    CODEC_ALIASES = {
+        'libx264': 'h264',
+        'avc': 'h264',
+        'libx265': 'h265',
+        'hevc': 'h265',
+    }
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or os.getenv('TRANSCODE_CACHE_DIR', 'uploads/cache/transcode')
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    @staticmethod
+    def normalize_params(codec: str, crf=None, preset: str = None, scale: str = None,
+                         lut: str = None, **extra) -> Dict:
+        """
+        Normaliza os parâmetros de encode para que variações equivalentes
+        (ex: 'libx265' e 'hevc', crf '23' e 23) gerem a mesma chave
+        """
+        codec = (codec or '').strip().lower()
+        params = {
+            'codec': TranscodeResultCache.CODEC_ALIASES.get(codec, codec),
+            'crf': int(crf) if crf is not None else None,
+            'preset': preset.strip().lower() if preset else None,
+            'scale': scale.replace(' ', '').lower() if scale else None,
+            'lut': lut or None,
+        }
+        for name, value in extra.items():
+            params[name] = value.strip().lower() if isinstance(value, str) else value
+        return params
+
+    @staticmethod
+    def make_key(source_key: str, etag: str, params: Dict) -> str:
+        """Gera a chave do cache a partir da fonte e dos parâmetros normalizados"""
+        payload = json.dumps({
+            'source_key': source_key,
+            'etag': (etag or '').strip('"'),
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """Retorna o resultado armazenado ou None"""
+        entry_path = self._get_entry_path(cache_key)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            with open(entry_path, 'r') as f:
+                return json.load(f)['result']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, cache_key: str, result: Dict):
+        """Armazena um resultado de sucesso"""
+        entry_path = self._get_entry_path(cache_key)
+        tmp_path = f"{entry_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'cache_key': cache_key,
+                'result': result,
+                'created_at': datetime.utcnow().isoformat()
+            }, f, indent=2)
+        os.replace(tmp_path, entry_path)
+
+    def invalidate(self, cache_key: str):
+        """Remove uma entrada do cache"""
+        entry_path = self._get_entry_path(cache_key)
+        if os.path.exists(entry_path):
+            os.remove(entry_path)
+
+    def get_or_run(self, cache_key: str, job: Callable[[], Dict]) -> Tuple[Dict, str]:
+        """
+        Retorna (resultado, origem), onde origem é 'hit', 'coalesced' ou 'miss'.
+
+        Em caso de miss o job é executado na thread chamadora; outras
+        requisições com a mesma chave aguardam o mesmo resultado.
+        Apenas resultados com success=True são armazenados.
+        """
+        with self._lock:
+            cached = self.get(cache_key)
+            if cached is not None:
+                self.stats['hits'] += 1
+                return cached, 'hit'
+
+            future = self._inflight.get(cache_key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[cache_key] = future
+                self.stats['misses'] += 1
+                owner = True
+
+        if not owner:
+            return future.result(), 'coalesced'
+
+        try:
+            result = job()
+            if result.get('success'):
+                self.put(cache_key, result)
+            future.set_result(result)
+            return result, 'miss'
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas do cache"""
+        with self._lock:
+            return {**self.stats, 'inflight': len(self._inflight)}
+
+    def _get_entry_path(self, cache_key: str) -> str:
+        """Retorna o caminho do arquivo de uma entrada"""
+        return os.path.join(self.cache_dir, f"{cache_key}.json")
+
+
+_transcode_cache = None
+_transcode_cache_lock = threading.Lock()
+
+
+def get_transcode_cache() -> TranscodeResultCache:
+    """Retorna a instância compartilhada do cache (uma por processo)"""
+    global _transcode_cache
+    with _transcode_cache_lock:
+        if _transcode_cache is None:
+            _transcode_cache = TranscodeResultCache()
+        return _transcode_cache
@@ -3,6 +3,9 @@ import json
 import os
 from typing import Dict, Optional
 
+from src.services.metrics import metrics
+from src.services.probe_cache import get_probe_cache
+
 class VideoAnalyzer:
     """Analisa vídeos para extrair metadados técnicos"""
     
@@ -24,72 +27,201 @@ class VideoAnalyzer:
     }
     
     @staticmethod
-    def analyze_video(file_path: str) -> Dict:
+    def analyze_video(file_path: str, r2_key: Optional[str] = None, etag: Optional[str] = None,
+                      use_cache: bool = True) -> Dict:
         """
         Analisa um arquivo de vídeo e retorna metadados completos
+
+        O resultado do ffprobe é cacheado por (caminho, tamanho, mtime), ou por
+        (r2_key, etag) quando o arquivo é cópia local de um objeto do R2.
         """
         try:
-            # Comando ffprobe para extrair informações
-            cmd = [
-                'ffprobe',
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
-                file_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            data = json.loads(result.stdout)
-            
-            # Extrair stream de vídeo
-            video_stream = next(
-                (s for s in data.get('streams', []) if s['codec_type'] == 'video'),
-                None
-            )
-            
-            # Extrair stream de áudio
-            audio_stream = next(
-                (s for s in data.get('streams', []) if s['codec_type'] == 'audio'),
-                None
-            )
-            
-            if not video_stream:
-                raise ValueError("Nenhum stream de vídeo encontrado")
-            
-            # Detectar color space e gamma
-            color_space = VideoAnalyzer._detect_color_space(video_stream)
-            gamma = VideoAnalyzer._detect_gamma(video_stream)
-            
-            # Detectar se é HDR
-            is_hdr = VideoAnalyzer._is_hdr(video_stream)
-            
-            # Calcular duração
-            duration = float(data.get('format', {}).get('duration', 0))
-            
-            # Tamanho do arquivo
-            file_size = int(data.get('format', {}).get('size', 0))
-            
-            return {
-                'codec': video_stream.get('codec_name', 'unknown').upper(),
-                'color_space': color_space,
-                'gamma': gamma,
-                'is_hdr': is_hdr,
-                'resolution': f"{video_stream.get('width', 0)}x{video_stream.get('height', 0)}",
-                'width': video_stream.get('width', 0),
-                'height': video_stream.get('height', 0),
-                'fps': VideoAnalyzer._get_fps(video_stream),
-                'duration': duration,
-                'file_size': file_size,
-                'bit_depth': video_stream.get('bits_per_raw_sample', 8),
-                'has_audio': audio_stream is not None,
-                'audio_codec': audio_stream.get('codec_name', None) if audio_stream else None,
-                'format': data.get('format', {}).get('format_name', 'unknown'),
-                'bitrate': int(data.get('format', {}).get('bit_rate', 0)),
-            }
-            
+            data = VideoAnalyzer.probe(file_path, r2_key, etag, use_cache)
+            return VideoAnalyzer.parse_probe(data)
         except Exception as e:
             raise Exception(f"Erro ao analisar vídeo: {str(e)}")
+
+    @staticmethod
+    def analyze_remote(r2_key: str, r2_service=None, use_cache: bool = True) -> Dict:
+        """
+        Analisa um objeto do R2 sem baixá-lo: o ffprobe lê só cabeçalhos e
+        índices via requisições Range, atendidas por um cache de blocos local
+        """
+        from .r2_upload_service import R2UploadService
+        from .remote_probe import get_remote_probe_proxy
+
+        try:
+            r2_service = r2_service or R2UploadService()
+            info = r2_service.get_object_info(r2_key)
+            if not info['success']:
+                raise ValueError(f"Objeto não encontrado: {info['error']}")
+
+            probe_cache = get_probe_cache()
+            identity, fingerprint = probe_cache.remote_identity(r2_key, info['etag'])
+            if use_cache:
+                data = probe_cache.get(identity, fingerprint)
+                if data is not None:
+                    return VideoAnalyzer.parse_probe(data)
+
+            presigned = r2_service.generate_presigned_url(r2_key, expiration=3600)
+            if not presigned['success']:
+                raise ValueError(f"Falha ao gerar URL assinada: {presigned['error']}")
+
+            proxy = get_remote_probe_proxy()
+            local_url = proxy.register(f"{identity}@{fingerprint['etag']}", presigned['url'], info['size'])
+            try:
+                data = VideoAnalyzer.probe(local_url, r2_key, info['etag'], use_cache=False)
+            finally:
+                proxy.unregister(local_url)
+
+            return VideoAnalyzer.parse_probe(data)
+        except Exception as e:
+            raise Exception(f"Erro ao analisar vídeo: {str(e)}")
+
+    # Probe rápido: só os campos usados por parse_probe, com leitura limitada
+    FAST_PROBE = os.getenv('FAST_PROBE', 'true').lower() == 'true'
+    FAST_PROBESIZE = os.getenv('FAST_PROBESIZE', '5000000')  # bytes
+    FAST_ANALYZEDURATION = os.getenv('FAST_ANALYZEDURATION', '2000000')  # microssegundos
+
+    STREAM_ENTRIES = [
+        'index', 'codec_type', 'codec_name', 'profile', 'width', 'height',
+        'r_frame_rate', 'bits_per_raw_sample', 'color_space', 'color_primaries', 'color_transfer',
+    ]
+    FORMAT_ENTRIES = ['format_name', 'duration', 'size', 'bit_rate']
+
+    @staticmethod
+    def probe(file_path: str, r2_key: Optional[str] = None, etag: Optional[str] = None,
+              use_cache: bool = True, fast: Optional[bool] = None) -> Dict:
+        """Executa o ffprobe (ou reaproveita o resultado em cache)"""
+        probe_cache = get_probe_cache()
+        if r2_key and etag:
+            identity, fingerprint = probe_cache.remote_identity(r2_key, etag)
+        else:
+            identity, fingerprint = probe_cache.local_identity(file_path)
+
+        if use_cache:
+            data = probe_cache.get(identity, fingerprint)
+            if data is not None:
+                return data
+
+        fast = VideoAnalyzer.FAST_PROBE if fast is None else fast
+        data = None
+        if fast:
+            with metrics.timer('probe.fast_s'):
+                data = VideoAnalyzer._run_ffprobe(VideoAnalyzer.build_fast_probe_command(file_path))
+            if not VideoAnalyzer._has_required_fields(data):
+                print(f"⚠️ Probe rápido incompleto para {file_path}, usando probe completo")
+                data = None
+
+        if data is None:
+            with metrics.timer('probe.full_s'):
+                data = VideoAnalyzer._run_ffprobe(VideoAnalyzer.build_full_probe_command(file_path))
+
+        if data.get('streams'):
+            probe_cache.put(identity, fingerprint, data)
+        return data
+
+    @staticmethod
+    def build_fast_probe_command(file_path: str) -> list:
+        """
+        ffprobe com show_entries mínimo e probesize/analyzeduration limitados.
+        Todos os streams são listados (-select_streams aceita um único especificador),
+        mas só o primeiro de vídeo e o primeiro de áudio são usados.
+        """
+        return [
+            'ffprobe',
+            '-v', 'quiet',
+            '-probesize', VideoAnalyzer.FAST_PROBESIZE,
+            '-analyzeduration', VideoAnalyzer.FAST_ANALYZEDURATION,
+            '-print_format', 'json',
+            '-show_entries',
+            f"stream={','.join(VideoAnalyzer.STREAM_ENTRIES)}:format={','.join(VideoAnalyzer.FORMAT_ENTRIES)}",
+            file_path
+        ]
+
+    @staticmethod
+    def build_full_probe_command(file_path: str) -> list:
+        """ffprobe completo (todos os streams e o formato, probing padrão)"""
+        return [
+            'ffprobe',
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            file_path
+        ]
+
+    @staticmethod
+    def _run_ffprobe(cmd: list) -> Dict:
+        """Executa o ffprobe e decodifica o JSON (vazio em caso de falha)"""
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0 or not result.stdout.strip():
+            return {}
+        return json.loads(result.stdout)
+
+    @staticmethod
+    def _has_required_fields(data: Dict) -> bool:
+        """Verifica se o probe trouxe o que parse_probe precisa"""
+        video_stream = next(
+            (s for s in data.get('streams', []) if s.get('codec_type') == 'video'),
+            None
+        )
+        if not video_stream:
+            return False
+        if not video_stream.get('codec_name') or not video_stream.get('width') or not video_stream.get('height'):
+            return False
+        if video_stream.get('r_frame_rate', '0/0') in ('0/0', '0/1'):
+            return False
+        return bool(data.get('format', {}).get('duration'))
+
+    @staticmethod
+    def parse_probe(data: Dict) -> Dict:
+        """Converte a saída do ffprobe nos metadados usados pelo sistema"""
+        # Extrair stream de vídeo
+        video_stream = next(
+            (s for s in data.get('streams', []) if s['codec_type'] == 'video'),
+            None
+        )
+        
+        # Extrair stream de áudio
+        audio_stream = next(
+            (s for s in data.get('streams', []) if s['codec_type'] == 'audio'),
+            None
+        )
+        
+        if not video_stream:
+            raise ValueError("Nenhum stream de vídeo encontrado")
+        
+        # Detectar color space e gamma
+        color_space = VideoAnalyzer._detect_color_space(video_stream)
+        gamma = VideoAnalyzer._detect_gamma(video_stream)
+        
+        # Detectar se é HDR
+        is_hdr = VideoAnalyzer._is_hdr(video_stream)
+        
+        # Calcular duração
+        duration = float(data.get('format', {}).get('duration', 0))
+        
+        # Tamanho do arquivo
+        file_size = int(data.get('format', {}).get('size', 0))
+        
+        return {
+            'codec': video_stream.get('codec_name', 'unknown').upper(),
+            'color_space': color_space,
+            'gamma': gamma,
+            'is_hdr': is_hdr,
+            'resolution': f"{video_stream.get('width', 0)}x{video_stream.get('height', 0)}",
+            'width': video_stream.get('width', 0),
+            'height': video_stream.get('height', 0),
+            'fps': VideoAnalyzer._get_fps(video_stream),
+            'duration': duration,
+            'file_size': file_size,
+            'bit_depth': video_stream.get('bits_per_raw_sample', 8),
+            'has_audio': audio_stream is not None,
+            'audio_codec': audio_stream.get('codec_name', None) if audio_stream else None,
+            'format': data.get('format', {}).get('format_name', 'unknown'),
+            'bitrate': int(data.get('format', {}).get('bit_rate', 0)),
+        }
     
     @staticmethod
     def _detect_color_space(stream: Dict) -> str: